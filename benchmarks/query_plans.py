@@ -0,0 +1,278 @@
+"""
+Query plans and latency of the history and admin queries at scale
+Seeds a throw-away copy of the Task 5 database and measures every query without, then with, the history indexes
+
+    python benchmarks/query_plans.py --rows 1000000
+    python benchmarks/query_plans.py --project task4_django_web --output plans.json
+
+The indexes come from migrations 0003_history_indexes and 0005_admin_filter_indexes:
+the "before" pass migrates back to 0002, the "after" pass applies them to the seeded
+rows. Exits 1 when an indexed plan does not use the index its scenario expects.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple, Union
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+PROJECTS = ['task5_database_integration', 'task4_django_web']
+WITHOUT_INDEXES = '0002_weatherrequest_timestamp_default'
+WITH_INDEXES = '0005_admin_filter_indexes'
+
+CONDITIONS = ['Clear', 'Clouds', 'Rain', 'Drizzle', 'Snow', 'Mist', 'Thunderstorm']
+_BATCH_SIZE = 10000
+
+
+def seed(rows: int, seed_value: int) -> Dict:
+    """
+    Insert rows WeatherData and WeatherRequest rows and rows // 10 WeatherStatistics rows
+
+    Rows are spread over the last year, one city per catalog entry. Inserts
+    go through executemany on the raw cursor; the ORM would spend most of
+    the seeding time building model instances.
+
+    Returns:
+        Dict: Row counts and seeding time
+    """
+    from django.db import connection, transaction
+
+    from weather_app.models import City, WeatherData, WeatherRequest, WeatherStatistics
+    from weather_core import get_catalog
+
+    rng = random.Random(seed_value)
+    adapt = connection.ops.adapt_datetimefield_value
+    now = datetime.now(timezone.utc)
+    span = 365 * 24 * 3600
+    started = time.perf_counter()
+
+    catalog = get_catalog()
+    cities = [catalog.get(name) for name in catalog]
+    City.objects.bulk_create([
+        City(name=city['name'], country=city['country'], country_code=city['country'])
+        for city in cities
+    ], batch_size=_BATCH_SIZE)
+    city_ids = list(City.objects.values_list('pk', flat=True))
+
+    def moments(count):
+        return sorted((adapt(now - timedelta(seconds=rng.uniform(0, span))) for _ in range(count)))
+
+    def insert(model, columns: List[str], values: Callable[[str], tuple], count: int) -> None:
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = (f"INSERT INTO {table} ({', '.join(map(connection.ops.quote_name, columns))}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        stamps = moments(count)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, count, _BATCH_SIZE):
+                cursor.executemany(sql, [values(stamp) for stamp in stamps[start:start + _BATCH_SIZE]])
+
+    insert(WeatherData,
+           ['city_id', 'temperature', 'feels_like', 'humidity', 'pressure', 'wind_speed',
+            'weather_main', 'weather_description', 'timestamp'],
+           lambda stamp: (rng.choice(city_ids), round(rng.uniform(-30, 40), 1), round(rng.uniform(-35, 45), 1),
+                          rng.randint(5, 100), rng.randint(960, 1050), round(rng.uniform(0, 25), 1),
+                          rng.choice(CONDITIONS), 'seeded', stamp),
+           rows)
+    insert(WeatherRequest,
+           ['request_type', 'city_name', 'success', 'response_time', 'timestamp'],
+           lambda stamp: (rng.choice(('city', 'city', 'random', 'status')), rng.choice(catalog),
+                          rng.random() > 0.05, rng.uniform(0.01, 2.0), stamp),
+           rows)
+    insert(WeatherStatistics,
+           ['coldest_city', 'coldest_temperature', 'average_temperature', 'total_cities', 'calculation_timestamp'],
+           lambda stamp: (rng.choice(catalog), rng.uniform(-30, 0), rng.uniform(0, 25), 5, stamp),
+           rows // 10)
+
+    return {
+        'cities': len(city_ids),
+        'weather_data': rows,
+        'weather_requests': rows,
+        'weather_statistics': rows // 10,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def changelist(model, **filters):
+    """The ordered, filtered queryset behind an admin change list, as ModelAdmin builds it for a superuser"""
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.test import RequestFactory
+
+    request = RequestFactory().get('/admin/', filters)
+    request.user = User(is_active=True, is_staff=True, is_superuser=True)
+    model_admin = admin.site._registry[model]
+    return model_admin.get_changelist_instance(request).queryset[:model_admin.list_per_page]
+
+
+def scenarios() -> Dict[str, Tuple[Callable, Union[str, Tuple[str, ...], None]]]:
+    """
+    The queries behind /history/ and the admin change lists, built by the same code as the views and admin
+
+    Returns:
+        Dict: Scenario name -> (queryset factory, index or tuple of indexes the plan must use once
+              indexed, None if no index helps)
+    """
+    from weather_app.models import City, WeatherData, WeatherRequest, WeatherStatistics
+    from weather_app.pagination import encode_cursor, keyset_queryset
+
+    city = City.objects.order_by('pk')[City.objects.count() // 2]
+    # A history page 90% of the way back, reached by cursor (the view) or by OFFSET (the classic paginator)
+    deep = WeatherRequest.objects.count() * 9 // 10
+    newest_first = WeatherRequest.objects.order_by('-timestamp', '-id')
+    row = newest_first.values('timestamp', 'id')[deep - 1]
+    cursor = encode_cursor(row['timestamp'], row['id'])
+    # Change lists are built once (building one runs its count and result queries), then re-run with .all()
+    weather_list = changelist(WeatherData)
+    by_condition = changelist(WeatherData, weather_main__exact='Snow')
+    by_country = changelist(WeatherData, city__country=city.country)
+    city_requests = changelist(WeatherRequest, request_type__exact='city')
+    failed_requests = changelist(WeatherRequest, success__exact='0')
+    failed_city_requests = changelist(WeatherRequest, request_type__exact='city', success__exact='0')
+    return {
+        'history: recent weather': (lambda: keyset_queryset(WeatherData.objects.select_related('city'),
+                                                            'timestamp')[:21], 'weatherdata_recent_idx'),
+        'history: recent requests': (lambda: keyset_queryset(WeatherRequest.objects.all(), 'timestamp')[:21],
+                                     'weatherrequest_recent_idx'),
+        'history: recent statistics': (lambda: keyset_queryset(WeatherStatistics.objects.all(),
+                                                               'calculation_timestamp')[:11],
+                                       'weatherstats_recent_idx'),
+        'history: deep page by cursor': (lambda: keyset_queryset(WeatherRequest.objects.all(), 'timestamp',
+                                                                 cursor)[:21], 'weatherrequest_recent_idx'),
+        'history: deep page by OFFSET': (lambda: newest_first[deep:deep + 21], 'weatherrequest_recent_idx'),
+        'city history': (lambda: keyset_queryset(WeatherData.objects.filter(city=city), 'timestamp')[:21],
+                         'weatherdata_city_recent_idx'),
+        'admin: weather list': (weather_list.all, 'weatherdata_recent_idx'),
+        'admin: weather by condition': (by_condition.all, 'weatherdata_main_recent_idx'),
+        'admin: weather by country': (by_country.all, None),
+        'admin: city requests': (city_requests.all, 'weatherrequest_type_idx'),
+        'admin: failed requests': (failed_requests.all, 'weatherrequest_failed_idx'),
+        # Either index reads the rows in order; which is cheaper depends on the share of failures
+        'admin: failed city requests': (failed_city_requests.all,
+                                        ('weatherrequest_type_idx', 'weatherrequest_failed_idx')),
+    }
+
+
+def measure(queries: Dict[str, Tuple[Callable, Union[str, Tuple[str, ...], None]]], iterations: int) -> Dict:
+    """Return the query plan and median/max latency (ms) of each query"""
+    results = {}
+    for name, (build, _) in queries.items():
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            'plan': build().explain(),
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+        }
+    return results
+
+
+def index_misses(queries: Dict[str, Tuple[Callable, Union[str, Tuple[str, ...], None]]],
+                 measured: Dict) -> Dict[str, str]:
+    """Scenario -> expected indexes, for every SQLite plan that uses none of the indexes its scenario expects"""
+    misses = {}
+    for name, (_, expected) in queries.items():
+        if not expected:
+            continue
+        names = (expected,) if isinstance(expected, str) else expected
+        if not any(re.search(rf'USING (COVERING )?INDEX {index}\b', measured[name]['plan']) for index in names):
+            misses[name] = ' or '.join(names)
+    return misses
+
+
+def migrate_to(name: str) -> float:
+    """Migrate weather_app to the named migration, returning the seconds it took"""
+    from django.core.management import call_command
+
+    started = time.perf_counter()
+    call_command('migrate', 'weather_app', name, verbosity=0)
+    return round(time.perf_counter() - started, 2)
+
+
+def run(args) -> Dict:
+    project_dir = os.path.join(ROOT_DIR, args.project)
+    os.chdir(project_dir)
+    sys.path.insert(0, project_dir)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weather_project.settings')
+    # The file log handler expects this directory to exist
+    os.makedirs(os.path.join(project_dir, 'logs'), exist_ok=True)
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    # Never seed the project's db.sqlite3
+    setup_test_environment()
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp, 'query_plans.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            migrate_to(WITHOUT_INDEXES)
+            report = {'project': args.project, 'seed': seed(args.rows, args.seed)}
+            queries = scenarios()
+            report['without_indexes'] = measure(queries, args.iterations)
+            report['index_build_seconds'] = migrate_to(WITH_INDEXES)
+            if connection.vendor == 'sqlite':
+                # Give the planner statistics for the new indexes, as a long-lived database would have
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            report['with_indexes'] = measure(queries, args.iterations)
+            if connection.vendor == 'sqlite':
+                report['index_misses'] = index_misses(queries, report['with_indexes'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    seeded = report['seed']
+    print(f"{report['project']}: {seeded['weather_data']:,} weather rows, {seeded['weather_requests']:,} requests, "
+          f"{seeded['weather_statistics']:,} statistics over {seeded['cities']:,} cities "
+          f"(seeded in {seeded['seconds']}s, indexes built in {report['index_build_seconds']}s)")
+    print(f"\n{'query':<32} {'before ms':>12} {'after ms':>12} {'speed-up':>10}")
+    for name, before in report['without_indexes'].items():
+        after = report['with_indexes'][name]
+        speedup = before['median_ms'] / after['median_ms'] if after['median_ms'] else float('inf')
+        print(f"{name:<32} {before['median_ms']:>12} {after['median_ms']:>12} {speedup:>9.1f}x")
+    for name, before in report['without_indexes'].items():
+        print(f"\n{name}")
+        for label, plan in (('before', before['plan']), ('after', report['with_indexes'][name]['plan'])):
+            print(f"  {label}:\n    " + plan.replace('\n', '\n    '))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare history/admin query plans without and with the indexes")
+    parser.add_argument('--project', choices=PROJECTS, default=PROJECTS[0])
+    parser.add_argument('--rows', type=int, default=1000000, help="WeatherData and WeatherRequest rows to seed")
+    parser.add_argument('--iterations', type=int, default=5, help="timed runs per query")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    misses = report.get('index_misses')
+    if misses:
+        for name, expected in misses.items():
+            print(f"\n{name}: the plan does not use {expected}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+End-to-end benchmarks for every front-end and the statistics path
+Runs offline against the local OpenWeatherMap stand-in (weather_core/mock_server.py)
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --output current.json --compare baseline.json
+
+Each front-end runs in its own subprocess (the two Django projects cannot
+share one), all pointed at one mock server started by the parent process.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TARGETS = ['console', 'flask', 'django', 'django_db']
+TARGET_DIRS = {
+    'console': 'task1_console_app',
+    'flask': 'task3_flask_web',
+    'django': 'task4_django_web',
+    'django_db': 'task5_database_integration',
+}
+
+# Allocation and query passes are slower, so they run fewer iterations
+_TRACED_ITERATIONS = 10
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int,
+            queries: Optional[Callable] = None) -> Dict:
+    """
+    Time fn() sequentially, then trace its allocations (and DB queries) separately
+
+    Args:
+        fn (Callable): Operation to benchmark
+        iterations (int): Timed calls
+        warmup (int): Untimed calls first
+        queries (Callable): Optional factory for a context manager with captured_queries
+
+    Returns:
+        Dict: Throughput, latency percentiles (ms), allocation peak and query counts per call
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+
+    traced = min(iterations, _TRACED_ITERATIONS)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(traced):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+
+    query_counts = []
+    if queries is not None:
+        for _ in range(traced):
+            with queries() as captured:
+                fn()
+            query_counts.append(len(captured.captured_queries))
+
+    return {
+        'iterations': iterations,
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'alloc_peak_kib': round(statistics.fmean(peaks) / 1024, 1),
+        'db_queries': round(statistics.fmean(query_counts), 2) if query_counts else None,
+    }
+
+
+def _unthrottle(weather_app, cold: bool) -> None:
+    """Lift the upstream quota (the mock has none) and optionally disable the response cache"""
+    from weather_core import RateLimiter, TTLCache
+
+    unlimited = RateLimiter(rate_per_minute=0)
+    for client in (weather_app.client, getattr(weather_app, 'async_client', None)):
+        if client is None:
+            continue
+        client.rate_limiter = unlimited
+        if cold:
+            client.cache = TTLCache(ttl=0)
+
+
+def _observations(count: int) -> List:
+    """Synthetic parsed observations for the statistics path, cycling through the catalog"""
+    from weather_core import Observation, get_catalog
+    from weather_core.mock_server import make_observation
+
+    catalog = get_catalog()
+    return [Observation.from_payload(make_observation(name, catalog.get(name)['country']))
+            for name in (catalog[i % len(catalog)] for i in range(count))]
+
+
+def bench_console(args) -> Dict:
+    from weather_app import WeatherApp
+
+    app = WeatherApp('bench-key')
+    _unthrottle(app, args.cold)
+    results = {}
+    for size in args.stats_sizes:
+        data = _observations(size)
+        results[f'calculate_statistics[{size}]'] = measure(lambda: app.calculate_statistics(data),
+                                                           args.iterations, args.warmup)
+    results['get_random_cities_weather'] = measure(lambda: app.get_random_cities_weather(5),
+                                                   args.iterations, args.warmup)
+    return results
+
+
+def bench_flask(args) -> Dict:
+    import app as flask_app
+
+    _unthrottle(flask_app.weather_app, args.cold)
+    client = flask_app.app.test_client()
+
+    def call(method, url, payload=None):
+        def run():
+            response = client.open(url, method=method, json=payload)
+            assert response.status_code < 500, (url, response.status_code)
+        return run
+
+    return {
+        'GET /api/status': measure(call('GET', '/api/status'), args.iterations, args.warmup),
+        'POST /api/city-weather': measure(call('POST', '/api/city-weather', {'city': 'Paris'}),
+                                          args.iterations, args.warmup),
+        'POST /api/random-weather': measure(call('POST', '/api/random-weather', {}),
+                                            args.iterations, args.warmup),
+    }
+
+
+def bench_django(args) -> Dict:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weather_project.settings')
+    # The file log handler expects this directory to exist
+    os.makedirs(os.path.join(os.getcwd(), 'logs'), exist_ok=True)
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+
+    # Never write benchmark rows into the project's db.sqlite3. The throw-away database is a real file:
+    # SQLite's shared in-memory test database fails concurrent writers instead of waiting for the lock
+    setup_test_environment()
+    test_name = os.path.join(os.path.dirname(os.path.abspath(args.json_out)), f'{args.target}.sqlite3')
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = test_name
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    if args.cold:
+        # The views are also cached in the Django cache, which would answer before the weather client is asked
+        override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}).enable()
+
+    from weather_app import views
+    _unthrottle(views.weather_app, args.cold)
+    client = Client()
+
+    def call(method, url, payload=None):
+        def run():
+            if method == 'GET':
+                response = client.get(url)
+            else:
+                response = client.post(url, data=json.dumps(payload), content_type='application/json')
+            assert response.status_code < 500, (url, response.status_code)
+        return run
+
+    def queries():
+        return CaptureQueriesContext(connection)
+
+    results = {
+        'GET /api/status/': measure(call('GET', '/api/status/'), args.iterations, args.warmup, queries),
+        'POST /api/city-weather/': measure(call('POST', '/api/city-weather/', {'city': 'Paris'}),
+                                           args.iterations, args.warmup, queries),
+        'POST /api/random-weather/': measure(call('POST', '/api/random-weather/', {}),
+                                             args.iterations, args.warmup, queries),
+        'GET /history/': measure(call('GET', '/history/'), args.iterations, args.warmup, queries),
+    }
+    views.weather_app.request_log.close()
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    return results
+
+
+BENCHES = {
+    'console': bench_console,
+    'flask': bench_flask,
+    'django': bench_django,
+    'django_db': bench_django,
+}
+
+
+def run_target(args) -> None:
+    """Child process: run one front-end's scenarios and write them to args.json_out"""
+    target_dir = os.path.join(ROOT_DIR, TARGET_DIRS[args.target])
+    os.chdir(target_dir)
+    sys.path.insert(0, target_dir)
+    results = BENCHES[args.target](args)
+    with open(args.json_out, 'w', encoding='utf-8') as f:
+        json.dump(results, f)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(args) -> Dict:
+    """Parent process: start the mock upstream and run every requested target in a subprocess"""
+    from weather_core.mock_server import FaultProfile, MockServer
+
+    profile = FaultProfile(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'cold': args.cold,
+        },
+        'results': {},
+    }
+
+    with MockServer(profile) as server, tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, OPENWEATHER_BASE_URL=server.base_url, PYTHONPATH=ROOT_DIR)
+        for target in args.targets:
+            out = os.path.join(tmp, f'{target}.json')
+            command = [sys.executable, os.path.abspath(__file__), '--target', target, '--json-out', out,
+                       '--iterations', str(args.iterations), '--warmup', str(args.warmup),
+                       '--stats-sizes', *map(str, args.stats_sizes)]
+            if args.cold:
+                command.append('--cold')
+            print(f"Running {target}...", file=sys.stderr)
+            child = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if child.returncode != 0:
+                print(child.stderr, file=sys.stderr)
+                raise SystemExit(f"benchmark target {target} failed")
+            with open(out, encoding='utf-8') as f:
+                for scenario, result in json.load(f).items():
+                    report['results'][f'{target}:{scenario}'] = result
+    return report
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Return the regressions of current against baseline
+
+    A scenario regresses when its p95 latency or allocation peak grows by
+    more than threshold, its throughput drops by more than threshold, or it
+    issues more DB queries per call.
+    """
+    regressions = []
+    print(f"\n{'scenario':<50} {'p95 ms':>18} {'req/s':>18} {'alloc KiB':>18} {'queries':>12}")
+    for name, new in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:<50} (new)")
+            continue
+
+        def cell(key):
+            return f"{old[key]}->{new[key]}"
+
+        print(f"{name:<50} {cell('p95_ms'):>18} {cell('throughput_per_s'):>18} "
+              f"{cell('alloc_peak_kib'):>18} {cell('db_queries'):>12}")
+        if new['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+        if old['throughput_per_s'] and new['throughput_per_s'] < old['throughput_per_s'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {old['throughput_per_s']} -> {new['throughput_per_s']}/s")
+        if new['alloc_peak_kib'] > old['alloc_peak_kib'] * (1 + threshold):
+            regressions.append(f"{name}: alloc peak {old['alloc_peak_kib']} -> {new['alloc_peak_kib']} KiB")
+        if old['db_queries'] is not None and new['db_queries'] is not None and new['db_queries'] > old['db_queries']:
+            regressions.append(f"{name}: DB queries {old['db_queries']} -> {new['db_queries']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark every front-end against the local mock upstream")
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--stats-sizes', nargs='+', type=int, default=[5, 1000, 100000],
+                        help="city counts for the calculate_statistics scenarios")
+    parser.add_argument('--latency', default='fixed:0.01', help="mock upstream latency distribution")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cold', action='store_true', help="disable the weather and Django view caches so every lookup goes upstream")
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--compare', help="baseline JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument('--target', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--json-out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.target:
+        run_target(args)
+        return
+
+    report = run_all(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            raise SystemExit(1)
+        print("\nNo regressions", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Concurrent read/write throughput of a Django project's SQLite database, per database profile
+Reader threads load /history/ while writer threads store observations and request logs, as live traffic does
+
+    python benchmarks/sqlite_concurrency.py
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 4 --duration 20 --output sqlite.json
+
+Profiles:
+    default     Django's stock SQLite setup: rollback journal, no pragmas, a new connection per request
+    production  The settings.py profile: WAL, WEATHER_SQLITE_PRAGMAS, persistent connections,
+                IMMEDIATE transactions
+
+Each profile runs in its own subprocess on its own throw-away database file.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+PROJECTS = ['task5_database_integration', 'task4_django_web']
+PROFILES = ['default', 'production']
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'ops': len(ordered),
+        'errors': errors,
+        'ops_per_s': round(len(ordered) / seconds, 1),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+    }
+
+
+def run_profile(args) -> Dict:
+    """Child process: configure the profile, seed the database and run the mixed workload"""
+    project_dir = os.path.join(ROOT_DIR, args.project)
+    os.chdir(project_dir)
+    sys.path.insert(0, project_dir)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weather_project.settings')
+    # The file log handler expects this directory to exist
+    os.makedirs(os.path.join(project_dir, 'logs'), exist_ok=True)
+
+    import django
+    from django.conf import settings
+    django.setup()
+
+    from django.db import DatabaseError, close_old_connections, connection, connections
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    database = connections.settings['default']
+    if args.profile == 'default':
+        # Undo the production profile before the first connection is opened
+        settings.WEATHER_SQLITE_PRAGMAS = {}
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'].pop('transaction_mode', None)
+
+    # A real file: the shared in-memory test database has no journal modes and no file locking
+    setup_test_environment()
+    database.setdefault('TEST', {})['NAME'] = args.database
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    from weather_core import Observation
+    from weather_app.persistence import get_weather_store
+    from weather_app.request_log import get_request_log
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+
+    store = get_weather_store()
+    request_log = get_request_log()
+    store.save([Observation(name=f'City {i}', temp=10.0, country='NO', observed_at=0) for i in range(args.cities)])
+    for i in range(args.seed_rows // args.cities):
+        store.save([Observation(name=f'City {c}', temp=10.0 + c % 7, country='NO', observed_at=i + 1)
+                    for c in range(args.cities)])
+    close_old_connections()
+
+    stop = threading.Event()
+    results = {'read': ([], [0]), 'write': ([], [0])}
+    sequence = iter(range(10 ** 9))
+    sequence_lock = threading.Lock()
+
+    def reader():
+        client = Client()
+        latencies, errors = results['read']
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get('/history/')
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[0] += 1
+
+    def writer():
+        latencies, errors = results['write']
+        while not stop.is_set():
+            with sequence_lock:
+                step = next(sequence)
+            city = f'City {step % args.cities}'
+            started = time.perf_counter()
+            try:
+                # What one city-weather request writes: its history row (plus rollups) and its log entry
+                store.save([Observation(name=city, temp=step % 30, country='NO', observed_at=args.seed_rows + step)])
+                request_log.log(request_type='city', city_name=city, success=True, response_time=0.01)
+                latencies.append(time.perf_counter() - started)
+            except DatabaseError:
+                errors[0] += 1
+            finally:
+                # The request/response cycle's connection handling, as in a view
+                close_old_connections()
+
+    def run(target):
+        try:
+            target()
+        finally:
+            connection.close()
+
+    threads = ([threading.Thread(target=run, args=(reader,)) for _ in range(args.readers)]
+               + [threading.Thread(target=run, args=(writer,)) for _ in range(args.writers)])
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    request_log.close()
+
+    report = {
+        'profile': args.profile,
+        'journal_mode': journal_mode,
+        'conn_max_age': database['CONN_MAX_AGE'],
+        'reads': summarize(results['read'][0], results['read'][1][0], seconds),
+        'writes': summarize(results['write'][0], results['write'][1][0], seconds),
+        'request_log': request_log.stats(),
+    }
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    return report
+
+
+def run_all(args) -> Dict:
+    """Parent process: run each profile in a subprocess on a fresh database file"""
+    report = {
+        'project': args.project,
+        'readers': args.readers,
+        'writers': args.writers,
+        'duration': args.duration,
+        'profiles': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles:
+            out = os.path.join(tmp, f'{profile}.json')
+            command = [sys.executable, os.path.abspath(__file__), '--project', args.project,
+                       '--readers', str(args.readers), '--writers', str(args.writers),
+                       '--duration', str(args.duration), '--seed-rows', str(args.seed_rows),
+                       '--cities', str(args.cities), '--profile', profile,
+                       '--database', os.path.join(tmp, f'{profile}.sqlite3'), '--json-out', out]
+            print(f"Running {profile}...", file=sys.stderr)
+            child = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if child.returncode != 0:
+                print(child.stderr, file=sys.stderr)
+                raise SystemExit(f"profile {profile} failed")
+            with open(out, encoding='utf-8') as f:
+                report['profiles'][profile] = json.load(f)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{report['project']}: {report['readers']} readers (GET /history/), {report['writers']} writers, "
+          f"{report['duration']}s per profile")
+    print(f"{'profile':<12} {'journal':>8} {'reads/s':>9} {'read p95':>9} {'read err':>9} "
+          f"{'writes/s':>9} {'write p95':>10} {'write err':>10}")
+    for name, result in report['profiles'].items():
+        reads, writes = result['reads'], result['writes']
+        print(f"{name:<12} {result['journal_mode']:>8} {reads['ops_per_s']:>9} {reads['p95_ms']:>9} "
+              f"{reads['errors']:>9} {writes['ops_per_s']:>9} {writes['p95_ms']:>10} {writes['errors']:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent SQLite read/write throughput per database profile")
+    parser.add_argument('--project', choices=PROJECTS, default=PROJECTS[0])
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=PROFILES)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per profile")
+    parser.add_argument('--seed-rows', type=int, default=20000, help="WeatherData rows stored before measuring")
+    parser.add_argument('--cities', type=int, default=100)
+    parser.add_argument('--output', help="also write the JSON report here")
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    parser.add_argument('--json-out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(run_profile(args), f)
+        return
+
+    report = run_all(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
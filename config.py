@@ -3,11 +3,58 @@ Configuration file for the Weather App
 Shared across all tasks (Task 1, 2, 3, 4, 5)
 """
 
+import os
+
 # OpenWeatherMap API Configuration
 # Get your API key from: https://openweathermap.org/api
 OPENWEATHER_API_KEY = "365283c5105f62f77ef99f64e4fc3996"
+# Current-weather endpoint; set OPENWEATHER_BASE_URL to http://127.0.0.1:8081/data/2.5/weather
+# to run every front-end against the local stand-in (python -m weather_core.mock_server)
+OPENWEATHER_BASE_URL = os.environ.get("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5/weather")
 
 # App Configuration
 DEFAULT_CITIES_COUNT = 5
 REQUEST_TIMEOUT = 10
 UNITS = "metric"  # metric, imperial, kelvin
+
+# HTTP Client Configuration (shared keep-alive session, see weather_core/client.py)
+HTTP_POOL_CONNECTIONS = 10  # number of host pools to cache
+HTTP_POOL_MAXSIZE = 20  # max keep-alive connections per host
+
+# Random-cities fan-out (see weather_core/fanout.py)
+FANOUT_MAX_WORKERS = 8  # concurrent upstream fetches per process
+FANOUT_DEADLINE = 15  # seconds a whole batch may take before partial results are returned
+
+# Async HTTP client (see weather_core/async_client.py)
+ASYNC_CONNECTOR_LIMIT = 100  # max open upstream connections per event loop
+
+# Weather response cache (see weather_core/cache.py)
+WEATHER_CACHE_TTL = 600  # seconds a city observation is fresh, 0 disables caching
+WEATHER_CACHE_HARD_TTL = 1800  # until then a stale observation is served while it refreshes in the background
+WEATHER_CACHE_MAX_ENTRIES = 1024  # least recently used cities are evicted past this
+
+# Batched lookups via the multi-city group endpoint (see weather_core/batch.py)
+CITY_IDS_FILE = None  # optional JSON file that persists resolved upstream city IDs across restarts
+CITY_IDS_FLUSH_DELAY = 5  # seconds newly resolved IDs are batched before the file is rewritten
+
+# City catalog used for random selection (see weather_core/catalog.py)
+CITY_CATALOG_FILE = None  # optional CSV (name,country,region) replacing the bundled weather_core/data/cities.csv
+
+# Negative cache for cities upstream cannot resolve (404/400), see weather_core/cache.py
+NEGATIVE_CACHE_TTL = 120  # seconds an unknown city is answered locally
+NEGATIVE_CACHE_MAX_ENTRIES = 4096
+
+# Upstream circuit breaker and adaptive timeouts (see weather_core/breaker.py)
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive upstream failures (timeouts, 5xx, 429) that open the circuit
+BREAKER_RESET_TIMEOUT = 30  # seconds the circuit stays open before one probe call is let through
+BREAKER_MIN_TIMEOUT = 1  # floor for latency-derived timeouts, REQUEST_TIMEOUT is the ceiling
+BREAKER_LATENCY_WINDOW = 100  # recent successful call latencies the timeout is derived from
+
+# Client-side upstream rate limit shared by every front-end (see weather_core/ratelimit.py)
+RATE_LIMIT_PER_MINUTE = 60  # OpenWeatherMap free-tier quota, 0 disables limiting
+RATE_LIMIT_BURST = 10  # calls that may go out at once after an idle period
+RATE_LIMIT_FILE = None  # optional lock-protected state file so all processes on the host share one quota
+RATE_LIMIT_BACKOFF = 10  # seconds every call pauses after a 429 without Retry-After
+
+# JSON encoding for the /api/* endpoints (see weather_core/serialization.py)
+JSON_BACKEND = "auto"  # "auto" uses orjson when installed, "json" forces the standard library
@@ -9,6 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from weather_app import WeatherApp
+from weather_core import Observation
 
 def test_weather_app():
     """
@@ -26,24 +27,9 @@ def test_weather_app():
     
     # Test statistics calculation
     test_data = [
-        {
-            'name': 'Test City 1',
-            'main': {'temp': 20.0},
-            'weather': [{'description': 'sunny'}],
-            'sys': {'country': 'TC'}
-        },
-        {
-            'name': 'Test City 2', 
-            'main': {'temp': 15.0},
-            'weather': [{'description': 'cloudy'}],
-            'sys': {'country': 'TC'}
-        },
-        {
-            'name': 'Test City 3',
-            'main': {'temp': 25.0},
-            'weather': [{'description': 'rainy'}],
-            'sys': {'country': 'TC'}
-        }
+        Observation(name='Test City 1', temp=20.0, description='sunny', country='TC'),
+        Observation(name='Test City 2', temp=15.0, description='cloudy', country='TC'),
+        Observation(name='Test City 3', temp=25.0, description='rainy', country='TC'),
     ]
     
     stats = app.calculate_statistics(test_data)
@@ -7,123 +7,62 @@ from tkinter import ttk, messagebox, scrolledtext
 import threading
 import requests
 import json
-import random
+import re
+import sys
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+# Add parent directory to path to access config.py and weather_core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weather_core import (DEFAULT_BASE_URL, CircuitOpenError, CityNotFoundError, RateLimitedError,
+                          Observation, WeatherClient, compute_statistics, get_catalog,
+                          get_running_statistics)
 
 class WeatherApp:
     def __init__(self, api_key: str):
         """Initialize the Weather App with OpenWeatherMap API key"""
         self.api_key = api_key
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.base_url = DEFAULT_BASE_URL
+        self.client = WeatherClient(api_key, base_url=self.base_url, units='metric')
+        
+        # Shared city catalog for random selection (deduplicated, loaded once per process)
+        self.cities = get_catalog()
         
-        # List of cities for random selection (worldwide cities with Latin names)
-        self.cities = [
-            "London", "Paris", "Tokyo", "New York", "Sydney", "Berlin", "Rome", 
-            "Madrid", "Amsterdam", "Vienna", "Prague", "Warsaw", "Moscow", 
-            "Istanbul", "Cairo", "Dubai", "Mumbai", "Bangkok", "Singapore", 
-            "Seoul", "Beijing", "Shanghai", "Hong Kong", "Taipei", "Manila",
-            "Jakarta", "Kuala Lumpur", "Ho Chi Minh City", "Bangkok", "Dhaka",
-            "Karachi", "Lahore", "Tehran", "Baghdad", "Riyadh", "Kuwait City",
-            "Doha", "Abu Dhabi", "Muscat", "Sanaa", "Amman", "Beirut", "Damascus",
-            "Jerusalem", "Tel Aviv", "Ankara", "Athens", "Sofia", "Bucharest",
-            "Budapest", "Zagreb", "Ljubljana", "Bratislava", "Vilnius", "Riga",
-            "Tallinn", "Helsinki", "Stockholm", "Oslo", "Copenhagen", "Reykjavik",
-            "Dublin", "Edinburgh", "Cardiff", "Belfast", "Lisbon", "Porto",
-            "Barcelona", "Valencia", "Seville", "Bilbao", "Marseille", "Lyon",
-            "Nice", "Toulouse", "Strasbourg", "Lille", "Nantes", "Montpellier",
-            "Bordeaux", "Rennes", "Toulon", "Grenoble", "Dijon", "Angers",
-            "Le Havre", "Saint-Etienne", "Tours", "Limoges", "Amiens", "Perpignan",
-            "Metz", "Besancon", "Boulogne-Billancourt", "Orleans", "Mulhouse",
-            "Rouen", "Caen", "Nancy", "Saint-Denis", "Argenteuil", "Montreuil",
-            "Roubaix", "Tourcoing", "Nanterre", "Avignon", "Creteil", "Dunkirk",
-            "Poitiers", "Asnieres-sur-Seine", "Versailles", "Courbevoie", "Vitry-sur-Seine",
-            "Colombes", "Aulnay-sous-Bois", "La Rochelle", "Rueil-Malmaison", "Antibes",
-            "Saint-Maur-des-Fosses", "Champigny-sur-Marne", "Aubervilliers", "Cannes",
-            "Beziers", "Bourges", "Colmar", "Drancy", "Merignac", "Saint-Nazaire",
-            "Issy-les-Moulineaux", "Noisy-le-Grand", "Evry", "Cergy", "Pessac",
-            "Venissieux", "Clichy", "Ivry-sur-Seine", "Levallois-Perret", "Troyes",
-            "Neuilly-sur-Seine", "Antony", "Lorient", "Sarcelles", "Niort", "Le Mans",
-            "Aix-en-Provence", "Montauban", "Villeurbanne", "Hyeres", "Cholet",
-            "Meudon", "Chambery", "Maisons-Alfort", "Belfort", "Blois", "Annecy",
-            "Boulogne-sur-Mer", "Brive-la-Gaillarde", "Cannes", "Chalon-sur-Saone",
-            "Charleville-Mezieres", "Chartres", "Chateauroux", "Chaumont", "Cherbourg",
-            "Colmar", "Creil", "Dax", "Dieppe", "Douai", "Dreux", "Epinay-sur-Seine",
-            "Evreux", "Frejus", "Gap", "Gennevilliers", "Givors", "Grasse", "Haguenau",
-            "La Ciotat", "La Seyne-sur-Mer", "Laval", "Le Creusot", "Le Havre",
-            "Le Perreux-sur-Marne", "Levallois-Perret", "Libourne", "Lunel", "Macon",
-            "Mantes-la-Jolie", "Martigues", "Meaux", "Melun", "Menton", "Montbeliard",
-            "Montlucon", "Montrouge", "Narbonne", "Neuilly-sur-Marne", "Nogent-sur-Marne",
-            "Palaiseau", "Pantin", "Pierrefitte-sur-Seine", "Plaisir", "Pontault-Combault",
-            "Pontoise", "Rambouillet", "Rosny-sous-Bois", "Rueil-Malmaison", "Saint-Brieuc",
-            "Saint-Chamond", "Saint-Etienne", "Saint-Germain-en-Laye", "Saint-Jean-de-Luz",
-            "Saint-Laurent-du-Var", "Saint-Leu", "Saint-Malo", "Saint-Mande", "Saint-Maur-des-Fosses",
-            "Saint-Michel-sur-Orge", "Saint-Ouen", "Saint-Pol-sur-Mer", "Saint-Priest",
-            "Saint-Quentin", "Saint-Raphael", "Sainte-Genevieves-des-Bois", "Sainte-Maxime",
-            "Salon-de-Provence", "Sartrouville", "Savigny-sur-Orge", "Schiltigheim",
-            "Sevran", "Sotteville-les-Rouen", "Stains", "Sucy-en-Brie", "Suresnes",
-            "Taverny", "Thiais", "Thionville", "Torcy", "Toulon", "Toulouse", "Tourcoing",
-            "Tours", "Trappes", "Tremblay-en-France", "Valence", "Valenciennes", "Vandœuvre-les-Nancy",
-            "Vaulx-en-Velin", "Vaulx-en-Velin", "Vierzon", "Vigneux-sur-Seine", "Villeneuve-d'Ascq",
-            "Villeneuve-la-Garenne", "Villeneuve-Saint-Georges", "Villepinte", "Villeurbanne",
-            "Vincennes", "Viry-Chatillon", "Vitry-sur-Seine", "Wasquehal", "Wattrelos",
-            "Wittenheim", "Yerres", "Yvetot", "Yzeure"
-        ]
+        # Running statistics over every observation this process has served
+        self.running_stats = get_running_statistics()
     
-    def get_weather(self, city: str) -> Dict:
+    def get_weather(self, city: str) -> Optional[Observation]:
         """Get weather data for a specific city"""
         try:
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'  # Celsius
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            data = self.client.get_weather(city)
+            self.running_stats.add(data)
+            return data
+        except (CircuitOpenError, CityNotFoundError, RateLimitedError, requests.exceptions.RequestException) as e:
             print(f"Error fetching weather for {city}: {e}")
             return None
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON for {city}: {e}")
             return None
     
-    def get_random_cities_weather(self, num_cities: int = 5) -> List[Dict]:
-        """Get weather data for random cities"""
-        selected_cities = random.sample(self.cities, num_cities)
-        weather_data = []
-        
-        for city in selected_cities:
-            data = self.get_weather(city)
-            if data:
-                weather_data.append(data)
-        
+    def get_random_cities_weather(self, num_cities: int = 5, max_workers: int = None,
+                                  deadline: float = None) -> List[Observation]:
+        """Get weather data for random cities, fetched concurrently in batches with a deadline"""
+        selected_cities = self.cities.sample(num_cities)
+        results = self.client.get_weather_many(selected_cities, max_workers=max_workers,
+                                               deadline=deadline)
+        
+        weather_data = [data for city, data in results if data]
+        self.running_stats.update(weather_data)
         return weather_data
     
-    def calculate_statistics(self, weather_data: List[Dict]) -> Dict:
+    def calculate_statistics(self, weather_data: List[Observation]) -> Dict:
         """Calculate weather statistics from the data"""
         if not weather_data:
             return {"error": "No weather data available"}
         
-        temperatures = [data['main']['temp'] for data in weather_data]
-        cities = [data['name'] for data in weather_data]
-        
-        # Find coldest city
-        coldest_index = temperatures.index(min(temperatures))
-        coldest_city = cities[coldest_index]
-        coldest_temp = temperatures[coldest_index]
-        
-        # Calculate average temperature
-        avg_temp = sum(temperatures) / len(temperatures)
-        
-        return {
-            "coldest_city": coldest_city,
-            "coldest_temperature": coldest_temp,
-            "average_temperature": avg_temp,
-            "total_cities": len(weather_data)
-        }
+        # Coldest city, averages, percentiles and per-country breakdown (vectorized with NumPy when installed)
+        return compute_statistics(weather_data)
 
 
 class WeatherGUI:
@@ -253,19 +192,27 @@ class WeatherGUI:
             return
         
         try:
-            # Update config file in parent directory
-            import sys
+            # Update config file in parent directory, keeping the other settings
             parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             config_path = os.path.join(parent_dir, 'config.py')
+            key_line = f'OPENWEATHER_API_KEY = "{key}"'
             
-            config_content = f'''"""
+            if os.path.exists(config_path):
+                with open(config_path) as f:
+                    config_content = f.read()
+                config_content, replaced = re.subn(r'^OPENWEATHER_API_KEY\s*=.*$', key_line,
+                                                   config_content, count=1, flags=re.MULTILINE)
+                if not replaced:
+                    config_content += f"\n{key_line}\n"
+            else:
+                config_content = f'''"""
 Configuration file for the Weather App
 Shared across all tasks (Task 1, 2, 3, 4, 5)
 """
 
 # OpenWeatherMap API Configuration
 # Get your API key from: https://openweathermap.org/api
-OPENWEATHER_API_KEY = "{key}"
+{key_line}
 
 # App Configuration
 DEFAULT_CITIES_COUNT = 5
@@ -316,12 +263,12 @@ UNITS = "metric"  # metric, imperial, kelvin
                 if weather_data:
                     # Display weather data
                     for data in weather_data:
-                        city = data['name']
-                        country = data['sys']['country']
-                        temp = data['main']['temp']
-                        humidity = data['main']['humidity']
-                        description = data['weather'][0]['description']
-                        feels_like = data['main']['feels_like']
+                        city = data.name
+                        country = data.country
+                        temp = data.temp
+                        humidity = data.humidity
+                        description = data.description
+                        feels_like = data.feels_like
                         
                         self.results_text.insert(tk.END, f"🌤️ {city}, {country}\n")
                         self.results_text.insert(tk.END, f"   Temperature: {temp:.1f}°C (feels like {feels_like:.1f}°C)\n")
@@ -335,6 +282,9 @@ UNITS = "metric"  # metric, imperial, kelvin
                     self.stats_text.insert(tk.END, f"   Coldest city: {stats['coldest_city']} ({stats['coldest_temperature']:.1f}°C)\n")
                     self.stats_text.insert(tk.END, f"   Average temperature: {stats['average_temperature']:.1f}°C\n")
                     self.stats_text.insert(tk.END, f"   Total cities: {stats['total_cities']}\n")
+                    session = self.weather_app.running_stats.result()
+                    self.stats_text.insert(tk.END, f"   Session: {session['total_cities']} observations, "
+                                                   f"average {session['average_temperature']:.1f}°C\n")
                 else:
                     self.results_text.insert(tk.END, "❌ Failed to fetch weather data. Please check your API key and internet connection.\n")
                 
@@ -372,14 +322,14 @@ UNITS = "metric"  # metric, imperial, kelvin
                 
                 if weather_data:
                     # Display in GUI
-                    city_name = weather_data['name']
-                    country = weather_data['sys']['country']
-                    temp = weather_data['main']['temp']
-                    humidity = weather_data['main']['humidity']
-                    description = weather_data['weather'][0]['description']
-                    feels_like = weather_data['main']['feels_like']
-                    pressure = weather_data['main']['pressure']
-                    wind_speed = weather_data['wind']['speed']
+                    city_name = weather_data.name
+                    country = weather_data.country
+                    temp = weather_data.temp
+                    humidity = weather_data.humidity
+                    description = weather_data.description
+                    feels_like = weather_data.feels_like
+                    pressure = weather_data.pressure
+                    wind_speed = weather_data.wind_speed
                     
                     self.results_text.insert(tk.END, f"🌤️ Weather in {city_name}, {country}\n")
                     self.results_text.insert(tk.END, "=" * 50 + "\n")
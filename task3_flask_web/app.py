@@ -3,141 +3,125 @@ Task 3: Weather API requests - Flask Web Application
 """
 
 from flask import Flask, render_template, request, jsonify
+from flask.json.provider import JSONProvider
 import requests
+import aiohttp
+import asyncio
 import json
-import random
 import sys
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # Add parent directory to path to access config.py
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
 try:
-    from config import OPENWEATHER_API_KEY, DEFAULT_CITIES_COUNT, REQUEST_TIMEOUT, UNITS
+    from config import OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, DEFAULT_CITIES_COUNT, REQUEST_TIMEOUT, UNITS
 except ImportError:
     # Fallback if config not found
     OPENWEATHER_API_KEY = ""
+    OPENWEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
     DEFAULT_CITIES_COUNT = 5
     REQUEST_TIMEOUT = 10
     UNITS = "metric"
 
+from weather_core import (JSON_MIMETYPE, AsyncWeatherClient, CircuitOpenError, CityNotFoundError,
+                          RateLimitedError, Observation, WeatherClient, compute_statistics,
+                          get_catalog, get_loop_thread, get_running_statistics, json_dumps, json_loads)
+
+
+class FastJSONProvider(JSONProvider):
+    """Route jsonify() and request.get_json() through the shared JSON backend (orjson when installed)"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return json_dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json_loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_dumps(obj), mimetype=JSON_MIMETYPE)
+
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 class WeatherApp:
     def __init__(self, api_key: str):
         """Initialize the Weather App with OpenWeatherMap API key"""
         self.api_key = api_key
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
-        
-        # List of cities for random selection (worldwide cities with Latin names)
-        self.cities = [
-            "London", "Paris", "Tokyo", "New York", "Sydney", "Berlin", "Rome", 
-            "Madrid", "Amsterdam", "Vienna", "Prague", "Warsaw", "Moscow", 
-            "Istanbul", "Cairo", "Dubai", "Mumbai", "Bangkok", "Singapore", 
-            "Seoul", "Beijing", "Shanghai", "Hong Kong", "Taipei", "Manila",
-            "Jakarta", "Kuala Lumpur", "Ho Chi Minh City", "Bangkok", "Dhaka",
-            "Karachi", "Lahore", "Tehran", "Baghdad", "Riyadh", "Kuwait City",
-            "Doha", "Abu Dhabi", "Muscat", "Sanaa", "Amman", "Beirut", "Damascus",
-            "Jerusalem", "Tel Aviv", "Ankara", "Athens", "Sofia", "Bucharest",
-            "Budapest", "Zagreb", "Ljubljana", "Bratislava", "Vilnius", "Riga",
-            "Tallinn", "Helsinki", "Stockholm", "Oslo", "Copenhagen", "Reykjavik",
-            "Dublin", "Edinburgh", "Cardiff", "Belfast", "Lisbon", "Porto",
-            "Barcelona", "Valencia", "Seville", "Bilbao", "Marseille", "Lyon",
-            "Nice", "Toulouse", "Strasbourg", "Lille", "Nantes", "Montpellier",
-            "Bordeaux", "Rennes", "Toulon", "Grenoble", "Dijon", "Angers",
-            "Le Havre", "Saint-Etienne", "Tours", "Limoges", "Amiens", "Perpignan",
-            "Metz", "Besancon", "Boulogne-Billancourt", "Orleans", "Mulhouse",
-            "Rouen", "Caen", "Nancy", "Saint-Denis", "Argenteuil", "Montreuil",
-            "Roubaix", "Tourcoing", "Nanterre", "Avignon", "Creteil", "Dunkirk",
-            "Poitiers", "Asnieres-sur-Seine", "Versailles", "Courbevoie", "Vitry-sur-Seine",
-            "Colombes", "Aulnay-sous-Bois", "La Rochelle", "Rueil-Malmaison", "Antibes",
-            "Saint-Maur-des-Fosses", "Champigny-sur-Marne", "Aubervilliers", "Cannes",
-            "Beziers", "Bourges", "Colmar", "Drancy", "Merignac", "Saint-Nazaire",
-            "Issy-les-Moulineaux", "Noisy-le-Grand", "Evry", "Cergy", "Pessac",
-            "Venissieux", "Clichy", "Ivry-sur-Seine", "Levallois-Perret", "Troyes",
-            "Neuilly-sur-Seine", "Antony", "Lorient", "Sarcelles", "Niort", "Le Mans",
-            "Aix-en-Provence", "Montauban", "Villeurbanne", "Hyeres", "Cholet",
-            "Meudon", "Chambery", "Maisons-Alfort", "Belfort", "Blois", "Annecy",
-            "Boulogne-sur-Mer", "Brive-la-Gaillarde", "Cannes", "Chalon-sur-Saone",
-            "Charleville-Mezieres", "Chartres", "Chateauroux", "Chaumont", "Cherbourg",
-            "Colmar", "Creil", "Dax", "Dieppe", "Douai", "Dreux", "Epinay-sur-Seine",
-            "Evreux", "Frejus", "Gap", "Gennevilliers", "Givors", "Grasse", "Haguenau",
-            "La Ciotat", "La Seyne-sur-Mer", "Laval", "Le Creusot", "Le Havre",
-            "Le Perreux-sur-Marne", "Levallois-Perret", "Libourne", "Lunel", "Macon",
-            "Mantes-la-Jolie", "Martigues", "Meaux", "Melun", "Menton", "Montbeliard",
-            "Montlucon", "Montrouge", "Narbonne", "Neuilly-sur-Marne", "Nogent-sur-Marne",
-            "Palaiseau", "Pantin", "Pierrefitte-sur-Seine", "Plaisir", "Pontault-Combault",
-            "Pontoise", "Rambouillet", "Rosny-sous-Bois", "Rueil-Malmaison", "Saint-Brieuc",
-            "Saint-Chamond", "Saint-Etienne", "Saint-Germain-en-Laye", "Saint-Jean-de-Luz",
-            "Saint-Laurent-du-Var", "Saint-Leu", "Saint-Malo", "Saint-Mande", "Saint-Maur-des-Fosses",
-            "Saint-Michel-sur-Orge", "Saint-Ouen", "Saint-Pol-sur-Mer", "Saint-Priest",
-            "Saint-Quentin", "Saint-Raphael", "Sainte-Genevieves-des-Bois", "Sainte-Maxime",
-            "Salon-de-Provence", "Sartrouville", "Savigny-sur-Orge", "Schiltigheim",
-            "Sevran", "Sotteville-les-Rouen", "Stains", "Sucy-en-Brie", "Suresnes",
-            "Taverny", "Thiais", "Thionville", "Torcy", "Toulon", "Toulouse", "Tourcoing",
-            "Tours", "Trappes", "Tremblay-en-France", "Valence", "Valenciennes", "Vandœuvre-les-Nancy",
-            "Vaulx-en-Velin", "Vaulx-en-Velin", "Vierzon", "Vigneux-sur-Seine", "Villeneuve-d'Ascq",
-            "Villeneuve-la-Garenne", "Villeneuve-Saint-Georges", "Villepinte", "Villeurbanne",
-            "Vincennes", "Viry-Chatillon", "Vitry-sur-Seine", "Wasquehal", "Wattrelos",
-            "Wittenheim", "Yerres", "Yvetot", "Yzeure"
-        ]
+        self.base_url = OPENWEATHER_BASE_URL
+        self.client = WeatherClient(api_key, base_url=self.base_url,
+                                    timeout=REQUEST_TIMEOUT, units=UNITS)
+        self.async_client = AsyncWeatherClient(api_key, base_url=self.base_url,
+                                               timeout=REQUEST_TIMEOUT, units=UNITS)
+        # Flask runs each async view on its own event loop: the async client lives on one long-lived loop
+        self.async_loop = get_loop_thread()
+        
+        # Shared city catalog for random selection (deduplicated, loaded once per process)
+        self.cities = get_catalog()
+        
+        # Running statistics over every observation this process has served
+        self.running_stats = get_running_statistics()
     
-    def get_weather(self, city: str) -> Dict:
+    def get_weather(self, city: str) -> Optional[Observation]:
         """Get weather data for a specific city"""
         try:
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': UNITS
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            data = self.client.get_weather(city)
+            self.running_stats.add(data)
+            return data
+        except (CircuitOpenError, CityNotFoundError, RateLimitedError, requests.exceptions.RequestException) as e:
             print(f"Error fetching weather for {city}: {e}")
             return None
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON for {city}: {e}")
             return None
     
-    def get_random_cities_weather(self, num_cities: int = DEFAULT_CITIES_COUNT) -> List[Dict]:
-        """Get weather data for random cities"""
-        selected_cities = random.sample(self.cities, num_cities)
-        weather_data = []
-        
-        for city in selected_cities:
-            data = self.get_weather(city)
-            if data:
-                weather_data.append(data)
-        
+    def get_random_cities_weather(self, num_cities: int = DEFAULT_CITIES_COUNT, max_workers: int = None,
+                                  deadline: float = None) -> List[Observation]:
+        """Get weather data for random cities, fetched concurrently in batches with a deadline"""
+        selected_cities = self.cities.sample(num_cities)
+        results = self.client.get_weather_many(selected_cities, max_workers=max_workers,
+                                               deadline=deadline)
+        
+        weather_data = [data for city, data in results if data]
+        self.running_stats.update(weather_data)
+        return weather_data
+    
+    async def get_weather_async(self, city: str) -> Optional[Observation]:
+        """Async counterpart of get_weather on the shared aiohttp connector"""
+        try:
+            data = await self.async_loop.run(self.async_client.get_weather(city))
+            self.running_stats.add(data)
+            return data
+        except (CircuitOpenError, CityNotFoundError, RateLimitedError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching weather for {city}: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON for {city}: {e}")
+            return None
+    
+    async def get_random_cities_weather_async(self, num_cities: int = DEFAULT_CITIES_COUNT,
+                                              max_concurrency: int = None,
+                                              deadline: float = None) -> List[Observation]:
+        """Async counterpart of get_random_cities_weather"""
+        selected_cities = self.cities.sample(num_cities)
+        results = await self.async_loop.run(self.async_client.get_weather_many(
+            selected_cities, max_concurrency=max_concurrency, deadline=deadline))
+        
+        weather_data = [data for city, data in results if data]
+        self.running_stats.update(weather_data)
         return weather_data
     
-    def calculate_statistics(self, weather_data: List[Dict]) -> Dict:
+    def calculate_statistics(self, weather_data: List[Observation]) -> Dict:
         """Calculate weather statistics from the data"""
         if not weather_data:
             return {"error": "No weather data available"}
         
-        temperatures = [data['main']['temp'] for data in weather_data]
-        cities = [data['name'] for data in weather_data]
-        
-        # Find coldest city
-        coldest_index = temperatures.index(min(temperatures))
-        coldest_city = cities[coldest_index]
-        coldest_temp = temperatures[coldest_index]
-        
-        # Calculate average temperature
-        avg_temp = sum(temperatures) / len(temperatures)
-        
-        return {
-            "coldest_city": coldest_city,
-            "coldest_temperature": coldest_temp,
-            "average_temperature": avg_temp,
-            "total_cities": len(weather_data)
-        }
+        # Coldest city, averages, percentiles and per-country breakdown (vectorized with NumPy when installed)
+        return compute_statistics(weather_data)
 
 # Initialize weather app
 weather_app = WeatherApp(OPENWEATHER_API_KEY)
@@ -150,13 +134,13 @@ def index():
                          api_key_status="✅ Configured" if OPENWEATHER_API_KEY else "❌ Not configured")
 
 @app.route('/api/random-weather', methods=['POST'])
-def get_random_weather():
+async def get_random_weather():
     """API endpoint to get weather for random cities"""
     try:
         if not OPENWEATHER_API_KEY:
             return jsonify({"error": "API key not configured"}), 400
         
-        weather_data = weather_app.get_random_cities_weather(5)
+        weather_data = await weather_app.get_random_cities_weather_async(5)
         
         if not weather_data:
             return jsonify({"error": "Failed to fetch weather data"}), 500
@@ -166,7 +150,7 @@ def get_random_weather():
         
         return jsonify({
             "success": True,
-            "weather_data": weather_data,
+            "weather_data": [data.to_dict() for data in weather_data],
             "statistics": stats
         })
     
@@ -174,7 +158,7 @@ def get_random_weather():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/city-weather', methods=['POST'])
-def get_city_weather():
+async def get_city_weather():
     """API endpoint to get weather for a specific city"""
     try:
         if not OPENWEATHER_API_KEY:
@@ -186,14 +170,14 @@ def get_city_weather():
         if not city:
             return jsonify({"error": "City name is required"}), 400
         
-        weather_data = weather_app.get_weather(city)
+        weather_data = await weather_app.get_weather_async(city)
         
         if not weather_data:
             return jsonify({"error": f"Could not find weather data for {city}"}), 404
         
         return jsonify({
             "success": True,
-            "weather_data": weather_data
+            "weather_data": weather_data.to_dict()
         })
     
     except Exception as e:
@@ -206,6 +190,12 @@ def api_status():
         "status": "running",
         "api_key_configured": bool(OPENWEATHER_API_KEY),
         "cities_available": len(weather_app.cities),
+        "cache": weather_app.client.cache.stats(),
+        "negative_cache": weather_app.client.negative_cache.stats(),
+        "single_flight": weather_app.client.single_flight.stats(),
+        "circuit_breaker": weather_app.client.breaker.stats(),
+        "rate_limiter": weather_app.client.rate_limiter.stats(),
+        "running_statistics": weather_app.running_stats.result(),
         "version": "Task 3 - Flask Web Application"
     })
 
@@ -131,15 +131,15 @@ function createWeatherCard(cityData) {
     const card = $(template);
 
     card.find('.city').text(cityData.name);
-    card.find('.country').text(cityData.sys.country);
-    card.find('.temp-value').text(Math.round(cityData.main.temp));
-    card.find('.feels-value').text(Math.round(cityData.main.feels_like));
-    card.find('.condition-text').text(cityData.weather[0].description);
-    card.find('.humidity').text(cityData.main.humidity);
-    card.find('.pressure').text(cityData.main.pressure);
-    card.find('.wind-speed').text(cityData.wind.speed);
-
-    const weatherIcon = getWeatherIcon(cityData.weather[0].main);
+    card.find('.country').text(cityData.country);
+    card.find('.temp-value').text(Math.round(cityData.temp));
+    card.find('.feels-value').text(Math.round(cityData.feels_like));
+    card.find('.condition-text').text(cityData.description);
+    card.find('.humidity').text(cityData.humidity);
+    card.find('.pressure').text(cityData.pressure);
+    card.find('.wind-speed').text(cityData.wind_speed);
+
+    const weatherIcon = getWeatherIcon(cityData.condition);
     card.find('.weather-icon i').removeClass().addClass(weatherIcon);
 
     return card;
@@ -149,15 +149,15 @@ function createSingleCityCard(cityData) {
     const template = $('#singleCityTemplate').html();
     const card = $(template);
 
-    card.find('.city-name').text(`${cityData.name}, ${cityData.sys.country}`);
-    card.find('.temp-value').text(Math.round(cityData.main.temp));
-    card.find('.feels-value').text(Math.round(cityData.main.feels_like));
-    card.find('.condition-text').text(cityData.weather[0].description);
-    card.find('.humidity').text(cityData.main.humidity);
-    card.find('.pressure').text(cityData.main.pressure);
-    card.find('.wind-speed').text(cityData.wind.speed);
+    card.find('.city-name').text(`${cityData.name}, ${cityData.country}`);
+    card.find('.temp-value').text(Math.round(cityData.temp));
+    card.find('.feels-value').text(Math.round(cityData.feels_like));
+    card.find('.condition-text').text(cityData.description);
+    card.find('.humidity').text(cityData.humidity);
+    card.find('.pressure').text(cityData.pressure);
+    card.find('.wind-speed').text(cityData.wind_speed);
 
-    const weatherIcon = getWeatherIcon(cityData.weather[0].main);
+    const weatherIcon = getWeatherIcon(cityData.condition);
     card.find('.weather-icon i').removeClass().addClass(weatherIcon);
 
     return card;
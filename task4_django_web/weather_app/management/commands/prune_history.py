@@ -0,0 +1,47 @@
+"""
+Archive and delete history rows past their retention period
+Run it daily from cron, or let Celery beat schedule weather_app.tasks.prune_history
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from weather_app.retention import RETAINED_MODELS, RetentionJob
+
+
+class Command(BaseCommand):
+    help = "Archive rows older than WEATHER_RETENTION_DAYS to compressed files and delete them in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=sorted(RETAINED_MODELS),
+                            help="only prune this model (repeatable); default: every model in WEATHER_RETENTION_DAYS")
+        parser.add_argument('--days', type=int, help="keep this many days instead of the configured periods")
+        parser.add_argument('--chunk-size', type=int, default=settings.WEATHER_RETENTION_CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=settings.WEATHER_RETENTION_PAUSE,
+                            help="seconds between chunks")
+        parser.add_argument('--archive-dir', default=settings.WEATHER_ARCHIVE_DIR)
+        parser.add_argument('--no-archive', action='store_true', help="delete without archiving")
+        parser.add_argument('--dry-run', action='store_true', help="only count the rows that would be pruned")
+
+    def handle(self, *args, **options):
+        names = options['model'] or list(settings.WEATHER_RETENTION_DAYS)
+        retention_days = {}
+        for name in names:
+            days = options['days'] if options['days'] is not None else settings.WEATHER_RETENTION_DAYS.get(name)
+            if days is None:
+                raise CommandError(f"{name} has no retention period, pass --days")
+            retention_days[name] = days
+
+        job = RetentionJob(archive_dir=None if options['no_archive'] else options['archive_dir'],
+                           chunk_size=options['chunk_size'], pause=options['pause'])
+        results = job.run(retention_days, dry_run=options['dry_run'])
+
+        for name, result in results.items():
+            if options['dry_run']:
+                self.stdout.write(f"{name}: {result['rows']} rows older than {result['cutoff']} would be pruned")
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: pruned {result['rows']} rows older than {result['cutoff']} in {result['chunks']} chunks, "
+                f"{result['seconds']}s ({result['rows_per_second']} rows/s)"))
+            for path in result['archives']:
+                self.stdout.write(f"  archived to {path}")
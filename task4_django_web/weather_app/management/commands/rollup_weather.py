@@ -0,0 +1,46 @@
+"""
+Catch up the weather and request rollups from the raw history tables
+By default each table recomputes only the days since its newest rollup, one day per transaction
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from weather_app.models import CityWeatherRollup, RequestRollup
+from weather_app.rollups import UTC, rebuild_requests, rebuild_weather
+
+
+class Command(BaseCommand):
+    help = "Recompute CityWeatherRollup and RequestRollup rows from WeatherData and WeatherRequest"
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group()
+        scope.add_argument('--since', help="rebuild from this day on (YYYY-MM-DD, UTC)")
+        scope.add_argument('--all', action='store_true', help="rebuild every rollup the remaining raw history covers")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            since = {'weather': None, 'requests': None}
+        elif options['since']:
+            try:
+                day = datetime.datetime.strptime(options['since'], '%Y-%m-%d').replace(tzinfo=UTC)
+            except ValueError:
+                raise CommandError(f"--since expects YYYY-MM-DD, got {options['since']!r}")
+            since = {'weather': day, 'requests': day}
+        else:
+            # Each table catches up from its own newest rollup, e.g. after rollups were not maintained for a while;
+            # from its oldest raw row when it has none yet
+            since = {'weather': CityWeatherRollup.objects.aggregate(newest=Max('bucket'))['newest'],
+                     'requests': RequestRollup.objects.aggregate(newest=Max('bucket'))['newest']}
+
+        city_rows = rebuild_weather(since['weather'])
+        request_rows = rebuild_requests(since['requests'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt rollups: {city_rows} city rows {self.scope(since['weather'])}, "
+            f"{request_rows} request rows {self.scope(since['requests'])}"))
+
+    @staticmethod
+    def scope(since) -> str:
+        return f"since {since:%Y-%m-%d}" if since else "from the oldest raw row"
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0002_weatherrequest_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['country'], name='city_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['-timestamp', '-id'], name='weatherdata_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['city', '-timestamp'], name='weatherdata_city_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['weather_main', '-timestamp'], name='weatherdata_main_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherrequest',
+            index=models.Index(fields=['-timestamp', '-id'], name='weatherrequest_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherrequest',
+            index=models.Index(fields=['request_type', 'success', '-timestamp'], name='weatherrequest_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherstatistics',
+            index=models.Index(fields=['-calculation_timestamp', '-id'], name='weatherstats_recent_idx'),
+        ),
+    ]
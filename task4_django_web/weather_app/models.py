@@ -15,6 +15,10 @@ class City(models.Model):
     class Meta:
         verbose_name_plural = "Cities"
         ordering = ['name']
+        indexes = [
+            # Admin country filter on cities and on weather data (city__country)
+            models.Index(fields=['country'], name='city_country_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.country}"
@@ -38,6 +42,14 @@ class WeatherData(models.Model):
     class Meta:
         verbose_name_plural = "Weather Data"
         ordering = ['-timestamp']
+        indexes = [
+            # Newest rows first (history page, admin list), id breaks timestamp ties
+            models.Index(fields=['-timestamp', '-id'], name='weatherdata_recent_idx'),
+            # One city's history, newest first
+            models.Index(fields=['city', '-timestamp', '-id'], name='weatherdata_city_recent_idx'),
+            # Admin weather_main filter, in the change list's (-timestamp, -id) order
+            models.Index(fields=['weather_main', '-timestamp', '-id'], name='weatherdata_main_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.city.name} - {self.temperature}°C - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -56,10 +68,21 @@ class WeatherRequest(models.Model):
     success = models.BooleanField()
     response_time = models.FloatField(null=True, blank=True)  # in seconds
     error_message = models.TextField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the request is logged, not when the buffered row is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Newest rows first (history page, admin list), id breaks timestamp ties
+            models.Index(fields=['-timestamp', '-id'], name='weatherrequest_recent_idx'),
+            # Admin request_type filter, in the change list's (-timestamp, -id) order. success is left out:
+            # SQLite compiles success=False to NOT success, which cannot match an index column
+            models.Index(fields=['request_type', '-timestamp', '-id'], name='weatherrequest_type_idx'),
+            # Admin success=False filter, alone or with request_type: failures are a small share of the log
+            models.Index(fields=['-timestamp', '-id'], condition=models.Q(success=False),
+                         name='weatherrequest_failed_idx'),
+        ]
 
     def __str__(self):
         status = "Success" if self.success else "Failed"
@@ -77,6 +100,64 @@ class WeatherStatistics(models.Model):
     class Meta:
         verbose_name_plural = "Weather Statistics"
         ordering = ['-calculation_timestamp']
+        indexes = [
+            models.Index(fields=['-calculation_timestamp', '-id'], name='weatherstats_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats - {self.coldest_city} ({self.coldest_temperature}°C) - {self.calculation_timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class CityWeatherRollup(models.Model):
+    """Temperature aggregates per city for one hour or one day, maintained as WeatherData is written"""
+    PERIODS = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=4, choices=PERIODS)
+    bucket = models.DateTimeField()  # start of the hour or day, UTC
+    sample_count = models.IntegerField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    # Sum rather than average, so new samples can be added to a bucket in place
+    temperature_sum = models.FloatField()
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'period', 'bucket'], name='cityweatherrollup_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['period', '-bucket'], name='cityweatherrollup_recent_idx'),
+        ]
+
+    @property
+    def temperature_avg(self) -> float:
+        return self.temperature_sum / self.sample_count
+
+    def __str__(self):
+        return f"{self.city.name} - {self.period} {self.bucket.strftime('%Y-%m-%d %H:%M')} ({self.sample_count} samples)"
+
+
+class RequestRollup(models.Model):
+    """Request counts and latency per request type for one minute, maintained as WeatherRequest is written"""
+    request_type = models.CharField(max_length=20, choices=WeatherRequest.REQUEST_TYPES)
+    bucket = models.DateTimeField()  # start of the minute, UTC
+    request_count = models.IntegerField()
+    error_count = models.IntegerField()
+    latency_sum = models.FloatField()  # in seconds
+    latency_max = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['request_type', 'bucket'], name='requestrollup_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['-bucket'], name='requestrollup_recent_idx'),
+        ]
 
     def __str__(self):
-        return f"Stats - {self.coldest_city} ({self.coldest_temperature}°C) - {self.calculation_timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.request_type} - {self.bucket.strftime('%Y-%m-%d %H:%M')} ({self.request_count} requests)"
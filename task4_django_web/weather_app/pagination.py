@@ -0,0 +1,138 @@
+"""
+Keyset (cursor) pagination of the history tables over (timestamp, id), newest first
+A page is one range scan on the (-timestamp, -id) indexes however deep it is: no COUNT(*), no OFFSET
+"""
+
+import base64
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import F, Q, QuerySet
+
+from .models import WeatherData, WeatherRequest, WeatherStatistics
+
+MAX_PAGE_SIZE = 100
+
+# Feed name -> (model, timestamp field, fields of the JSON rows, renamed related fields)
+HISTORY_FEEDS = {
+    'weather': (WeatherData, 'timestamp', (
+        'id', 'temperature', 'feels_like', 'humidity', 'pressure', 'wind_speed', 'weather_main',
+        'weather_description', 'timestamp'), {'city_name': F('city__name'), 'country': F('city__country')}),
+    'requests': (WeatherRequest, 'timestamp', (
+        'id', 'request_type', 'city_name', 'success', 'response_time', 'error_message', 'timestamp'), {}),
+    'statistics': (WeatherStatistics, 'calculation_timestamp', (
+        'id', 'coldest_city', 'coldest_temperature', 'average_temperature', 'total_cities',
+        'calculation_timestamp'), {}),
+}
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not produced by encode_cursor()"""
+
+
+def encode_cursor(timestamp: datetime.datetime, pk: int) -> str:
+    """Opaque, URL-safe cursor for the position right after (timestamp, pk)"""
+    raw = f'{timestamp.isoformat()}|{pk}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """
+    Return the (timestamp, id) position a cursor points after
+
+    Raises:
+        InvalidCursor: The cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        timestamp, pk = raw.split('|')
+        timestamp = datetime.datetime.fromisoformat(timestamp)
+        pk = int(pk)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}") from e
+    if timestamp.tzinfo is None:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}")
+    return timestamp, pk
+
+
+class KeysetPage:
+    """One page of rows, newest first, and the cursor of the next (older) page"""
+
+    __slots__ = ('items', 'next_cursor', 'older_url', 'newest_url')
+
+    def __init__(self, items: List, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+        # Set by the HTML view
+        self.older_url = None
+        self.newest_url = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def keyset_queryset(queryset: QuerySet, field: str, cursor: Optional[str] = None) -> QuerySet:
+    """
+    Order queryset by (field, id) descending, starting right after cursor
+
+    Raises:
+        InvalidCursor: The cursor is malformed
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if not cursor:
+        return queryset
+    timestamp, pk = decode_cursor(cursor)
+    # (field, id) < (timestamp, pk), spelled so the index range starts at timestamp
+    return queryset.filter(**{f'{field}__lte': timestamp}).filter(
+        Q(**{f'{field}__lt': timestamp}) | Q(id__lt=pk))
+
+
+def keyset_page(queryset: QuerySet, field: str, cursor: Optional[str] = None, page_size: int = 20) -> KeysetPage:
+    """
+    Fetch the page of queryset that follows cursor, ordered by (field, id) descending
+
+    Args:
+        queryset (QuerySet): Rows to page through, model instances or values() dicts
+        field (str): Timestamp field of the model
+        cursor (str): next_cursor of the previous page, None for the newest page
+        page_size (int): Rows per page, capped at MAX_PAGE_SIZE
+
+    Returns:
+        KeysetPage: The rows, and next_cursor when older rows exist
+
+    Raises:
+        InvalidCursor: The cursor is malformed
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    # One extra row tells whether an older page exists without counting
+    rows = list(keyset_queryset(queryset, field, cursor)[:page_size + 1])
+    if len(rows) <= page_size:
+        return KeysetPage(rows, None)
+    rows = rows[:page_size]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return KeysetPage(rows, encode_cursor(last[field], last['id']))
+    return KeysetPage(rows, encode_cursor(getattr(last, field), last.pk))
+
+
+def feed_page(feed: str, cursor: Optional[str] = None, page_size: int = 20) -> Dict:
+    """
+    JSON-ready page of one history feed
+
+    Args:
+        feed (str): Key of HISTORY_FEEDS
+        cursor (str): next_cursor of the previous page
+        page_size (int): Rows per page, capped at MAX_PAGE_SIZE
+
+    Returns:
+        Dict: feed, results, next_cursor and has_next
+    """
+    model, field, fields, related = HISTORY_FEEDS[feed]
+    page = keyset_page(model.objects.values(*fields, **related), field, cursor, page_size)
+    return {
+        'feed': feed,
+        'results': page.items,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    }
@@ -0,0 +1,133 @@
+"""
+Retention of the history tables: archive old rows to compressed files, then delete them
+Rows move in small chunks, each its own short transaction, so live requests never wait long for the write lock
+"""
+
+import datetime
+import gzip
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from weather_core import json_dumps
+
+from .caching import invalidate_history
+from .models import WeatherData, WeatherRequest, WeatherStatistics
+
+# Model name -> (model, timestamp field); the names are the keys of WEATHER_RETENTION_DAYS
+RETAINED_MODELS = {
+    'WeatherRequest': (WeatherRequest, 'timestamp'),
+    'WeatherStatistics': (WeatherStatistics, 'calculation_timestamp'),
+    'WeatherData': (WeatherData, 'timestamp'),
+}
+
+
+class RetentionJob:
+    """
+    Move rows older than their retention period from the database to the archive
+
+    Each chunk is appended to a gzip file per table and month
+    (<archive_dir>/<table>-YYYY-MM.jsonl.gz, one JSON document per row),
+    flushed to disk, and only then deleted. Every append adds a gzip member,
+    so existing archive bytes are never rewritten and gzip.open() reads a
+    file back as one stream. A crash between the append and the delete
+    archives that chunk twice on the next run; it is never lost.
+    """
+
+    def __init__(self, archive_dir: Optional[str] = settings.WEATHER_ARCHIVE_DIR,
+                 chunk_size: int = settings.WEATHER_RETENTION_CHUNK_SIZE,
+                 pause: float = settings.WEATHER_RETENTION_PAUSE):
+        """
+        Initialize the job
+
+        Args:
+            archive_dir (str): Directory for the archive files, None to delete without archiving
+            chunk_size (int): Rows archived and deleted per transaction
+            pause (float): Seconds to sleep between chunks so other writers get the lock
+        """
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        self.pause = pause
+
+    def run(self, retention_days: Dict[str, int] = None, dry_run: bool = False) -> Dict[str, Dict]:
+        """
+        Prune every model with a retention period
+
+        Args:
+            retention_days (Dict[str, int]): Model name -> days to keep, WEATHER_RETENTION_DAYS by default
+            dry_run (bool): Only count the rows that would be pruned
+
+        Returns:
+            Dict[str, Dict]: Per model name, the result of prune()
+        """
+        if retention_days is None:
+            retention_days = settings.WEATHER_RETENTION_DAYS
+        return {name: self.prune(name, days, dry_run=dry_run) for name, days in retention_days.items()}
+
+    def prune(self, name: str, days: int, dry_run: bool = False) -> Dict:
+        """
+        Archive and delete the rows of one model older than days
+
+        Args:
+            name (str): Key of RETAINED_MODELS
+            days (int): Days to keep
+            dry_run (bool): Only count the rows that would be pruned
+
+        Returns:
+            Dict: rows, chunks, seconds, rows_per_second, cutoff and the archive files written
+        """
+        model, field = RETAINED_MODELS[name]
+        cutoff = timezone.now() - datetime.timedelta(days=days)
+        expired = model.objects.filter(**{f'{field}__lt': cutoff}).order_by(field, 'id')
+        result = {'rows': 0, 'chunks': 0, 'cutoff': cutoff.isoformat(), 'archives': []}
+        started = time.perf_counter()
+
+        if dry_run:
+            result['rows'] = expired.count()
+        else:
+            while True:
+                # Expired rows are never written by live traffic, so they are read outside the transaction
+                # and the write lock is held for the DELETE alone
+                rows = list(expired.values()[:self.chunk_size])
+                if not rows:
+                    break
+                if self.archive_dir is not None:
+                    for path in self._archive(model, field, rows):
+                        if path not in result['archives']:
+                            result['archives'].append(path)
+                with transaction.atomic():
+                    model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+                result['rows'] += len(rows)
+                result['chunks'] += 1
+                if len(rows) < self.chunk_size:
+                    break
+                time.sleep(self.pause)
+
+        if result['rows'] and not dry_run:
+            invalidate_history()
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        result['rows_per_second'] = round(result['rows'] / result['seconds']) if result['seconds'] else 0
+        return result
+
+    def _archive(self, model, field: str, rows: List[Dict]) -> List[str]:
+        """Append rows to their monthly archive files and make them durable, returning the paths"""
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[row[field].strftime('%Y-%m')].append(json_dumps(row))
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        paths = []
+        for month, lines in by_month.items():
+            path = os.path.join(self.archive_dir, f'{model._meta.db_table}-{month}.jsonl.gz')
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                    archive.write(b'\n'.join(lines) + b'\n')
+                raw.flush()
+                os.fsync(raw.fileno())
+            paths.append(path)
+        return paths
@@ -0,0 +1,18 @@
+"""
+Background tasks for Celery beat (optional)
+Without Celery the same jobs run from cron through their management commands
+"""
+
+try:
+    from celery import shared_task
+except ImportError:
+    # Celery is optional: schedule `manage.py prune_history` instead
+    shared_task = None
+
+if shared_task is not None:
+    @shared_task(name='weather_app.tasks.prune_history')
+    def prune_history():
+        """Archive and delete the rows past WEATHER_RETENTION_DAYS, returning the per-model report"""
+        from .retention import RetentionJob
+
+        return RetentionJob().run()
@@ -1,19 +1,45 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from asgiref.sync import sync_to_async
 import requests
+import aiohttp
+import asyncio
 import json
-import random
+import logging
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
 
-from .models import City, WeatherData, WeatherRequest, WeatherStatistics
+from weather_core import (JSON_MIMETYPE, AsyncWeatherClient, CircuitOpenError, CityNotFoundError,
+                          RateLimitedError, Observation, WeatherClient, compute_statistics,
+                          get_catalog, get_loop_thread, get_running_statistics, json_dumps, json_loads)
+
+from .models import City, CityWeatherRollup, WeatherData, WeatherRequest, WeatherStatistics
+from .persistence import get_weather_store
+from .request_log import get_request_log
+from .rollups import request_summary
+from .pagination import HISTORY_FEEDS, InvalidCursor, feed_page, keyset_page
 from .forms import CitySearchForm, WeatherPreferencesForm
+from .caching import (aget_observation, aset_observation, history_key, invalidate_history,
+                      status_key, view_ttl)
+
+logger = logging.getLogger(__name__)
+
+
+class ApiJsonResponse(HttpResponse):
+    """JsonResponse counterpart encoded with the shared JSON backend (orjson when installed)"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', JSON_MIMETYPE)
+        super().__init__(content=json_dumps(data), **kwargs)
 
 
 class WeatherApp:
@@ -21,93 +47,54 @@ class WeatherApp:
     
     def __init__(self):
         self.api_key = settings.WEATHER_API_KEY
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.base_url = settings.WEATHER_BASE_URL
         self.timeout = settings.WEATHER_REQUEST_TIMEOUT
         self.units = settings.WEATHER_UNITS
+        self.client = WeatherClient(self.api_key, base_url=self.base_url,
+                                    timeout=self.timeout, units=self.units)
+        self.async_client = AsyncWeatherClient(self.api_key, base_url=self.base_url,
+                                               timeout=self.timeout, units=self.units)
+        # Async views run on a per-request loop under WSGI: the async client lives on one long-lived loop
+        self.async_loop = get_loop_thread()
         
-        # List of cities for random selection
-        self.cities = [
-            "London", "Paris", "Tokyo", "New York", "Sydney", "Berlin", "Rome", 
-            "Madrid", "Amsterdam", "Vienna", "Prague", "Warsaw", "Moscow", 
-            "Istanbul", "Cairo", "Dubai", "Mumbai", "Bangkok", "Singapore", 
-            "Seoul", "Beijing", "Shanghai", "Hong Kong", "Taipei", "Manila",
-            "Jakarta", "Kuala Lumpur", "Ho Chi Minh City", "Bangkok", "Dhaka",
-            "Karachi", "Lahore", "Tehran", "Baghdad", "Riyadh", "Kuwait City",
-            "Doha", "Abu Dhabi", "Muscat", "Sanaa", "Amman", "Beirut", "Damascus",
-            "Jerusalem", "Tel Aviv", "Ankara", "Athens", "Sofia", "Bucharest",
-            "Budapest", "Zagreb", "Ljubljana", "Bratislava", "Vilnius", "Riga",
-            "Tallinn", "Helsinki", "Stockholm", "Oslo", "Copenhagen", "Reykjavik",
-            "Dublin", "Edinburgh", "Cardiff", "Belfast", "Lisbon", "Porto",
-            "Barcelona", "Valencia", "Seville", "Bilbao", "Marseille", "Lyon",
-            "Nice", "Toulouse", "Strasbourg", "Lille", "Nantes", "Montpellier",
-            "Bordeaux", "Rennes", "Toulon", "Grenoble", "Dijon", "Angers",
-            "Le Havre", "Saint-Etienne", "Tours", "Limoges", "Amiens", "Perpignan",
-            "Metz", "Besancon", "Boulogne-Billancourt", "Orleans", "Mulhouse",
-            "Rouen", "Caen", "Nancy", "Saint-Denis", "Argenteuil", "Montreuil",
-            "Roubaix", "Tourcoing", "Nanterre", "Avignon", "Creteil", "Dunkirk",
-            "Poitiers", "Asnieres-sur-Seine", "Versailles", "Courbevoie", "Vitry-sur-Seine",
-            "Colombes", "Aulnay-sous-Bois", "La Rochelle", "Rueil-Malmaison", "Antibes",
-            "Saint-Maur-des-Fosses", "Champigny-sur-Marne", "Aubervilliers", "Cannes",
-            "Beziers", "Bourges", "Colmar", "Drancy", "Merignac", "Saint-Nazaire",
-            "Issy-les-Moulineaux", "Noisy-le-Grand", "Evry", "Cergy", "Pessac",
-            "Venissieux", "Clichy", "Ivry-sur-Seine", "Levallois-Perret", "Troyes",
-            "Neuilly-sur-Seine", "Antony", "Lorient", "Sarcelles", "Niort", "Le Mans",
-            "Aix-en-Provence", "Montauban", "Villeurbanne", "Hyeres", "Cholet",
-            "Meudon", "Chambery", "Maisons-Alfort", "Belfort", "Blois", "Annecy",
-            "Boulogne-sur-Mer", "Brive-la-Gaillarde", "Cannes", "Chalon-sur-Saone",
-            "Charleville-Mezieres", "Chartres", "Chateauroux", "Chaumont", "Cherbourg",
-            "Colmar", "Creil", "Dax", "Dieppe", "Douai", "Dreux", "Epinay-sur-Seine",
-            "Evreux", "Frejus", "Gap", "Gennevilliers", "Givors", "Grasse", "Haguenau",
-            "La Ciotat", "La Seyne-sur-Mer", "Laval", "Le Creusot", "Le Havre",
-            "Le Perreux-sur-Marne", "Levallois-Perret", "Libourne", "Lunel", "Macon",
-            "Mantes-la-Jolie", "Martigues", "Meaux", "Melun", "Menton", "Montbeliard",
-            "Montlucon", "Montrouge", "Narbonne", "Neuilly-sur-Marne", "Nogent-sur-Marne",
-            "Palaiseau", "Pantin", "Pierrefitte-sur-Seine", "Plaisir", "Pontault-Combault",
-            "Pontoise", "Rambouillet", "Rosny-sous-Bois", "Rueil-Malmaison", "Saint-Brieuc",
-            "Saint-Chamond", "Saint-Etienne", "Saint-Germain-en-Laye", "Saint-Jean-de-Luz",
-            "Saint-Laurent-du-Var", "Saint-Leu", "Saint-Malo", "Saint-Mande", "Saint-Maur-des-Fosses",
-            "Saint-Michel-sur-Orge", "Saint-Ouen", "Saint-Pol-sur-Mer", "Saint-Priest",
-            "Saint-Quentin", "Saint-Raphael", "Sainte-Genevieves-des-Bois", "Sainte-Maxime",
-            "Salon-de-Provence", "Sartrouville", "Savigny-sur-Orge", "Schiltigheim",
-            "Sevran", "Sotteville-les-Rouen", "Stains", "Sucy-en-Brie", "Suresnes",
-            "Taverny", "Thiais", "Thionville", "Torcy", "Toulon", "Toulouse", "Tourcoing",
-            "Tours", "Trappes", "Tremblay-en-France", "Valence", "Valenciennes", "Vandœuvre-les-Nancy",
-            "Vaulx-en-Velin", "Vaulx-en-Velin", "Vierzon", "Vigneux-sur-Seine", "Villeneuve-d'Ascq",
-            "Villeneuve-la-Garenne", "Villeneuve-Saint-Georges", "Villepinte", "Villeurbanne",
-            "Vincennes", "Viry-Chatillon", "Vitry-sur-Seine", "Wasquehal", "Wattrelos",
-            "Wittenheim", "Yerres", "Yvetot", "Yzeure"
-        ]
+        # Shared city catalog for random selection (deduplicated, loaded once per process)
+        self.cities = get_catalog()
+        
+        # Running statistics over every observation this process has served
+        self.running_stats = get_running_statistics()
+        
+        # Fetched observations are stored as City/WeatherData history, one transaction per batch
+        self.store = get_weather_store()
+        
+        # WeatherRequest rows are queued and bulk-written off the request path
+        self.request_log = get_request_log()
     
-    def get_weather(self, city: str) -> Dict:
+    def get_weather(self, city: str) -> Optional[Observation]:
         """Get weather data for a specific city"""
         start_time = time.time()
         try:
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': self.units
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
+            data = self.client.get_weather(city)
+            self.running_stats.add(data)
             response_time = time.time() - start_time
-            data = response.json()
             
             # Log successful request
-            WeatherRequest.objects.create(
+            self.request_log.log(
                 request_type='city',
                 city_name=city,
                 success=True,
                 response_time=response_time
             )
+            self.save_history([data])
             
             return data
             
+        except (CircuitOpenError, CityNotFoundError, RateLimitedError):
+            # Answered locally (negative cache, open circuit, rate limit), no upstream request to log
+            return None
         except requests.exceptions.RequestException as e:
             response_time = time.time() - start_time
             # Log failed request
-            WeatherRequest.objects.create(
+            self.request_log.log(
                 request_type='city',
                 city_name=city,
                 success=False,
@@ -117,7 +104,7 @@ class WeatherApp:
             return None
         except json.JSONDecodeError as e:
             response_time = time.time() - start_time
-            WeatherRequest.objects.create(
+            self.request_log.log(
                 request_type='city',
                 city_name=city,
                 success=False,
@@ -126,48 +113,114 @@ class WeatherApp:
             )
             return None
     
-    def get_random_cities_weather(self, num_cities: int = 5) -> List[Dict]:
-        """Get weather data for random cities"""
-        selected_cities = random.sample(self.cities, num_cities)
-        weather_data = []
+    def get_random_cities_weather(self, num_cities: int = 5, max_workers: int = None,
+                                  deadline: float = None) -> List[Observation]:
+        """Get weather data for random cities, fetched concurrently in batches with a deadline"""
+        start_time = time.time()
+        selected_cities = self.cities.sample(num_cities)
+        results = self.client.get_weather_many(selected_cities, max_workers=max_workers,
+                                               deadline=deadline)
         
-        for city in selected_cities:
-            data = self.get_weather(city)
-            if data:
-                weather_data.append(data)
+        # Log the whole batch as one request
+        self.request_log.log(**self._random_request_log(results, time.time() - start_time))
         
+        weather_data = [data for city, data in results if data]
+        self.running_stats.update(weather_data)
+        self.save_history(weather_data)
         return weather_data
     
-    def calculate_statistics(self, weather_data: List[Dict]) -> Dict:
+    def _random_request_log(self, results: List, response_time: float) -> Dict:
+        """Build the WeatherRequest fields for a random-cities batch"""
+        failed = [city for city, data in results if not data]
+        return {
+            'request_type': 'random',
+            'success': len(failed) < len(results),
+            'response_time': response_time,
+            'error_message': f"No data for: {', '.join(failed)}" if failed else None,
+        }
+    
+    async def get_weather_async(self, city: str) -> Optional[Observation]:
+        """Async counterpart of get_weather on the shared aiohttp connector"""
+        start_time = time.time()
+        try:
+            data = await self.async_loop.run(self.async_client.get_weather(city))
+            self.running_stats.add(data)
+            response_time = time.time() - start_time
+            
+            # Log successful request
+            self.request_log.log(
+                request_type='city',
+                city_name=city,
+                success=True,
+                response_time=response_time
+            )
+            await sync_to_async(self.save_history)([data])
+            
+            return data
+            
+        except (CircuitOpenError, CityNotFoundError, RateLimitedError):
+            # Answered locally (negative cache, open circuit, rate limit), no upstream request to log
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            response_time = time.time() - start_time
+            # Log failed request
+            self.request_log.log(
+                request_type='city',
+                city_name=city,
+                success=False,
+                response_time=response_time,
+                error_message=str(e) or e.__class__.__name__
+            )
+            return None
+        except json.JSONDecodeError as e:
+            response_time = time.time() - start_time
+            self.request_log.log(
+                request_type='city',
+                city_name=city,
+                success=False,
+                response_time=response_time,
+                error_message=f"JSON decode error: {str(e)}"
+            )
+            return None
+    
+    async def get_random_cities_weather_async(self, num_cities: int = 5, max_concurrency: int = None,
+                                              deadline: float = None) -> List[Observation]:
+        """Async counterpart of get_random_cities_weather"""
+        start_time = time.time()
+        selected_cities = self.cities.sample(num_cities)
+        results = await self.async_loop.run(self.async_client.get_weather_many(
+            selected_cities, max_concurrency=max_concurrency, deadline=deadline))
+        
+        self.request_log.log(**self._random_request_log(results, time.time() - start_time))
+        
+        weather_data = [data for city, data in results if data]
+        self.running_stats.update(weather_data)
+        await sync_to_async(self.save_history)(weather_data)
+        return weather_data
+    
+    def save_history(self, observations: List[Observation]) -> None:
+        """Store fetched observations as history; a database error is logged, the lookup still succeeds"""
+        try:
+            self.store.save(observations)
+        except DatabaseError:
+            logger.exception("Could not store %d observations in the weather history", len(observations))
+    
+    def calculate_statistics(self, weather_data: List[Observation]) -> Dict:
         """Calculate weather statistics from the data"""
         if not weather_data:
             return {"error": "No weather data available"}
         
-        temperatures = [data['main']['temp'] for data in weather_data]
-        cities = [data['name'] for data in weather_data]
-        
-        # Find coldest city
-        coldest_index = temperatures.index(min(temperatures))
-        coldest_city = cities[coldest_index]
-        coldest_temp = temperatures[coldest_index]
-        
-        # Calculate average temperature
-        avg_temp = sum(temperatures) / len(temperatures)
-        
-        stats = {
-            "coldest_city": coldest_city,
-            "coldest_temperature": coldest_temp,
-            "average_temperature": avg_temp,
-            "total_cities": len(weather_data)
-        }
+        # Coldest city, averages, percentiles and per-country breakdown (vectorized with NumPy when installed)
+        stats = compute_statistics(weather_data)
         
         # Save statistics to database
         WeatherStatistics.objects.create(
-            coldest_city=coldest_city,
-            coldest_temperature=coldest_temp,
-            average_temperature=avg_temp,
-            total_cities=len(weather_data)
+            coldest_city=stats["coldest_city"],
+            coldest_temperature=stats["coldest_temperature"],
+            average_temperature=stats["average_temperature"],
+            total_cities=stats["total_cities"]
         )
+        invalidate_history()
         
         return stats
 
@@ -189,77 +242,166 @@ def index(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def api_random_weather(request):
+async def api_random_weather(request):
     """API endpoint to get weather for random cities"""
     try:
         if not settings.WEATHER_API_KEY:
-            return JsonResponse({"error": "API key not configured"}, status=400)
+            return ApiJsonResponse({"error": "API key not configured"}, status=400)
         
-        weather_data = weather_app.get_random_cities_weather(5)
+        weather_data = await weather_app.get_random_cities_weather_async(5)
         
         if not weather_data:
-            return JsonResponse({"error": "Failed to fetch weather data"}, status=500)
+            return ApiJsonResponse({"error": "Failed to fetch weather data"}, status=500)
         
         # Calculate statistics
-        stats = weather_app.calculate_statistics(weather_data)
+        stats = await sync_to_async(weather_app.calculate_statistics)(weather_data)
         
-        return JsonResponse({
+        return ApiJsonResponse({
             "success": True,
-            "weather_data": weather_data,
+            "weather_data": [data.to_dict() for data in weather_data],
             "statistics": stats
         })
     
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return ApiJsonResponse({"error": str(e)}, status=500)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def api_city_weather(request):
+async def api_city_weather(request):
     """API endpoint to get weather for a specific city"""
     try:
         if not settings.WEATHER_API_KEY:
-            return JsonResponse({"error": "API key not configured"}, status=400)
+            return ApiJsonResponse({"error": "API key not configured"}, status=400)
         
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         city = data.get('city', '').strip()
         
         if not city:
-            return JsonResponse({"error": "City name is required"}, status=400)
+            return ApiJsonResponse({"error": "City name is required"}, status=400)
         
-        weather_data = weather_app.get_weather(city)
+        # Served from the Django cache when any worker fetched this city within its TTL
+        weather_data = await aget_observation(city)
+        if weather_data is not None:
+            weather_app.running_stats.add(weather_data)
+        else:
+            weather_data = await weather_app.get_weather_async(city)
+            if weather_data:
+                await aset_observation(city, weather_data)
         
         if not weather_data:
-            return JsonResponse({"error": f"Could not find weather data for {city}"}, status=404)
+            return ApiJsonResponse({"error": f"Could not find weather data for {city}"}, status=404)
         
-        return JsonResponse({
+        return ApiJsonResponse({
             "success": True,
-            "weather_data": weather_data
+            "weather_data": weather_data.to_dict()
         })
     
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return ApiJsonResponse({"error": str(e)}, status=500)
 
 
 def api_status(request):
-    """API status endpoint"""
-    return JsonResponse({
+    """API status endpoint, cached per process for a few seconds"""
+    content = cache.get(status_key())
+    if content is not None:
+        return HttpResponse(content, content_type=JSON_MIMETYPE)
+    
+    content = json_dumps({
         "status": "running",
         "api_key_configured": bool(settings.WEATHER_API_KEY),
         "cities_available": len(weather_app.cities),
+        "cache": weather_app.client.cache.stats(),
+        "negative_cache": weather_app.client.negative_cache.stats(),
+        "single_flight": weather_app.client.single_flight.stats(),
+        "circuit_breaker": weather_app.client.breaker.stats(),
+        "rate_limiter": weather_app.client.rate_limiter.stats(),
+        "running_statistics": weather_app.running_stats.result(),
+        "request_log": weather_app.request_log.stats(),
         "version": "Task 4 - Django Web Application"
     })
+    cache.set(status_key(), content, view_ttl('api_status'))
+    return HttpResponse(content, content_type=JSON_MIMETYPE)
+
+
+# Cursor query parameter -> context entry of the page it moves
+HISTORY_CURSOR_PARAMS = {'weather_cursor': 'weather_page', 'requests_cursor': 'requests_page',
+                         'statistics_cursor': 'statistics_page'}
+
+
+def _history_links(page, cursors: Dict[str, str], param: str):
+    """Point a history page's Newest and Older links at the current cursors of the other tables"""
+    query = {other: cursor for other, cursor in cursors.items() if cursor and other != param}
+    page.newest_url = f'?{urlencode(query)}' if cursors[param] else None
+    page.older_url = f'?{urlencode({**query, param: page.next_cursor})}' if page.has_next else None
+
+
+def _history_context(cursors: Dict[str, str]) -> Dict:
+    """
+    Rows of the history page for one combination of cursors
+
+    Raises:
+        InvalidCursor: A cursor is malformed
+    """
+    weather_page = keyset_page(WeatherData.objects.select_related('city'), 'timestamp',
+                               cursors['weather_cursor'], 20)
+    requests_page = keyset_page(WeatherRequest.objects.all(), 'timestamp', cursors['requests_cursor'], 20)
+    statistics_page = keyset_page(WeatherStatistics.objects.all(), 'calculation_timestamp',
+                                  cursors['statistics_cursor'], 10)
+    # Trends come from the rollup tables, so their cost does not grow with the raw history
+    daily_temperatures = list(CityWeatherRollup.objects.filter(period='day').select_related('city')
+                              .order_by('-bucket', 'city__name')[:20])
+    return {
+        'recent_weather': weather_page.items,
+        'recent_requests': requests_page.items,
+        'recent_statistics': statistics_page.items,
+        'weather_page': weather_page,
+        'requests_page': requests_page,
+        'statistics_page': statistics_page,
+        'daily_temperatures': daily_temperatures,
+        'request_summary': request_summary(minutes=60),
+    }
 
 
 def weather_history(request):
-    """View to display weather history"""
-    recent_weather = WeatherData.objects.select_related('city').order_by('-timestamp')[:20]
-    recent_requests = WeatherRequest.objects.order_by('-timestamp')[:20]
-    recent_statistics = WeatherStatistics.objects.order_by('-calculation_timestamp')[:10]
+    """View to display weather history, whose rows are cached until new weather or statistics are stored"""
+    # Each table pages on its own cursor; other query parameters do not change the page
+    cursors = {param: request.GET.get(param, '') for param in HISTORY_CURSOR_PARAMS}
+    key = history_key(':'.join(cursors.values()))
+    # The rows are cached rather than the HTML, so flash messages and links are rendered per request
+    context = cache.get(key)
+    if context is None:
+        try:
+            context = _history_context(cursors)
+        except InvalidCursor as e:
+            return HttpResponseBadRequest(str(e))
+        cache.set(key, context, view_ttl('weather_history'))
     
-    context = {
-        'recent_weather': recent_weather,
-        'recent_requests': recent_requests,
-        'recent_statistics': recent_statistics,
-    }
-    return render(request, 'weather_app/history.html', context)
\ No newline at end of file
+    for param, page in HISTORY_CURSOR_PARAMS.items():
+        _history_links(context[page], cursors, param)
+    return render(request, 'weather_app/history.html', context)
+
+
+def api_history(request, feed):
+    """
+    API endpoint paging through a history table, newest first
+    
+    GET /api/history/<weather|requests|statistics>/?limit=20&cursor=<next_cursor of the previous page>
+    """
+    if feed not in HISTORY_FEEDS:
+        raise Http404(f"Unknown history feed: {feed}")
+    cursor = request.GET.get('cursor') or None
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        return ApiJsonResponse({"error": "limit must be an integer"}, status=400)
+    
+    key = history_key(f'api:{feed}:{limit}:{cursor or ""}')
+    content = cache.get(key)
+    if content is None:
+        try:
+            content = json_dumps(feed_page(feed, cursor, limit))
+        except InvalidCursor as e:
+            return ApiJsonResponse({"error": str(e)}, status=400)
+        cache.set(key, content, view_ttl('weather_history'))
+    return HttpResponse(content, content_type=JSON_MIMETYPE)
@@ -203,16 +203,16 @@ $(document).ready(function () {
 
         // Populate card data
         card.find('.city').text(data.name);
-        card.find('.country').text(data.sys.country);
-        card.find('.temp-value').text(Math.round(data.main.temp));
-        card.find('.feels-value').text(Math.round(data.main.feels_like));
-        card.find('.condition-text').text(data.weather[0].description);
-        card.find('.humidity').text(data.main.humidity);
-        card.find('.pressure').text(data.main.pressure);
-        card.find('.wind-speed').text(data.wind.speed);
+        card.find('.country').text(data.country);
+        card.find('.temp-value').text(Math.round(data.temp));
+        card.find('.feels-value').text(Math.round(data.feels_like));
+        card.find('.condition-text').text(data.description);
+        card.find('.humidity').text(data.humidity);
+        card.find('.pressure').text(data.pressure);
+        card.find('.wind-speed').text(data.wind_speed);
 
         // Set weather icon based on condition
-        const weatherIcon = getWeatherIcon(data.weather[0].main);
+        const weatherIcon = getWeatherIcon(data.condition);
         card.find('.weather-icon i').removeClass().addClass('bi ' + weatherIcon + ' display-4 text-warning');
 
         return card;
@@ -224,16 +224,16 @@ $(document).ready(function () {
         const card = $(template);
 
         // Populate card data
-        card.find('.city-name').text(data.name + ', ' + data.sys.country);
-        card.find('.temp-value').text(Math.round(data.main.temp));
-        card.find('.feels-value').text(Math.round(data.main.feels_like));
-        card.find('.condition-text').text(data.weather[0].description);
-        card.find('.humidity').text(data.main.humidity);
-        card.find('.pressure').text(data.main.pressure);
-        card.find('.wind-speed').text(data.wind.speed);
+        card.find('.city-name').text(data.name + ', ' + data.country);
+        card.find('.temp-value').text(Math.round(data.temp));
+        card.find('.feels-value').text(Math.round(data.feels_like));
+        card.find('.condition-text').text(data.description);
+        card.find('.humidity').text(data.humidity);
+        card.find('.pressure').text(data.pressure);
+        card.find('.wind-speed').text(data.wind_speed);
 
         // Set weather icon based on condition
-        const weatherIcon = getWeatherIcon(data.weather[0].main);
+        const weatherIcon = getWeatherIcon(data.condition);
         card.find('.weather-icon i').removeClass().addClass('bi ' + weatherIcon + ' display-1 text-warning');
 
         return card;
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import City, WeatherData, WeatherRequest, WeatherStatistics
+from .models import City, CityWeatherRollup, RequestRollup, WeatherData, WeatherRequest, WeatherStatistics
 
 
 @admin.register(City)
@@ -37,6 +37,32 @@ class WeatherStatisticsAdmin(admin.ModelAdmin):
     date_hierarchy = 'calculation_timestamp'
 
 
+class RollupAdmin(admin.ModelAdmin):
+    """Rollups are derived from the raw tables: browse them here, rebuild them with manage.py rollup_weather"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CityWeatherRollup)
+class CityWeatherRollupAdmin(RollupAdmin):
+    list_display = ['city', 'period', 'bucket', 'temperature_min', 'temperature_max', 'sample_count']
+    list_filter = ['period', 'bucket', 'city__country']
+    search_fields = ['city__name']
+    list_select_related = ['city']
+    date_hierarchy = 'bucket'
+
+
+@admin.register(RequestRollup)
+class RequestRollupAdmin(RollupAdmin):
+    list_display = ['request_type', 'bucket', 'request_count', 'error_count', 'latency_max']
+    list_filter = ['request_type', 'bucket']
+    date_hierarchy = 'bucket'
+
+
 # Customize admin site
 admin.site.site_header = "Weather Forecast App - Task 5"
 admin.site.site_title = "Weather Admin"
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class WeatherAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'weather_app'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .sqlite import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid='weather_app.configure_sqlite')
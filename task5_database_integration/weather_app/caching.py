@@ -0,0 +1,94 @@
+"""
+View caching on the Django cache: per-view TTLs and explicit invalidation
+Persisted observations are written through by city; history pages are versioned, so one counter bump invalidates them all
+"""
+
+import os
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+
+from weather_core import Observation, normalize_city
+
+HISTORY_VERSION_KEY = 'weather:history:version'
+
+
+def view_ttl(view: str) -> int:
+    """Seconds a view's response stays cached (WEATHER_VIEW_CACHE_TTLS), 0 when it is not cached"""
+    return settings.WEATHER_VIEW_CACHE_TTLS.get(view, 0)
+
+
+def status_key() -> str:
+    # Status counters describe one process, so every worker caches its own
+    return f'weather:status:{os.getpid()}'
+
+
+def city_key(city: str) -> str:
+    # Quoted so keys stay valid for every backend (no spaces or control characters)
+    return f'weather:city:{quote(normalize_city(city))}'
+
+
+def _entry(observation: Observation):
+    return observation.to_dict(), time.time()
+
+
+def _restore(entry) -> Observation:
+    payload, stored_at = entry
+    return Observation(**payload).with_age(payload['cache_age'] + time.time() - stored_at)
+
+
+async def aget_observation(city: str) -> Optional[Observation]:
+    """Return the cached observation for city, its cache_age brought up to date, or None"""
+    entry = await cache.aget(city_key(city))
+    return None if entry is None else _restore(entry)
+
+
+async def aset_observation(city: str, observation: Observation) -> None:
+    """Cache observation under the city name it was requested by, for what is left of its TTL"""
+    # A stale-while-revalidate result is already cache_age old; one past the TTL is not cached again
+    ttl = view_ttl('api_city_weather') - observation.cache_age
+    if ttl > 0:
+        await cache.aset(city_key(city), _entry(observation), ttl)
+
+
+def history_key(page: str = '') -> str:
+    """Cache key of a history page under the current history version"""
+    version = cache.get(HISTORY_VERSION_KEY)
+    if version is None:
+        # Start from the clock, so a version evicted from the cache is never handed out again
+        cache.add(HISTORY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(HISTORY_VERSION_KEY)
+    return f'weather:history:{version}:{page}'
+
+
+def invalidate_history() -> None:
+    """Retire every cached history page"""
+    try:
+        cache.incr(HISTORY_VERSION_KEY)
+    except ValueError:
+        # No version yet, so no page has been cached under one
+        pass
+
+
+def weather_persisted(observations: Iterable[Observation]) -> None:
+    """
+    Update the caches after new weather rows were committed
+
+    Args:
+        observations (Iterable[Observation]): The observations that were stored
+    """
+    full_ttl = view_ttl('api_city_weather')
+    if full_ttl:
+        # Like aset_observation: each entry lives for what is left of its TTL, so fresh rows share one set_many
+        batches = defaultdict(dict)
+        for observation in observations:
+            ttl = full_ttl - observation.cache_age
+            if ttl > 0:
+                batches[ttl][city_key(observation.name)] = _entry(observation)
+        for ttl, entries in batches.items():
+            cache.set_many(entries, ttl)
+    invalidate_history()
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0003_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_type', models.CharField(choices=[('random', 'Random Cities'), ('city', 'Specific City'), ('status', 'Status Check')], max_length=20)),
+                ('bucket', models.DateTimeField()),
+                ('request_count', models.IntegerField()),
+                ('error_count', models.IntegerField()),
+                ('latency_sum', models.FloatField()),
+                ('latency_max', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['-bucket'], name='requestrollup_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('request_type', 'bucket'), name='requestrollup_bucket_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CityWeatherRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='weather_app.city')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['period', '-bucket'], name='cityweatherrollup_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('city', 'period', 'bucket'), name='cityweatherrollup_bucket_unique')],
+            },
+        ),
+    ]
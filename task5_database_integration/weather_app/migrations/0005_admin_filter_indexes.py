@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0004_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='weatherdata',
+            name='weatherdata_city_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='weatherdata',
+            name='weatherdata_main_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='weatherrequest',
+            name='weatherrequest_type_idx',
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['city', '-timestamp', '-id'], name='weatherdata_city_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['weather_main', '-timestamp', '-id'], name='weatherdata_main_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherrequest',
+            index=models.Index(fields=['request_type', '-timestamp', '-id'], name='weatherrequest_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherrequest',
+            index=models.Index(condition=models.Q(('success', False)), fields=['-timestamp', '-id'], name='weatherrequest_failed_idx'),
+        ),
+    ]
@@ -0,0 +1,136 @@
+"""
+Persistence of fetched observations into City and WeatherData
+One transaction and a constant number of queries per batch, whatever its size, rollups included
+"""
+
+import threading
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from weather_core import Observation
+
+from .caching import weather_persisted
+from .models import City, WeatherData
+from .rollups import record_weather
+
+
+class WeatherStore:
+    """
+    Upsert City rows and bulk-insert WeatherData for batches of observations
+
+    City primary keys are remembered per process, so a batch of known
+    cities costs a single INSERT. The upstream observation time of the last
+    stored row per city is remembered too: an observation served again
+    from the weather cache is not stored twice.
+    """
+
+    def __init__(self):
+        # City name -> (primary key, observed_at of the last stored row)
+        self._cities: Dict[str, Tuple[int, Optional[int]]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, observations: Iterable[Observation]) -> int:
+        """
+        Store the observations that are new since the last save
+
+        Args:
+            observations (Iterable[Observation]): Fetched observations, None entries are skipped
+
+        Returns:
+            int: Number of WeatherData rows written
+        """
+        with self._lock:
+            fresh = self._unseen(observations)
+            if not fresh:
+                return 0
+            try:
+                written = self._write(fresh)
+            except IntegrityError:
+                # A remembered city was deleted by another process; forget every key and resolve again
+                self._cities.clear()
+                written = self._write(fresh)
+            for observation in fresh:
+                pk, _ = self._cities[observation.name]
+                self._cities[observation.name] = (pk, observation.observed_at)
+            return written
+
+    def forget(self) -> None:
+        """Drop the remembered city keys, e.g. after the tables were emptied"""
+        with self._lock:
+            self._cities.clear()
+
+    def _unseen(self, observations: Iterable[Observation]) -> List[Observation]:
+        fresh = {}
+        for observation in observations:
+            if observation is None:
+                continue
+            known = self._cities.get(observation.name)
+            if known is not None and observation.observed_at is not None and known[1] == observation.observed_at:
+                continue
+            fresh[observation.name] = observation
+        return list(fresh.values())
+
+    def _write(self, observations: List[Observation]) -> int:
+        with transaction.atomic():
+            self._resolve_cities(observations)
+            rows = WeatherData.objects.bulk_create([
+                WeatherData(
+                    city_id=self._cities[observation.name][0],
+                    temperature=observation.temp,
+                    feels_like=observation.feels_like,
+                    humidity=observation.humidity,
+                    pressure=observation.pressure,
+                    wind_speed=observation.wind_speed,
+                    wind_direction=observation.wind_deg,
+                    visibility=observation.visibility,
+                    weather_main=observation.condition,
+                    weather_description=observation.description,
+                    weather_icon=observation.icon or None,
+                )
+                for observation in observations
+            ])
+            record_weather(rows)
+            # Refresh the cached observations and history pages once the rows are visible to other connections
+            transaction.on_commit(partial(weather_persisted, observations))
+        return len(rows)
+
+    def _resolve_cities(self, observations: List[Observation]) -> None:
+        """Upsert the cities this process has no key for and learn their keys"""
+        missing = {observation.name: observation for observation in observations
+                   if observation.name not in self._cities}
+        if not missing:
+            return
+
+        City.objects.bulk_create([
+            City(name=observation.name, country=observation.country, country_code=observation.country,
+                 latitude=observation.lat, longitude=observation.lon)
+            for observation in missing.values()
+        ], update_conflicts=True, unique_fields=['name'],
+            update_fields=['country', 'country_code', 'latitude', 'longitude', 'updated_at'])
+        for name, pk in City.objects.filter(name__in=list(missing)).values_list('name', 'pk'):
+            self._cities[name] = (pk, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_weather_store() -> WeatherStore:
+    """Return the process-wide weather store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WeatherStore()
+    return _store
+
+
+@receiver(post_delete, sender=City)
+def _forget_deleted_city(sender, instance, **kwargs):
+    """Keep the remembered city keys valid when cities are deleted (admin, retention jobs)"""
+    if _store is not None:
+        _store.forget()
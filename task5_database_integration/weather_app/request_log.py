@@ -0,0 +1,144 @@
+"""
+Buffered WeatherRequest logging off the request path
+Entries are queued in memory and written with bulk_create by a background thread
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Dict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import WeatherRequest
+from .rollups import record_requests
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogWriter:
+    """
+    Queue WeatherRequest rows and flush them in batches on a background thread
+
+    A flush happens as soon as batch_size entries are queued, otherwise at
+    least every flush_interval seconds, and once more on interpreter
+    shutdown. The queue is capped at max_pending entries; past
+    that the oldest entries are dropped and counted, so a stalled database
+    never grows memory without bound. Rows keep the time they were logged,
+    not the time they were flushed. Each batch is added to the per-minute
+    request rollups in the same transaction.
+    """
+
+    def __init__(self, batch_size: int = settings.WEATHER_REQUEST_LOG_BATCH_SIZE,
+                 flush_interval: float = settings.WEATHER_REQUEST_LOG_FLUSH_INTERVAL,
+                 max_pending: int = settings.WEATHER_REQUEST_LOG_MAX_PENDING):
+        """
+        Initialize the writer; the thread starts with the first logged entry
+
+        Args:
+            batch_size (int): Queued entries that trigger an immediate flush
+            flush_interval (float): Seconds an entry may wait before it is flushed
+            max_pending (int): Queue cap, the oldest entries are dropped beyond it
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def log(self, **fields) -> None:
+        """Queue one WeatherRequest row; never touches the database"""
+        fields.setdefault('timestamp', timezone.now())
+        with self._condition:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(WeatherRequest(**fields))
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='weather-request-log', daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> int:
+        """Write every queued entry now, returning how many rows were written"""
+        with self._flush_lock:
+            with self._condition:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    WeatherRequest.objects.bulk_create(batch, batch_size=self.batch_size)
+                    record_requests(batch)
+            except DatabaseError:
+                logger.exception("Could not write %d request log entries, keeping them for the next flush",
+                                 len(batch))
+                self.failed_flushes += 1
+                with self._condition:
+                    # Requeue ahead of newer entries; the deque cap still applies
+                    room = self._pending.maxlen - len(self._pending)
+                    self.dropped += max(0, len(batch) - room)
+                    self._pending.extendleft(reversed(batch[-room:] if room else []))
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    def close(self) -> None:
+        """Stop the background thread after a final flush"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict:
+        """Return the writer counters for status endpoints"""
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+        }
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._condition:
+                    if not self._closed and len(self._pending) < self.batch_size:
+                        self._condition.wait(self.flush_interval)
+                    closed = self._closed
+                self.flush()
+                if closed:
+                    return
+        finally:
+            # The thread owns its own database connection
+            connection.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_request_log() -> RequestLogWriter:
+    """Return the process-wide request log writer, creating it on first use"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = RequestLogWriter()
+                atexit.register(_writer.close)
+    return _writer
+
@@ -0,0 +1,251 @@
+"""
+Pre-aggregated history: hourly/daily temperatures per city, per-minute request counts
+Written batches are folded into their buckets with one upsert per table; rebuild() recomputes them from raw rows
+"""
+
+import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+
+from .caching import invalidate_history
+from .models import CityWeatherRollup, RequestRollup, WeatherData, WeatherRequest
+
+UTC = datetime.timezone.utc
+CITY_PERIODS = {'hour': TruncHour, 'day': TruncDay}
+
+_BATCH_SIZE = 5000
+
+
+def floor_to(moment: datetime.datetime, period: str) -> datetime.datetime:
+    """Return the start (UTC) of the minute, hour or day bucket containing moment"""
+    moment = moment.astimezone(UTC).replace(second=0, microsecond=0)
+    if period == 'minute':
+        return moment
+    moment = moment.replace(minute=0)
+    return moment if period == 'hour' else moment.replace(hour=0)
+
+
+def record_weather(rows: Iterable[WeatherData]) -> None:
+    """
+    Add freshly written WeatherData rows to their hourly and daily city rollups
+
+    Args:
+        rows (Iterable[WeatherData]): Saved rows, their timestamp already set
+    """
+    buckets = {}
+    for row in rows:
+        temperature = row.temperature
+        for period in CITY_PERIODS:
+            key = (row.city_id, period, floor_to(row.timestamp, period))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, temperature, temperature, temperature]
+            else:
+                bucket[0] += 1
+                bucket[1] = min(bucket[1], temperature)
+                bucket[2] = max(bucket[2], temperature)
+                bucket[3] += temperature
+    _upsert(CityWeatherRollup, ['city_id', 'period', 'bucket'],
+            {'sample_count': 'sum', 'temperature_min': 'min', 'temperature_max': 'max', 'temperature_sum': 'sum'},
+            [key + tuple(values) for key, values in buckets.items()])
+
+
+def record_requests(rows: Iterable[WeatherRequest]) -> None:
+    """
+    Add freshly written WeatherRequest rows to their per-minute rollups
+
+    Args:
+        rows (Iterable[WeatherRequest]): Saved rows
+    """
+    buckets = {}
+    for row in rows:
+        key = (row.request_type, floor_to(row.timestamp, 'minute'))
+        bucket = buckets.setdefault(key, [0, 0, 0.0, None])
+        bucket[0] += 1
+        if not row.success:
+            bucket[1] += 1
+        if row.response_time is not None:
+            bucket[2] += row.response_time
+            bucket[3] = row.response_time if bucket[3] is None else max(bucket[3], row.response_time)
+    _upsert(RequestRollup, ['request_type', 'bucket'],
+            {'request_count': 'sum', 'error_count': 'sum', 'latency_sum': 'sum', 'latency_max': 'max'},
+            [key + tuple(values) for key, values in buckets.items()])
+
+
+def request_summary(minutes: int = 60) -> List[Dict]:
+    """
+    Summarize the requests of the last minutes per request type, from the per-minute rollups only
+
+    Args:
+        minutes (int): Window length
+
+    Returns:
+        List[Dict]: request_type, requests, errors, error_rate (%), avg_latency and max_latency (seconds)
+    """
+    since = floor_to(datetime.datetime.now(UTC), 'minute') - datetime.timedelta(minutes=minutes - 1)
+    rows = (RequestRollup.objects.filter(bucket__gte=since).order_by('request_type').values('request_type')
+            .annotate(requests=Sum('request_count'), errors=Sum('error_count'),
+                      latency=Sum('latency_sum'), max_latency=Max('latency_max')))
+    return [{
+        'request_type': row['request_type'],
+        'requests': row['requests'],
+        'errors': row['errors'],
+        'error_rate': round(row['errors'] / row['requests'] * 100, 1),
+        'avg_latency': row['latency'] / row['requests'],
+        'max_latency': row['max_latency'],
+    } for row in rows]
+
+
+def rebuild(since: Optional[datetime.datetime] = None) -> Dict[str, int]:
+    """
+    Recompute the rollups from the raw tables, e.g. for rows written before rollups existed
+
+    Each day is rebuilt in its own transaction. Rollups older than the oldest
+    remaining raw row are kept, so history pruned by retention stays summarized.
+
+    Args:
+        since (datetime): Rebuild from the start of this day (UTC); all history when omitted
+
+    Returns:
+        Dict[str, int]: Rollup rows written per table
+    """
+    return {'city_rollups': rebuild_weather(since), 'request_rollups': rebuild_requests(since)}
+
+
+def rebuild_weather(since: Optional[datetime.datetime] = None) -> int:
+    """
+    Recompute the hourly and daily city rollups from WeatherData, one day per transaction
+
+    Args:
+        since (datetime): Rebuild from the start of this day (UTC); all history when omitted
+
+    Returns:
+        int: Rollup rows written
+    """
+    def aggregate(rows):
+        for period, trunc in CITY_PERIODS.items():
+            grouped = rows.values('city_id', rollup_bucket=trunc('timestamp', tzinfo=UTC)).annotate(
+                samples=Count('id'), low=Min('temperature'), high=Max('temperature'), total=Sum('temperature'))
+            for row in grouped.iterator():
+                yield CityWeatherRollup(
+                    city_id=row['city_id'], period=period, bucket=row['rollup_bucket'], sample_count=row['samples'],
+                    temperature_min=row['low'], temperature_max=row['high'], temperature_sum=row['total'])
+
+    return _rebuild_days(WeatherData.objects.order_by(), CityWeatherRollup.objects.all(),
+                         ('city_id', 'period', 'bucket'), since, aggregate)
+
+
+def rebuild_requests(since: Optional[datetime.datetime] = None) -> int:
+    """
+    Recompute the per-minute request rollups from WeatherRequest, one day per transaction
+
+    Args:
+        since (datetime): Rebuild from the start of this day (UTC); all history when omitted
+
+    Returns:
+        int: Rollup rows written
+    """
+    def aggregate(rows):
+        grouped = rows.values('request_type', rollup_bucket=TruncMinute('timestamp', tzinfo=UTC)).annotate(
+            requests=Count('id'), errors=Count('id', filter=Q(success=False)),
+            latency=Sum('response_time'), slowest=Max('response_time'))
+        return (RequestRollup(
+            request_type=row['request_type'], bucket=row['rollup_bucket'], request_count=row['requests'],
+            error_count=row['errors'], latency_sum=row['latency'] or 0.0, latency_max=row['slowest'],
+        ) for row in grouped.iterator())
+
+    return _rebuild_days(WeatherRequest.objects.order_by(), RequestRollup.objects.all(), ('request_type', 'bucket'),
+                         since, aggregate)
+
+
+def _rebuild_days(raw, rollups, keys: Tuple[str, ...], since: Optional[datetime.datetime], aggregate) -> int:
+    """
+    Replace the rollups of each day that has raw rows, in its own short transaction
+
+    Retention prunes raw rows but not their rollups, so rollups older than the
+    oldest remaining raw row are kept. A bucket that straddles that row is only
+    filled in when it has no rollup yet.
+
+    Args:
+        raw: Raw rows, unordered
+        rollups: Rollup rows derived from them
+        keys (Tuple[str, ...]): Fields of the rollup's unique bucket constraint
+        since (datetime): First day to rebuild; the day of the oldest raw row when omitted
+        aggregate: Returns the unsaved rollups of the raw rows it is given
+
+    Returns:
+        int: Rollup rows written
+    """
+    span = raw.aggregate(oldest=Min('timestamp'), newest=Max('timestamp'))
+    if span['oldest'] is None:
+        return 0
+    day = floor_to(span['oldest'], 'day')
+    if since is not None:
+        day = max(day, floor_to(since, 'day'))
+    last = floor_to(span['newest'], 'day')
+
+    written = 0
+    while day <= last:
+        end = day + datetime.timedelta(days=1)
+        stale = rollups.filter(bucket__gte=max(day, span['oldest']))
+        if day < last:
+            # The last day also clears rollups newer than every raw row
+            stale = stale.filter(bucket__lt=end)
+        with transaction.atomic():
+            kept = set(rollups.filter(bucket__gte=day, bucket__lt=span['oldest']).values_list(*keys))
+            stale.delete()
+            written += _insert(rollup for rollup in aggregate(raw.filter(timestamp__gte=day, timestamp__lt=end))
+                               if tuple(getattr(rollup, key) for key in keys) not in kept)
+        day = end
+    invalidate_history()
+    return written
+
+
+def _insert(objects: Iterator) -> int:
+    """bulk_create in bounded chunks so a full rebuild never holds every rollup in memory"""
+    objects = iter(objects)
+    written = 0
+    while True:
+        chunk = list(islice(objects, _BATCH_SIZE))
+        if not chunk:
+            return written
+        type(chunk[0]).objects.bulk_create(chunk)
+        written += len(chunk)
+
+
+def _upsert(model, keys: List[str], merge: Dict[str, str], rows: List[tuple]) -> None:
+    """
+    Insert rollup rows, or fold them into the existing bucket row in the same statement
+
+    Args:
+        model: Rollup model
+        keys (List[str]): Columns of the bucket's unique constraint
+        merge (Dict[str, str]): Value column -> 'sum', 'min' or 'max'
+        rows (List[tuple]): Key columns followed by value columns
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    table = quote(model._meta.db_table)
+    assignments = []
+    for column, how in merge.items():
+        current, new = f"{table}.{quote(column)}", f"excluded.{quote(column)}"
+        if how == 'sum':
+            assignments.append(f"{quote(column)} = {current} + {new}")
+        else:
+            # Portable MIN/MAX of two values (SQLite has no LEAST/GREATEST); NULL never wins
+            comparison = '<' if how == 'min' else '>'
+            assignments.append(f"{quote(column)} = CASE WHEN {current} IS NULL OR {new} {comparison} {current} "
+                               f"THEN {new} ELSE {current} END")
+    columns = keys + list(merge)
+    sql = (f"INSERT INTO {table} ({', '.join(map(quote, columns))}) VALUES ({', '.join(['%s'] * len(columns))}) "
+           f"ON CONFLICT ({', '.join(map(quote, keys))}) DO UPDATE SET {', '.join(assignments)}")
+    bucket = keys.index('bucket')
+    params = [row[:bucket] + (adapt(row[bucket]),) + row[bucket + 1:] for row in rows]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
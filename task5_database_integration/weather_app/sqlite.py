@@ -0,0 +1,22 @@
+"""
+SQLite tuning applied to every new database connection
+The pragmas come from WEATHER_SQLITE_PRAGMAS; connections to other databases are left alone
+"""
+
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver: run WEATHER_SQLITE_PRAGMAS on a new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'WEATHER_SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
@@ -1,3 +1,403 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create tests here..
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from weather_core import Observation
+
+from . import caching, views
+from .caching import aget_observation
+from .models import City, CityWeatherRollup, RequestRollup, WeatherData, WeatherRequest, WeatherStatistics
+from .pagination import InvalidCursor, decode_cursor, keyset_page
+from .persistence import WeatherStore, get_weather_store
+from .request_log import RequestLogWriter
+from .retention import RetentionJob
+from .rollups import UTC, rebuild
+
+
+def make_observation(name: str, observed_at: int = 1000, temp: float = 10.0) -> Observation:
+    return Observation(name=name, temp=temp, country='NO', humidity=70, pressure=1010, wind_speed=3.5,
+                       condition='Clouds', description='few clouds', icon='02d', observed_at=observed_at)
+
+
+class WeatherStoreTests(TestCase):
+    def test_batch_is_stored_with_constant_queries(self):
+        store = WeatherStore()
+        batch = [make_observation(f'City {i}') for i in range(10)]
+
+        # savepoint, city insert, city key lookup, weather insert, rollup upsert, release
+        with self.assertNumQueries(6):
+            self.assertEqual(store.save(batch), 10)
+        self.assertEqual(City.objects.count(), 10)
+
+        # Known cities: the weather insert and the rollup upsert inside the savepoint
+        newer = [make_observation(f'City {i}', observed_at=2000) for i in range(10)]
+        with self.assertNumQueries(4):
+            self.assertEqual(store.save(newer), 10)
+        self.assertEqual(WeatherData.objects.count(), 20)
+
+    def test_cached_observations_are_not_stored_twice(self):
+        store = WeatherStore()
+        store.save([make_observation('Oslo')])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(store.save([make_observation('Oslo'), None]), 0)
+        self.assertEqual(WeatherData.objects.get().city.name, 'Oslo')
+
+    def test_deleted_city_is_resolved_again(self):
+        store = get_weather_store()
+        store.forget()
+        store.save([make_observation('Oslo')])
+        City.objects.all().delete()
+
+        self.assertEqual(store.save([make_observation('Oslo', observed_at=2000)]), 1)
+        self.assertEqual(City.objects.get().weather_data.count(), 1)
+
+
+class RequestLogWriterTests(TestCase):
+    def test_entries_are_queued_then_bulk_written(self):
+        writer = RequestLogWriter(batch_size=1000, flush_interval=3600, max_pending=3)
+        self.addCleanup(writer.close)
+
+        with self.assertNumQueries(0):
+            for i in range(4):
+                writer.log(request_type='city', city_name=f'City {i}', success=True, response_time=0.1)
+        self.assertEqual(writer.stats()['dropped'], 1)
+        logged_at = writer._pending[0].timestamp
+
+        # savepoint, request insert, rollup upsert, release
+        with self.assertNumQueries(4):
+            self.assertEqual(writer.flush(), 3)
+        self.assertEqual(list(WeatherRequest.objects.order_by('city_name').values_list('city_name', flat=True)),
+                         ['City 1', 'City 2', 'City 3'])
+        self.assertEqual(WeatherRequest.objects.get(city_name='City 1').timestamp, logged_at)
+
+
+class RollupTests(TestCase):
+    @staticmethod
+    def snapshot():
+        return (sorted(CityWeatherRollup.objects.values_list('city__name', 'period', 'bucket', 'sample_count',
+                                                             'temperature_min', 'temperature_max', 'temperature_sum')),
+                sorted(RequestRollup.objects.values_list('request_type', 'bucket', 'request_count', 'error_count',
+                                                         'latency_sum', 'latency_max')))
+
+    def test_weather_rollups_are_maintained_on_write(self):
+        store = WeatherStore()
+        # Both saves land in the same hour and day
+        moment = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC)
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            store.save([make_observation('Oslo', temp=10.0), make_observation('Bergen', temp=4.0)])
+            store.save([make_observation('Oslo', observed_at=2000, temp=20.0)])
+
+        oslo = CityWeatherRollup.objects.filter(city__name='Oslo')
+        for period, bucket in (('hour', moment.replace(minute=0)), ('day', moment.replace(hour=0, minute=0))):
+            rollup = oslo.get(period=period)
+            self.assertEqual(rollup.bucket, bucket)
+            self.assertEqual(rollup.sample_count, 2)
+            self.assertEqual((rollup.temperature_min, rollup.temperature_max, rollup.temperature_avg),
+                             (10.0, 20.0, 15.0))
+
+        # The incremental rows match a rebuild from the raw table
+        written = self.snapshot()
+        rebuild()
+        self.assertEqual(self.snapshot(), written)
+
+    def test_request_rollups_fold_batches_into_minute_buckets(self):
+        minute = datetime.datetime(2024, 1, 15, 9, 30, tzinfo=UTC)
+        writer = RequestLogWriter(batch_size=1000, flush_interval=3600)
+        self.addCleanup(writer.close)
+        writer.log(request_type='city', success=True, response_time=0.2, timestamp=minute)
+        writer.log(request_type='city', success=False, response_time=0.5, timestamp=minute)
+        writer.flush()
+        writer.log(request_type='city', success=True, response_time=0.3,
+                   timestamp=minute + datetime.timedelta(seconds=59))
+        writer.log(request_type='random', success=True, response_time=None,
+                   timestamp=minute + datetime.timedelta(minutes=1))
+        writer.flush()
+
+        city = RequestRollup.objects.get(request_type='city')
+        self.assertEqual((city.bucket, city.request_count, city.error_count, city.latency_max),
+                         (minute, 3, 1, 0.5))
+        self.assertAlmostEqual(city.latency_sum, 1.0)
+        self.assertIsNone(RequestRollup.objects.get(request_type='random').latency_max)
+
+        written = self.snapshot()
+        call_command('rollup_weather', '--all', stdout=StringIO())
+        self.assertEqual(self.snapshot(), written)
+
+    def test_history_page_reads_rollups(self):
+        cache.clear()
+        WeatherStore().save([make_observation('Oslo', temp=-3.5)])
+        writer = RequestLogWriter()
+        self.addCleanup(writer.close)
+        writer.log(request_type='city', city_name='Oslo', success=False, response_time=0.25)
+        writer.flush()
+
+        response = self.client.get(reverse('weather_app:history'))
+
+        self.assertContains(response, 'Daily Temperatures')
+        self.assertEqual([row.city.name for row in response.context['daily_temperatures']], ['Oslo'])
+        self.assertEqual(response.context['request_summary'][0]['error_rate'], 100.0)
+
+    def test_rebuild_since_keeps_older_rollups(self):
+        old = datetime.datetime(2024, 1, 1, 12, tzinfo=UTC)
+        RequestRollup.objects.create(request_type='city', bucket=old, request_count=7, error_count=0, latency_sum=0.7)
+
+        self.assertEqual(rebuild(since=old + datetime.timedelta(days=1)), {'city_rollups': 0, 'request_rollups': 0})
+        self.assertEqual(RequestRollup.objects.get().request_count, 7)
+
+    def test_rollup_command_keeps_rollups_of_pruned_rows(self):
+        # Retention left the last request of the 12:00 minute; the rollup still counts the pruned ones
+        pruned = datetime.datetime(2024, 1, 1, 12, tzinfo=UTC)
+        RequestRollup.objects.create(request_type='city', bucket=pruned, request_count=7, error_count=0, latency_sum=0.7)
+        WeatherRequest.objects.create(request_type='city', success=True, response_time=0.1,
+                                      timestamp=pruned + datetime.timedelta(seconds=30))
+        WeatherRequest.objects.create(request_type='city', success=False, response_time=0.3,
+                                      timestamp=pruned + datetime.timedelta(days=2))
+
+        # No weather rollups yet: the command rebuilds them without touching the request rollups it does not cover
+        out = StringIO()
+        call_command('rollup_weather', stdout=out)
+
+        self.assertEqual(list(RequestRollup.objects.order_by('bucket').values_list('bucket', 'request_count')),
+                         [(pruned, 7), (pruned + datetime.timedelta(days=2), 1)])
+        self.assertIn('1 request rows since 2024-01-01', out.getvalue())
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        WeatherRequest.objects.bulk_create(
+            [WeatherRequest(request_type='city', city_name=f'Old {i}', success=True,
+                            timestamp=now - datetime.timedelta(days=40, minutes=i)) for i in range(5)]
+            + [WeatherRequest(request_type='city', city_name='Recent', success=True, timestamp=now)])
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.archive_dir = archive_dir.name
+
+    def read_archive(self):
+        names = []
+        for file_name in sorted(os.listdir(self.archive_dir)):
+            with gzip.open(os.path.join(self.archive_dir, file_name)) as archive:
+                names.extend(json.loads(line)['city_name'] for line in archive)
+        return sorted(names)
+
+    def test_expired_rows_are_archived_then_deleted_in_chunks(self):
+        job = RetentionJob(archive_dir=self.archive_dir, chunk_size=2, pause=0)
+
+        result = job.prune('WeatherRequest', days=30)
+
+        self.assertEqual((result['rows'], result['chunks']), (5, 3))
+        self.assertEqual(list(WeatherRequest.objects.values_list('city_name', flat=True)), ['Recent'])
+        self.assertEqual(self.read_archive(), [f'Old {i}' for i in range(5)])
+
+        # Appending keeps the earlier gzip members readable
+        WeatherRequest.objects.filter(city_name='Recent').update(
+            timestamp=timezone.now() - datetime.timedelta(days=31))
+        self.assertEqual(job.prune('WeatherRequest', days=30)['rows'], 1)
+        self.assertEqual(self.read_archive(), [f'Old {i}' for i in range(5)] + ['Recent'])
+
+    def test_dry_run_only_counts(self):
+        result = RetentionJob(archive_dir=self.archive_dir).prune('WeatherRequest', days=30, dry_run=True)
+
+        self.assertEqual(result['rows'], 5)
+        self.assertEqual(WeatherRequest.objects.count(), 6)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+    def test_command_reports_throughput(self):
+        WeatherStatistics.objects.create(coldest_city='Oslo', coldest_temperature=-3, average_temperature=4,
+                                         total_cities=5)
+        WeatherStatistics.objects.update(calculation_timestamp=timezone.now() - datetime.timedelta(days=2))
+        out = StringIO()
+
+        call_command('prune_history', '--model', 'WeatherStatistics', '--days', '1', '--no-archive', stdout=out)
+
+        self.assertIn('WeatherStatistics: pruned 1 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertFalse(WeatherStatistics.objects.exists())
+
+
+class ViewCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_history_is_cached_until_weather_is_stored(self):
+        url = reverse('weather_app:history')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        # Only the cache itself may be queried (WEATHER_SHARED_CACHE=db)
+        self.assertEqual([query['sql'] for query in queries if 'weather_app_' in query['sql']], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WeatherStore().save([make_observation('Tromsø')])
+
+        self.assertContains(self.client.get(url), 'Tromsø')
+
+    def test_cached_history_renders_messages_per_request(self):
+        url = reverse('weather_app:history')
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        request._messages = CookieStorage(request)
+        messages.success(request, 'Preferences saved')
+
+        self.assertContains(views.weather_history(request), 'Preferences saved')
+        self.assertNotContains(self.client.get(url), 'Preferences saved')
+
+    @override_settings(WEATHER_API_KEY='test-key')
+    def test_city_weather_is_served_from_the_cache(self):
+        fetch = mock.AsyncMock(return_value=make_observation('Oslo'))
+        with mock.patch.object(views.weather_app, 'get_weather_async', fetch):
+            for city in ('Oslo', ' oslo '):
+                response = self.client.post(reverse('weather_app:api_city_weather'), data=json.dumps({'city': city}),
+                                            content_type='application/json')
+                self.assertEqual(response.json()['weather_data']['name'], 'Oslo')
+
+        fetch.assert_awaited_once_with('Oslo')
+
+    @override_settings(WEATHER_API_KEY='test-key')
+    def test_stale_observation_is_not_cached_again(self):
+        ttl = settings.WEATHER_VIEW_CACHE_TTLS['api_city_weather']
+        stale = make_observation('Oslo').with_age(ttl + 100)
+        with mock.patch.object(views.weather_app, 'get_weather_async', mock.AsyncMock(return_value=stale)):
+            self.client.post(reverse('weather_app:api_city_weather'), data=json.dumps({'city': 'Oslo'}),
+                             content_type='application/json')
+        self.assertIsNone(async_to_sync(aget_observation)('Oslo'))
+
+        aging = make_observation('Oslo').with_age(ttl - 100)
+        with mock.patch.object(caching.cache, 'aset', mock.AsyncMock()) as aset:
+            async_to_sync(caching.aset_observation)('Oslo', aging)
+        self.assertEqual(aset.await_args.args[2], 100)
+
+    def test_persisted_weather_is_cached_for_its_remaining_ttl(self):
+        ttl = settings.WEATHER_VIEW_CACHE_TTLS['api_city_weather']
+        observations = [make_observation('Oslo'), make_observation('Bergen').with_age(ttl - 100),
+                        make_observation('Tromsø').with_age(ttl + 100)]
+        with mock.patch.object(caching.cache, 'set_many') as set_many:
+            caching.weather_persisted(observations)
+
+        cached = {key: call.args[1] for call in set_many.call_args_list for key in call.args[0]}
+        self.assertEqual(cached, {caching.city_key('Oslo'): ttl, caching.city_key('Bergen'): 100})
+
+    @override_settings(WEATHER_API_KEY='test-key')
+    def test_lookup_succeeds_when_history_cannot_be_stored(self):
+        fetch = mock.AsyncMock(return_value=make_observation('Oslo'))
+        with mock.patch.object(views.weather_app.async_client, 'get_weather', fetch), \
+                mock.patch.object(views.weather_app, 'request_log'), \
+                mock.patch.object(views.weather_app.store, 'save', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('weather_app.views', 'ERROR'):
+            response = self.client.post(reverse('weather_app:api_city_weather'), data=json.dumps({'city': 'Oslo'}),
+                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['weather_data']['name'], 'Oslo')
+
+    def test_persisted_weather_is_written_through(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WeatherStore().save([make_observation('Bergen', temp=7.5)])
+
+        self.assertEqual(async_to_sync(aget_observation)('bergen').temp, 7.5)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Three rows share each timestamp, so pages have to break ties on id
+        moment = datetime.datetime(2024, 5, 1, tzinfo=UTC)
+        WeatherRequest.objects.bulk_create(
+            WeatherRequest(request_type='city', city_name=f'City {i}', success=True,
+                           timestamp=moment + datetime.timedelta(minutes=i // 3))
+            for i in range(25))
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = keyset_page(WeatherRequest.objects.all(), 'timestamp', cursor, page_size=4)
+            seen += [row.pk for row in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        expected = list(WeatherRequest.objects.order_by('-timestamp', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', 'MjAyNC0wNS0wMXwx'):  # the second has no timezone
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+        response = self.client.get(reverse('weather_app:history'), {'requests_cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_history_page_links_to_older_rows(self):
+        response = self.client.get(reverse('weather_app:history'))
+        page = response.context['requests_page']
+        self.assertEqual([row.city_name for row in page.items][:2], ['City 24', 'City 23'])
+        self.assertIsNone(page.newest_url)
+
+        response = self.client.get(reverse('weather_app:history') + page.older_url)
+        page = response.context['requests_page']
+        self.assertEqual([row.city_name for row in page.items], [f'City {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(page.older_url)
+        self.assertContains(response, 'Newest')
+
+    def test_history_links_carry_only_cursors(self):
+        url = reverse('weather_app:history')
+        self.client.get(url, {'theme': 'dark'})
+
+        page = self.client.get(url).context['requests_page']
+        self.assertNotIn('theme', page.older_url)
+        page = self.client.get(url, {'theme': 'light', 'requests_cursor': page.next_cursor}).context['requests_page']
+        self.assertEqual(page.newest_url, '?')
+
+    def test_api_feed_pages_with_cursor(self):
+        url = reverse('weather_app:api_history', args=['requests'])
+        first = self.client.get(url, {'limit': 10}).json()
+        second = self.client.get(url, {'limit': 10, 'cursor': first['next_cursor']}).json()
+
+        self.assertTrue(first['has_next'])
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(second['results'][0]['city_name'], 'City 14')
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'ten'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('weather_app:api_history', args=['cities'])).status_code, 404)
+
+
+class SqliteProfileTests(TestCase):
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.WEATHER_SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.WEATHER_SQLITE_PRAGMAS['cache_size'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class RequestLogThreadTests(TransactionTestCase):
+    # The background thread writes on its own connection, outside any test transaction
+    def test_close_flushes_and_stops_the_thread(self):
+        writer = RequestLogWriter(batch_size=1000, flush_interval=3600)
+        writer.log(request_type='random', success=False, error_message='No data for: Oslo')
+
+        writer.close()
+
+        self.assertIsNone(writer._thread)
+        self.assertEqual(WeatherRequest.objects.get().error_message, 'No data for: Oslo')
@@ -12,4 +12,5 @@ urlpatterns = [
     path('api/status/', views.api_status, name='api_status'),
     path('api/random-weather/', views.api_random_weather, name='api_random_weather'),
     path('api/city-weather/', views.api_city_weather, name='api_city_weather'),
+    path('api/history/<str:feed>/', views.api_history, name='api_history'),
 ]
@@ -0,0 +1,14 @@
+"""
+Celery application for the background tasks in weather_app/tasks.py
+Start a worker with beat: celery -A weather_project worker --beat
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weather_project.settings')
+
+app = Celery('weather_project')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -2,6 +2,8 @@ from pathlib import Path
 import sys
 import os
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -10,13 +12,16 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__f
 sys.path.append(parent_dir)
 
 try:
-    from config import OPENWEATHER_API_KEY, DEFAULT_CITIES_COUNT, REQUEST_TIMEOUT, UNITS
+    from config import (OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, DEFAULT_CITIES_COUNT, REQUEST_TIMEOUT, UNITS,
+                        WEATHER_CACHE_TTL)
 except ImportError:
     # Fallback if config not found
     OPENWEATHER_API_KEY = ""
+    OPENWEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
     DEFAULT_CITIES_COUNT = 5
     REQUEST_TIMEOUT = 10
     UNITS = "metric"
+    WEATHER_CACHE_TTL = 600
 
 
 SECRET_KEY = 'django-insecure-1kay6(_v!_a8)km-5j@0lzl0r5gaew%iv8nq7+(v3fur%zjw^@'
@@ -84,9 +89,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open across requests instead of reconnecting (and re-applying the pragmas) each time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+if django.VERSION >= (5, 1):
+    # Take the write lock when a transaction starts: concurrent writers then wait up to busy_timeout
+    # instead of failing with "database is locked" when a read lock cannot be upgraded
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Applied to every new SQLite connection (weather_app/sqlite.py)
+WEATHER_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers and the writer no longer block each other
+    'synchronous': 'NORMAL',  # still durable with WAL, fsync only at checkpoints
+    'cache_size': -20000,  # page cache per connection, in KiB when negative (20 MB)
+    'mmap_size': 134217728,  # read the first 128 MB through memory mapping
+    'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+    'temp_store': 'MEMORY',
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,10 +148,61 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 WEATHER_API_KEY = OPENWEATHER_API_KEY
+WEATHER_BASE_URL = OPENWEATHER_BASE_URL
 WEATHER_DEFAULT_CITIES_COUNT = DEFAULT_CITIES_COUNT
 WEATHER_REQUEST_TIMEOUT = REQUEST_TIMEOUT
 WEATHER_UNITS = UNITS
 
+# WeatherRequest logging is buffered and written by a background thread (weather_app/request_log.py)
+WEATHER_REQUEST_LOG_BATCH_SIZE = 100  # queued entries that trigger an immediate bulk insert
+WEATHER_REQUEST_LOG_FLUSH_INTERVAL = 1.0  # seconds a logged request may wait before it is written
+WEATHER_REQUEST_LOG_MAX_PENDING = 10000  # oldest entries are dropped past this if the database stalls
+
+# Retention of the history tables (weather_app/retention.py, manage.py prune_history); unlisted models are kept
+WEATHER_RETENTION_DAYS = {'WeatherRequest': 30, 'WeatherStatistics': 90}
+WEATHER_RETENTION_CHUNK_SIZE = 1000  # rows archived and deleted per transaction
+WEATHER_RETENTION_PAUSE = 0.05  # seconds between chunks, so live writers get the database lock
+WEATHER_ARCHIVE_DIR = BASE_DIR / 'archive'  # append-only <table>-YYYY-MM.jsonl.gz files
+
+# Cache Configuration: local memory per process by default. WEATHER_SHARED_CACHE=file or =db shares cached
+# pages and observations between worker processes (db needs `manage.py createcachetable` once)
+WEATHER_SHARED_CACHE = os.environ.get('WEATHER_SHARED_CACHE', '')
+if WEATHER_SHARED_CACHE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+elif WEATHER_SHARED_CACHE == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'weather_cache',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'weather',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Seconds each view's response is cached, 0 disables it (weather_app/caching.py). Storing weather or statistics
+# invalidates the history page at once; new request log entries only show up when its TTL runs out
+WEATHER_VIEW_CACHE_TTLS = {
+    'api_status': 5,
+    'api_city_weather': WEATHER_CACHE_TTL,  # as fresh as the weather client's own cache
+    'weather_history': 30,
+}
+
 # Site ID
 SITE_ID = 1
 
@@ -174,12 +249,11 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
-
-# Cache Configuration (using dummy cache for development)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+CELERY_BEAT_SCHEDULE = {
+    'prune-history': {
+        'task': 'weather_app.tasks.prune_history',
+        'schedule': 24 * 60 * 60,  # daily
+    },
 }
 
 # Session Configuration (using database for development)
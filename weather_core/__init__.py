@@ -0,0 +1,59 @@
+"""
+Shared weather logic used by every front-end (Task 1, 2, 3, 4, 5)
+"""
+
+from .batch import CityIdRegistry, get_city_ids
+from .breaker import CircuitBreaker, get_breaker
+from .catalog import CityCatalog, get_catalog, load_catalog
+from .cache import TTLCache, get_negative_cache, get_weather_cache, normalize_city
+from .client import DEFAULT_BASE_URL, WeatherClient, create_session, get_session
+from .async_client import AsyncWeatherClient, LoopThread, get_loop_thread
+from .errors import CircuitOpenError, CityNotFoundError, RateLimitedError
+from .fanout import fetch_concurrently, fetch_concurrently_async
+from .observation import Observation
+from .ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, get_rate_limiter
+from .serialization import JSON_MIMETYPE, json_backend, json_dumps, json_loads, use_json_backend
+from .singleflight import SingleFlight, get_single_flight
+from .stats import StatsAccumulator, compute_column_statistics, compute_statistics, get_running_statistics
+
+__all__ = [
+    'AsyncWeatherClient',
+    'BACKGROUND',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'CityCatalog',
+    'CityIdRegistry',
+    'CityNotFoundError',
+    'DEFAULT_BASE_URL',
+    'INTERACTIVE',
+    'JSON_MIMETYPE',
+    'LoopThread',
+    'Observation',
+    'RateLimitedError',
+    'RateLimiter',
+    'SingleFlight',
+    'StatsAccumulator',
+    'TTLCache',
+    'WeatherClient',
+    'compute_column_statistics',
+    'compute_statistics',
+    'create_session',
+    'fetch_concurrently',
+    'fetch_concurrently_async',
+    'get_breaker',
+    'get_catalog',
+    'get_city_ids',
+    'get_loop_thread',
+    'get_negative_cache',
+    'get_rate_limiter',
+    'get_running_statistics',
+    'get_session',
+    'get_single_flight',
+    'get_weather_cache',
+    'json_backend',
+    'json_dumps',
+    'json_loads',
+    'load_catalog',
+    'normalize_city',
+    'use_json_backend',
+]
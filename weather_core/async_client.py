@@ -0,0 +1,318 @@
+"""
+asyncio HTTP client for the OpenWeatherMap API
+Used by the async Flask (Task 3) and Django (Task 4, 5) views
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import weakref
+from typing import Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+try:
+    import aiohttp
+except ImportError:
+    # aiohttp is only needed by the async views
+    aiohttp = None
+
+try:
+    from config import REQUEST_TIMEOUT, UNITS
+except ImportError:
+    # Fallback if config not found
+    REQUEST_TIMEOUT = 10
+    UNITS = "metric"
+
+try:
+    from config import ASYNC_CONNECTOR_LIMIT
+except ImportError:
+    ASYNC_CONNECTOR_LIMIT = 100
+
+from .batch import CityIdRegistry, chunked, get_city_ids, group_url_for, split_group_response
+from .breaker import CircuitBreaker, get_breaker, is_upstream_failure
+from .cache import NEGATIVE_STATUSES, TTLCache, cache_key, get_negative_cache, get_weather_cache
+from .client import DEFAULT_BASE_URL
+from .errors import CityNotFoundError
+from .ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, get_rate_limiter, retry_after_seconds
+from .observation import Observation
+from .fanout import fetch_concurrently_async
+from .singleflight import SingleFlight, get_single_flight
+
+T = TypeVar('T')
+
+
+class AsyncWeatherClient:
+    """
+    Current-weather lookups on a pooled aiohttp connector
+
+    aiohttp sessions are bound to the event loop that created them, so one
+    session is kept per running loop. Callers running on a short-lived loop
+    (Flask async views, Django async views under WSGI) run their calls on
+    the process-wide LoopThread instead, so one session and its keep-alive
+    connections serve every request.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 timeout: float = REQUEST_TIMEOUT, units: str = UNITS,
+                 limit: int = ASYNC_CONNECTOR_LIMIT, cache: Optional[TTLCache] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 city_ids: Optional[CityIdRegistry] = None,
+                 negative_cache: Optional[TTLCache] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize the client
+
+        Args:
+            api_key (str): OpenWeatherMap API key
+            base_url (str): Current-weather endpoint
+            timeout (float): Per-request timeout in seconds
+            units (str): Default units (metric, imperial, kelvin)
+            limit (int): Maximum open connections per event loop
+            cache (TTLCache): Response cache, defaults to the one shared with WeatherClient
+            single_flight (SingleFlight): Coalescing group, defaults to the one shared with WeatherClient
+            city_ids (CityIdRegistry): Name -> upstream ID map, defaults to the shared one
+            negative_cache (TTLCache): Cache of unresolvable cities, defaults to the shared one
+            breaker (CircuitBreaker): Upstream circuit breaker, defaults to the one shared with WeatherClient
+            rate_limiter (RateLimiter): Upstream token bucket, defaults to the one shared with WeatherClient
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async weather client: pip install aiohttp")
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.units = units
+        self.limit = limit
+        self.cache = cache if cache is not None else get_weather_cache()
+        self.single_flight = single_flight if single_flight is not None else get_single_flight()
+        self.city_ids = city_ids if city_ids is not None else get_city_ids()
+        self.negative_cache = negative_cache if negative_cache is not None else get_negative_cache()
+        self.breaker = breaker if breaker is not None else get_breaker()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def get_session(self) -> "aiohttp.ClientSession":
+        """Return the session for the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300)
+            session = aiohttp.ClientSession(connector=connector,
+                                            timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._sessions[loop] = session
+        return session
+
+    async def close(self) -> None:
+        """Close the session bound to the running event loop, if any"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def get_weather(self, city: str, units: Optional[str] = None,
+                          priority: int = INTERACTIVE) -> Observation:
+        """
+        Fetch current weather for a city, served from the cache when fresh
+
+        Stale entries are returned immediately and refreshed in the background
+        as in WeatherClient.get_weather. Concurrent misses for the same city
+        and units share one upstream call, including calls made from other
+        threads or event loops. A city upstream recently answered with 404/400
+        raises CityNotFoundError locally, and CircuitOpenError is raised while
+        the breaker considers the upstream down. Other errors propagate
+        (aiohttp.ClientError, asyncio.TimeoutError, JSON decode errors) so each
+        front-end can report them its own way.
+
+        Args:
+            city (str): City name
+            units (str): Units override, defaults to the client units
+            priority (int): Rate limiter priority, INTERACTIVE or BACKGROUND
+
+        Returns:
+            Observation: Parsed current weather, cache_age set to the seconds since it was fetched
+        """
+        units = units or self.units
+        key = cache_key(city, units)
+        if self.cache.enabled:
+            entry = self.cache.lookup(key)
+            if entry is not None:
+                data, age = entry
+                if age >= self.cache.ttl:
+                    self._revalidate(key, city, units)
+                return data.with_age(age)
+        status = self.negative_cache.get(key)
+        if status is not None:
+            raise CityNotFoundError(city, status)
+
+        data = await self.single_flight.do_async(key, lambda: self._fetch_and_cache(key, city, units, priority))
+        return data.with_age(0)
+
+    async def get_weather_many(self, cities: List[str], units: Optional[str] = None,
+                               max_concurrency: Optional[int] = None,
+                               deadline: Optional[float] = None) -> List[Tuple[str, Optional[Observation]]]:
+        """
+        Async counterpart of WeatherClient.get_weather_many
+
+        Args:
+            cities (List[str]): City names
+            units (str): Units override, defaults to the client units
+            max_concurrency (int): Optional in-flight limit
+            deadline (float): Seconds the whole batch may take
+
+        Returns:
+            List[Tuple[str, Optional[Observation]]]: (city, observation) pairs in input order
+        """
+        units = units or self.units
+        found = {}
+        pending = []
+        for city in cities:
+            data = self.cache.get(cache_key(city, units)) if self.cache.enabled else None
+            if data is not None:
+                found[city] = data
+            else:
+                pending.append(city)
+
+        resolved, unresolved = self.city_ids.split(pending)
+        jobs = [tuple(chunk) for chunk in chunked(resolved)] + [(city,) for city in unresolved]
+
+        async def run(job):
+            if len(job) == 1:
+                return {job[0]: await self.get_weather(job[0], units, BACKGROUND)}
+            return await self._fetch_group(job, units)
+
+        results = await fetch_concurrently_async(run, jobs, max_concurrency=max_concurrency,
+                                                 deadline=deadline)
+        for job, result in results:
+            if result:
+                found.update(result)
+
+        return [(city, found.get(city)) for city in cities]
+
+    def _revalidate(self, key, city: str, units: str) -> None:
+        """
+        Refresh a stale entry in the background unless a fetch for it is already running
+
+        The refresh runs on the process-wide LoopThread, since the caller's
+        loop may be gone (Flask, Django under WSGI) before it ends.
+        """
+        if self.single_flight.busy(key):
+            return
+        get_loop_thread().submit(self._refresh(key, city, units))
+
+    async def _refresh(self, key, city: str, units: str) -> None:
+        await self.single_flight.do_async(key, lambda: self._fetch_and_cache(key, city, units, BACKGROUND))
+
+    async def _fetch_and_cache(self, key, city: str, units: str, priority: int = INTERACTIVE) -> Observation:
+        """Fetch upstream and store the result (or a 404/400) for later callers"""
+        try:
+            data = Observation.from_payload(await self._fetch(city, units, priority))
+        except aiohttp.ClientResponseError as e:
+            if e.status in NEGATIVE_STATUSES:
+                self.negative_cache.set(key, e.status)
+            raise
+        self.cache.set(key, data)
+        self.city_ids.record(city, data.city_id)
+        return data
+
+    async def _fetch_group(self, cities: Tuple[str, ...], units: str) -> Dict[str, Observation]:
+        """Fetch up to 20 resolved cities in one group request and cache each one"""
+        by_id = {}
+        for city in cities:
+            by_id.setdefault(self.city_ids.get(city), []).append(city)
+        params = {
+            'id': ','.join(str(city_id) for city_id in by_id),
+            'appid': self.api_key,
+            'units': units
+        }
+
+        payload = await self._get_json(group_url_for(self.base_url), params, BACKGROUND)
+
+        return split_group_response(payload, by_id, units, self.cache)
+
+    async def _fetch(self, city: str, units: str, priority: int = INTERACTIVE) -> Dict:
+        """Make the upstream request"""
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': units
+        }
+
+        return await self._get_json(self.base_url, params, priority)
+
+    async def _get_json(self, url: str, params: Dict, priority: int) -> Dict:
+        """Make an upstream request through the circuit breaker and rate limiter, with a latency-derived timeout"""
+        probe = self.breaker.before_call()
+        try:
+            await self.rate_limiter.acquire_async(priority, timeout=self.timeout)
+        except BaseException:
+            # A probe still waiting for a token must not keep other callers from probing
+            if probe:
+                self.breaker.release_probe()
+            raise
+        timeout = aiohttp.ClientTimeout(total=self.breaker.timeout(self.timeout))
+        start = time.monotonic()
+        recorded = False
+        try:
+            async with self.get_session().get(url, params=params, timeout=timeout) as response:
+                if response.status == 429:
+                    self.rate_limiter.penalize(retry_after_seconds(response.headers))
+                if is_upstream_failure(response.status):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success(time.monotonic() - start)
+                recorded = True
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # Only upstream trouble counts: cancellation and local errors leave the breaker alone
+            if not recorded:
+                self.breaker.record_failure()
+            raise
+
+
+class LoopThread:
+    """
+    An event loop running for the life of the process on a daemon thread
+
+    Coroutines submitted from any thread or event loop run here, so the
+    AsyncWeatherClient session they use is never tied to a loop that a
+    WSGI request is about to close.
+    """
+
+    def __init__(self, name: str = 'weather-event-loop'):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, started on first use"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedule coro on the loop and return a thread-safe future of its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        """Await coro on the loop from another event loop; cancelling the caller cancels it"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+_loop_thread = None
+_loop_thread_lock = threading.Lock()
+
+
+def get_loop_thread() -> LoopThread:
+    """Return the process-wide LoopThread, creating it on first use"""
+    global _loop_thread
+    if _loop_thread is None:
+        with _loop_thread_lock:
+            if _loop_thread is None:
+                _loop_thread = LoopThread()
+    return _loop_thread
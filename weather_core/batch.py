@@ -0,0 +1,156 @@
+"""
+Helpers for batched lookups through the OpenWeatherMap group endpoint
+The group endpoint takes upstream city IDs, so names are resolved once and remembered
+"""
+
+import atexit
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from config import CITY_IDS_FILE, CITY_IDS_FLUSH_DELAY
+except ImportError:
+    # Fallback if config not found
+    CITY_IDS_FILE = None
+    CITY_IDS_FLUSH_DELAY = 5
+
+from .cache import cache_key, normalize_city
+from .observation import Observation
+
+# The group endpoint accepts at most this many IDs per request
+GROUP_MAX_IDS = 20
+
+
+def group_url_for(base_url: str) -> str:
+    """Derive the group endpoint from the current-weather endpoint"""
+    return base_url.rsplit('/', 1)[0] + '/group'
+
+
+def chunked(items: List, size: int = GROUP_MAX_IDS) -> List[List]:
+    """Split items into consecutive chunks of at most size"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def split_group_response(payload: Dict, by_id: Dict[int, List[str]], units: str,
+                         cache=None) -> Dict[str, Observation]:
+    """
+    Split a group response back into per-city observations
+
+    Args:
+        payload (Dict): Group endpoint response ({"cnt": ..., "list": [...]})
+        by_id (Dict[int, List[str]]): Requested upstream IDs and the names asked for
+        units (str): Units the request was made with
+        cache (TTLCache): Optional cache to store each city's data in
+
+    Returns:
+        Dict[str, Observation]: City name -> parsed observation
+    """
+    results = {}
+    for data in payload.get('list', []):
+        cities = by_id.get(data.get('id'), ())
+        if not cities:
+            continue
+        observation = Observation.from_payload(data)
+        for city in cities:
+            results[city] = observation
+            if cache is not None:
+                cache.set(cache_key(city, units), observation)
+    return results
+
+
+class CityIdRegistry:
+    """
+    Thread-safe map of normalized city names to upstream city IDs
+
+    IDs are learned from single-city responses. When a path is given the
+    map is loaded from and saved to a JSON file, so each city is resolved
+    once rather than once per process. New IDs are written flush_delay
+    seconds after the first of them and at interpreter exit, so a burst of
+    new cities rewrites the file once.
+    """
+
+    def __init__(self, path: Optional[str] = CITY_IDS_FILE, flush_delay: float = CITY_IDS_FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._ids = {}
+        self._lock = threading.Lock()
+        # Serializes file writes, so an older snapshot never replaces a newer one
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._ids.update(json.load(f))
+        if path:
+            atexit.register(self.flush)
+
+    def get(self, city: str) -> Optional[int]:
+        return self._ids.get(normalize_city(city))
+
+    def record(self, city: str, city_id: Optional[int]) -> None:
+        """Remember the upstream ID for city (no-op if unknown or unchanged)"""
+        if not city_id:
+            return
+        key = normalize_city(city)
+        with self._lock:
+            if self._ids.get(key) == city_id:
+                return
+            self._ids[key] = city_id
+            if not self.path:
+                return
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write the IDs learned since the last flush to the file, if any"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                ids = dict(self._ids)
+                self._dirty = False
+            try:
+                self._save(ids)
+            except OSError:
+                # Kept for the next flush, at the latest the one at exit
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def split(self, cities: Iterable[str]):
+        """Partition cities into (resolved, unresolved) lists, keeping order"""
+        resolved, unresolved = [], []
+        for city in cities:
+            (resolved if self.get(city) is not None else unresolved).append(city)
+        return resolved, unresolved
+
+    def _save(self, ids: Dict[str, int]) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(ids, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+_city_ids = None
+_city_ids_lock = threading.Lock()
+
+
+def get_city_ids() -> CityIdRegistry:
+    """Return the process-wide city ID registry, creating it on first use"""
+    global _city_ids
+    if _city_ids is None:
+        with _city_ids_lock:
+            if _city_ids is None:
+                _city_ids = CityIdRegistry()
+    return _city_ids
@@ -0,0 +1,179 @@
+"""
+Circuit breaker with latency-derived timeouts for upstream calls
+Shared by the sync and async clients so an outage is detected once per process
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+try:
+    from config import (BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT,
+                        BREAKER_MIN_TIMEOUT, BREAKER_LATENCY_WINDOW)
+except ImportError:
+    # Fallback if config not found
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_TIMEOUT = 30
+    BREAKER_MIN_TIMEOUT = 1
+    BREAKER_LATENCY_WINDOW = 100
+
+from .errors import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Adaptive timeouts are this multiple of the recent p99 latency
+TIMEOUT_P99_FACTOR = 3
+# Latency samples needed before the timeout adapts
+MIN_LATENCY_SAMPLES = 20
+
+
+def is_upstream_failure(status: int) -> bool:
+    """Return whether an HTTP status says the upstream is unwell (rather than the request bad)"""
+    return status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker around the upstream API
+
+    After failure_threshold consecutive failures (timeouts, connection
+    errors, 5xx/429 responses) the circuit opens and calls fail fast with
+    CircuitOpenError. Once reset_timeout has passed a single probe call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+
+    While closed, per-call timeouts follow the recent latency distribution
+    (TIMEOUT_P99_FACTOR x p99, at least min_timeout) capped by the caller's
+    configured timeout, so hung sockets are abandoned early. Probes get the
+    full configured timeout, and tripping forgets the old latencies, so a
+    lasting slowdown is learned instead of timing out every probe.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT,
+                 min_timeout: float = BREAKER_MIN_TIMEOUT,
+                 window: int = BREAKER_LATENCY_WINDOW,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the breaker
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe
+            min_timeout (float): Floor for latency-derived timeouts
+            window (int): Number of recent successful latencies kept
+            clock (Callable): Monotonic time source, overridable for tests
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.clock = clock
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless the caller may go upstream now
+
+        Returns:
+            bool: Whether the caller holds the half-open probe slot
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            # A probe that never reported back (e.g. it was cancelled) frees its slot after reset_timeout
+            if state == HALF_OPEN and (not self._probing or
+                                       self.clock() - self._probe_started >= self.reset_timeout):
+                self._state = HALF_OPEN
+                self._probing = True
+                self._probe_started = self.clock()
+                return True
+            self.rejected += 1
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - self.clock())
+        raise CircuitOpenError(retry_after)
+
+    def release_probe(self) -> None:
+        """Give the probe slot back without an outcome, when the probe never went upstream"""
+        with self._lock:
+            self._probing = False
+
+    def timeout(self, ceiling: float) -> float:
+        """Return the per-call timeout for the recent latency distribution, at most ceiling"""
+        with self._lock:
+            # Only the probe goes upstream while half-open; it must not be cut short by pre-outage latencies
+            if self._state == HALF_OPEN or len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return ceiling
+            ordered = sorted(self._latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return min(ceiling, max(self.min_timeout, p99 * TIMEOUT_P99_FACTOR))
+
+    def record_success(self, latency: float) -> None:
+        """Record a completed call and close the circuit"""
+        with self._lock:
+            self._latencies.append(latency)
+            self.consecutive_failures = 0
+            self._probing = False
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit past the threshold or after a failed probe"""
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                # The latencies before the trip may no longer describe the upstream
+                self._latencies.clear()
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self._probing = False
+
+    def stats(self) -> Dict:
+        """Return the breaker state and counters for status endpoints"""
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "latency_p50": ordered[len(ordered) // 2] if ordered else None,
+                "latency_p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else None,
+            }
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    """Return the process-wide upstream circuit breaker, creating it on first use"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
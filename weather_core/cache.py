@@ -0,0 +1,187 @@
+"""
+In-process TTL + LRU cache for weather lookups
+Shared by the sync and async clients so every front-end hits it
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    from config import WEATHER_CACHE_TTL, WEATHER_CACHE_MAX_ENTRIES
+except ImportError:
+    # Fallback if config not found
+    WEATHER_CACHE_TTL = 600
+    WEATHER_CACHE_MAX_ENTRIES = 1024
+
+try:
+    from config import WEATHER_CACHE_HARD_TTL
+except ImportError:
+    WEATHER_CACHE_HARD_TTL = 1800
+
+try:
+    from config import NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_MAX_ENTRIES
+except ImportError:
+    NEGATIVE_CACHE_TTL = 120
+    NEGATIVE_CACHE_MAX_ENTRIES = 4096
+
+# Upstream statuses that mean "this city cannot be resolved" rather than "upstream is unwell"
+NEGATIVE_STATUSES = (400, 404)
+
+_MISSING = object()
+
+
+def normalize_city(city: str) -> str:
+    """Normalize a city name so 'new  york' and 'New York' share a cache entry"""
+    return ' '.join(city.split()).casefold()
+
+
+def cache_key(city: str, units: str) -> Tuple[str, str]:
+    """Build the cache key for a city lookup"""
+    return normalize_city(city), units
+
+
+class TTLCache:
+    """
+    Thread-safe mapping whose entries expire after a TTL
+
+    Entries are fresh for ttl seconds. With a hard_ttl above ttl they stay
+    available through lookup() as stale until hard_ttl, so callers can serve
+    them while refreshing; get() only ever returns fresh entries.
+    Once maxsize entries are stored the least recently used one is evicted.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = WEATHER_CACHE_TTL, maxsize: int = WEATHER_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic, hard_ttl: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            ttl (float): Seconds an entry stays fresh, 0 disables the cache
+            maxsize (int): Maximum number of entries kept
+            clock (Callable): Monotonic time source, overridable for tests
+            hard_ttl (float): Seconds an entry may be served stale, defaults to ttl (no stale window)
+        """
+        self.ttl = ttl
+        self.hard_ttl = max(ttl, hard_ttl or 0)
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the fresh value for key, or default on a miss"""
+        entry = self.lookup(key, allow_stale=False)
+        return default if entry is None else entry[0]
+
+    def lookup(self, key: Hashable, allow_stale: bool = True) -> Optional[Tuple[Any, float]]:
+        """
+        Return (value, age in seconds) for key, or None on a miss
+
+        Entries older than ttl are returned only when allow_stale is set and
+        they are younger than hard_ttl; callers check age >= ttl to tell.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            age = self.clock() - stored_at
+            if age >= self.hard_ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if age >= self.ttl:
+                if not allow_stale:
+                    self.misses += 1
+                    return None
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+
+            self._data.move_to_end(key)
+            return value, age
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Drop key from the cache if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Return the cache counters for status endpoints"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.maxsize,
+                "ttl": self.ttl,
+                "hard_ttl": self.hard_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
+
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+
+
+def get_weather_cache() -> TTLCache:
+    """Return the process-wide weather cache, creating it on first use"""
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                _weather_cache = TTLCache(hard_ttl=WEATHER_CACHE_HARD_TTL)
+    return _weather_cache
+
+
+_negative_cache = None
+_negative_cache_lock = threading.Lock()
+
+
+def get_negative_cache() -> TTLCache:
+    """Return the process-wide cache of unresolvable cities, creating it on first use"""
+    global _negative_cache
+    if _negative_cache is None:
+        with _negative_cache_lock:
+            if _negative_cache is None:
+                _negative_cache = TTLCache(ttl=NEGATIVE_CACHE_TTL, maxsize=NEGATIVE_CACHE_MAX_ENTRIES)
+    return _negative_cache
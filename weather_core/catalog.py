@@ -0,0 +1,170 @@
+"""
+City catalog shared by every front-end for random selection
+Loaded once per process from a CSV file (name,country,region)
+"""
+
+import csv
+import os
+import random
+import threading
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from config import CITY_CATALOG_FILE
+except ImportError:
+    # Fallback if config not found
+    CITY_CATALOG_FILE = None
+
+from .cache import normalize_city
+
+DEFAULT_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cities.csv')
+
+
+class CityCatalog(Sequence):
+    """
+    Deduplicated, indexed list of city names
+
+    Names are kept in one tuple; country and region are stored as small
+    integer codes in arrays next to it, with per-country and per-region
+    position indexes. Membership is O(1) on the normalized name and sampling
+    k cities is O(k) regardless of the catalog size.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str]]):
+        """
+        Build the catalog, keeping the first row for each normalized name
+
+        Args:
+            rows (Iterable[Tuple[str, str, str]]): (name, country, region) rows
+        """
+        names = []
+        self._positions = {}
+        self._countries = []
+        self._regions = []
+        country_codes = array('H')
+        region_codes = array('H')
+        # value -> code, so lookups by country or region are O(1)
+        self._country_lookup = {}
+        self._region_lookup = {}
+
+        for name, country, region in rows:
+            key = normalize_city(name)
+            if not key or key in self._positions:
+                continue
+            self._positions[key] = len(names)
+            names.append(name.strip())
+            country_codes.append(self._code(country.strip().upper(), self._country_lookup, self._countries))
+            region_codes.append(self._code(region.strip(), self._region_lookup, self._regions))
+
+        self._names = tuple(names)
+        self._country_codes = country_codes
+        self._region_codes = region_codes
+        self._by_country = self._build_index(country_codes, len(self._countries))
+        self._by_region = self._build_index(region_codes, len(self._regions))
+
+    @staticmethod
+    def _code(value: str, lookup: Dict[str, int], values: List[str]) -> int:
+        if value not in lookup:
+            lookup[value] = len(values)
+            values.append(value)
+        return lookup[value]
+
+    @staticmethod
+    def _build_index(codes: array, size: int) -> List[array]:
+        index = [array('I') for _ in range(size)]
+        for position, code in enumerate(codes):
+            index[code].append(position)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, item):
+        return self._names[item]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __contains__(self, city) -> bool:
+        return isinstance(city, str) and normalize_city(city) in self._positions
+
+    def __repr__(self) -> str:
+        return f"<CityCatalog: {len(self)} cities, {len(self._countries)} countries>"
+
+    def get(self, city: str) -> Optional[Dict]:
+        """Return name, country and region for a city, or None if unknown"""
+        position = self._positions.get(normalize_city(city))
+        if position is None:
+            return None
+        return {
+            'name': self._names[position],
+            'country': self._countries[self._country_codes[position]],
+            'region': self._regions[self._region_codes[position]],
+        }
+
+    def countries(self) -> List[str]:
+        return list(self._countries)
+
+    def regions(self) -> List[str]:
+        return list(self._regions)
+
+    def by_country(self, country: str) -> List[str]:
+        """Return every city in a country (ISO 3166 alpha-2 code)"""
+        return [self._names[i] for i in self._positions_for(country.upper(), self._country_lookup, self._by_country)]
+
+    def by_region(self, region: str) -> List[str]:
+        """Return every city in a region (e.g. Europe, Asia)"""
+        return [self._names[i] for i in self._positions_for(region, self._region_lookup, self._by_region)]
+
+    @staticmethod
+    def _positions_for(value: str, lookup: Dict[str, int], index: List[array]) -> array:
+        code = lookup.get(value)
+        return index[code] if code is not None else array('I')
+
+    def sample(self, k: int, country: Optional[str] = None, region: Optional[str] = None) -> List[str]:
+        """
+        Pick k distinct cities at random, optionally within a country or region
+
+        Raises ValueError if fewer than k cities match, like random.sample.
+        """
+        if country is None and region is None:
+            return [self._names[i] for i in random.sample(range(len(self._names)), k)]
+
+        if country is not None:
+            positions = self._positions_for(country.upper(), self._country_lookup, self._by_country)
+        else:
+            positions = self._positions_for(region, self._region_lookup, self._by_region)
+        return [self._names[positions[i]] for i in random.sample(range(len(positions)), k)]
+
+
+def load_catalog(path: Optional[str] = None) -> CityCatalog:
+    """
+    Load a catalog from a CSV file with name,country,region columns
+
+    Args:
+        path (str): CSV path, defaults to CITY_CATALOG_FILE or the bundled list
+
+    Returns:
+        CityCatalog: The deduplicated catalog
+    """
+    path = path or CITY_CATALOG_FILE or DEFAULT_CATALOG_FILE
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        return CityCatalog((row['name'], row.get('country') or '', row.get('region') or '')
+                           for row in reader)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CityCatalog:
+    """Return the process-wide catalog, loading it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
@@ -0,0 +1,268 @@
+"""
+Shared HTTP client for the OpenWeatherMap API
+Used by every front-end (Task 1, 2, 3, 4, 5) instead of bare requests.get
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from config import REQUEST_TIMEOUT, UNITS
+except ImportError:
+    # Fallback if config not found
+    REQUEST_TIMEOUT = 10
+    UNITS = "metric"
+
+try:
+    from config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+except ImportError:
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_MAXSIZE = 20
+
+try:
+    from config import OPENWEATHER_BASE_URL
+except ImportError:
+    OPENWEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+
+from .batch import CityIdRegistry, chunked, get_city_ids, group_url_for, split_group_response
+from .breaker import CircuitBreaker, get_breaker, is_upstream_failure
+from .cache import NEGATIVE_STATUSES, TTLCache, cache_key, get_negative_cache, get_weather_cache
+from .errors import CityNotFoundError
+from .ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, get_rate_limiter, retry_after_seconds
+from .observation import Observation
+from .fanout import fetch_concurrently, get_executor
+from .singleflight import SingleFlight, get_single_flight
+
+DEFAULT_BASE_URL = OPENWEATHER_BASE_URL
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections: int = HTTP_POOL_CONNECTIONS,
+                   pool_maxsize: int = HTTP_POOL_MAXSIZE) -> requests.Session:
+    """
+    Create a keep-alive session with a bounded connection pool
+
+    Args:
+        pool_connections (int): Number of per-host pools to keep
+        pool_maxsize (int): Maximum pooled connections per host
+
+    Returns:
+        requests.Session: Session with the pooled adapter mounted
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+class WeatherClient:
+    """Thin wrapper around the shared session for current-weather lookups"""
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 timeout: float = REQUEST_TIMEOUT, units: str = UNITS,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[TTLCache] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 city_ids: Optional[CityIdRegistry] = None,
+                 negative_cache: Optional[TTLCache] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize the client
+
+        Args:
+            api_key (str): OpenWeatherMap API key
+            base_url (str): Current-weather endpoint
+            timeout (float): Per-request timeout in seconds
+            units (str): Default units (metric, imperial, kelvin)
+            session (requests.Session): Session to use, defaults to the shared one
+            cache (TTLCache): Response cache, defaults to the shared one
+            single_flight (SingleFlight): Coalescing group, defaults to the shared one
+            city_ids (CityIdRegistry): Name -> upstream ID map, defaults to the shared one
+            negative_cache (TTLCache): Cache of unresolvable cities, defaults to the shared one
+            breaker (CircuitBreaker): Upstream circuit breaker, defaults to the shared one
+            rate_limiter (RateLimiter): Upstream token bucket, defaults to the shared one
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.units = units
+        self.session = session or get_session()
+        self.cache = cache if cache is not None else get_weather_cache()
+        self.single_flight = single_flight if single_flight is not None else get_single_flight()
+        self.city_ids = city_ids if city_ids is not None else get_city_ids()
+        self.negative_cache = negative_cache if negative_cache is not None else get_negative_cache()
+        self.breaker = breaker if breaker is not None else get_breaker()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+
+    def get_weather(self, city: str, units: Optional[str] = None,
+                    priority: int = INTERACTIVE) -> Observation:
+        """
+        Fetch current weather for a city, served from the cache when fresh
+
+        Past the cache TTL a stale entry is still returned immediately while
+        it is refreshed on the shared fetch pool; callers only block on
+        upstream once the entry is older than the cache hard_ttl.
+        Concurrent misses for the same city and units share one upstream call.
+        A city upstream recently answered with 404/400 raises CityNotFoundError
+        without another upstream call, and CircuitOpenError is raised while
+        the breaker considers the upstream down. Other errors are not swallowed here:
+        requests exceptions (including JSON decode errors) propagate so each
+        front-end can report them its own way.
+
+        Args:
+            city (str): City name
+            units (str): Units override, defaults to the client units
+            priority (int): Rate limiter priority, INTERACTIVE or BACKGROUND
+
+        Returns:
+            Observation: Parsed current weather, cache_age set to the seconds since it was fetched
+        """
+        units = units or self.units
+        key = cache_key(city, units)
+        if self.cache.enabled:
+            entry = self.cache.lookup(key)
+            if entry is not None:
+                data, age = entry
+                if age >= self.cache.ttl:
+                    self._revalidate(key, city, units)
+                return data.with_age(age)
+        status = self.negative_cache.get(key)
+        if status is not None:
+            raise CityNotFoundError(city, status)
+
+        data = self.single_flight.do(key, lambda: self._fetch_and_cache(key, city, units, priority))
+        return data.with_age(0)
+
+    def get_weather_many(self, cities: List[str], units: Optional[str] = None,
+                         max_workers: Optional[int] = None,
+                         deadline: Optional[float] = None) -> List[Tuple[str, Optional[Observation]]]:
+        """
+        Fetch current weather for many cities with as few upstream calls as possible
+
+        Cached cities are answered locally. Cities whose upstream ID is known
+        are fetched through the group endpoint, up to 20 per request; the rest
+        go through get_weather, which also learns their IDs for next time.
+        Requests run concurrently (see fetch_concurrently); failed or late
+        cities come back with None.
+
+        Args:
+            cities (List[str]): City names
+            units (str): Units override, defaults to the client units
+            max_workers (int): Concurrency limit, defaults to the shared pool
+            deadline (float): Seconds the whole batch may take
+
+        Returns:
+            List[Tuple[str, Optional[Observation]]]: (city, observation) pairs in input order
+        """
+        units = units or self.units
+        found = {}
+        pending = []
+        for city in cities:
+            data = self.cache.get(cache_key(city, units)) if self.cache.enabled else None
+            if data is not None:
+                found[city] = data
+            else:
+                pending.append(city)
+
+        resolved, unresolved = self.city_ids.split(pending)
+        jobs = [tuple(chunk) for chunk in chunked(resolved)] + [(city,) for city in unresolved]
+
+        def run(job):
+            if len(job) == 1:
+                return {job[0]: self.get_weather(job[0], units, BACKGROUND)}
+            return self._fetch_group(job, units)
+
+        for job, result in fetch_concurrently(run, jobs, max_workers=max_workers, deadline=deadline):
+            if result:
+                found.update(result)
+
+        return [(city, found.get(city)) for city in cities]
+
+    def _revalidate(self, key, city: str, units: str) -> None:
+        """Refresh a stale entry in the background unless a fetch for it is already running"""
+        if self.single_flight.busy(key):
+            return
+        # Failures are dropped: the stale entry keeps being served until its hard TTL
+        get_executor().submit(self.single_flight.do, key, lambda: self._fetch_and_cache(key, city, units, BACKGROUND))
+
+    def _fetch_and_cache(self, key, city: str, units: str, priority: int = INTERACTIVE) -> Observation:
+        """Fetch upstream and store the result (or a 404/400) for later callers"""
+        try:
+            data = Observation.from_payload(self._fetch(city, units, priority))
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in NEGATIVE_STATUSES:
+                self.negative_cache.set(key, status)
+            raise
+        self.cache.set(key, data)
+        self.city_ids.record(city, data.city_id)
+        return data
+
+    def _fetch_group(self, cities: Tuple[str, ...], units: str) -> Dict[str, Observation]:
+        """Fetch up to 20 resolved cities in one group request and cache each one"""
+        by_id = {}
+        for city in cities:
+            by_id.setdefault(self.city_ids.get(city), []).append(city)
+        params = {
+            'id': ','.join(str(city_id) for city_id in by_id),
+            'appid': self.api_key,
+            'units': units
+        }
+
+        response = self._get(group_url_for(self.base_url), params, BACKGROUND)
+
+        return split_group_response(response.json(), by_id, units, self.cache)
+
+    def _fetch(self, city: str, units: str, priority: int = INTERACTIVE) -> Dict:
+        """Make the upstream request"""
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': units
+        }
+
+        return self._get(self.base_url, params, priority).json()
+
+    def _get(self, url: str, params: Dict, priority: int) -> requests.Response:
+        """Make an upstream request through the circuit breaker and rate limiter, with a latency-derived timeout"""
+        probe = self.breaker.before_call()
+        try:
+            self.rate_limiter.acquire(priority, timeout=self.timeout)
+        except BaseException:
+            # A probe still waiting for a token must not keep other callers from probing
+            if probe:
+                self.breaker.release_probe()
+            raise
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, timeout=self.breaker.timeout(self.timeout))
+        except requests.RequestException:
+            # Only upstream trouble counts: cancellation and local errors leave the breaker alone
+            self.breaker.record_failure()
+            raise
+        if response.status_code == 429:
+            self.rate_limiter.penalize(retry_after_seconds(response.headers))
+        if is_upstream_failure(response.status_code):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(time.monotonic() - start)
+        response.raise_for_status()
+        return response
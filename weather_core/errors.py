@@ -0,0 +1,28 @@
+"""
+Exceptions raised by the shared weather clients
+"""
+
+
+class CityNotFoundError(LookupError):
+    """Raised when the negative cache already knows upstream cannot resolve a city"""
+
+    def __init__(self, city: str, status: int = 404):
+        super().__init__(f"{status}: city not found: {city} (cached)")
+        self.city = city
+        self.status = status
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without an upstream call while the circuit breaker considers the upstream down"""
+
+    def __init__(self, retry_after: float = 0.0):
+        super().__init__(f"upstream unavailable, circuit open (retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+
+class RateLimitedError(RuntimeError):
+    """Raised when the client-side rate limiter had no token for a call within its timeout"""
+
+    def __init__(self, retry_after: float = 0.0):
+        super().__init__(f"upstream quota exhausted locally (retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
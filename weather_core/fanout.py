@@ -0,0 +1,121 @@
+"""
+Bounded concurrent fan-out for multi-city lookups
+Used by every WeatherApp.get_random_cities_weather
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from config import FANOUT_MAX_WORKERS, FANOUT_DEADLINE
+except ImportError:
+    # Fallback if config not found
+    FANOUT_MAX_WORKERS = 8
+    FANOUT_DEADLINE = 15
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide fetch pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS,
+                                               thread_name_prefix='weather-fetch')
+    return _executor
+
+
+def fetch_concurrently(fetch: Callable[[str], Optional[Dict]], cities: List[str],
+                       max_workers: Optional[int] = None,
+                       deadline: Optional[float] = None) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Run fetch(city) for every city on a bounded thread pool
+
+    The batch returns once every fetch has finished or the deadline has
+    passed, whichever comes first. Cities that raised or did not finish in
+    time are reported with a None result, so callers always get partial
+    results instead of an exception.
+
+    Args:
+        fetch (Callable): Function returning weather data (or None) for a city
+        cities (List[str]): Cities to fetch
+        max_workers (int): Concurrency limit, defaults to the shared pool size
+        deadline (float): Seconds the whole batch may take, defaults to FANOUT_DEADLINE
+
+    Returns:
+        List[Tuple[str, Optional[Dict]]]: (city, data) pairs in input order
+    """
+    if not cities:
+        return []
+    if deadline is None:
+        deadline = FANOUT_DEADLINE
+
+    own_executor = max_workers is not None
+    executor = ThreadPoolExecutor(max_workers=max_workers) if own_executor else get_executor()
+
+    try:
+        futures = [executor.submit(fetch, city) for city in cities]
+        wait(futures, timeout=deadline)
+
+        results = []
+        for city, future in zip(cities, futures):
+            if not future.done():
+                # Stragglers keep running in the background; their result is dropped
+                future.cancel()
+                results.append((city, None))
+            elif future.cancelled() or future.exception() is not None:
+                results.append((city, None))
+            else:
+                results.append((city, future.result()))
+        return results
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def fetch_concurrently_async(fetch: Callable[[str], Awaitable[Optional[Dict]]],
+                                   cities: List[str], max_concurrency: Optional[int] = None,
+                                   deadline: Optional[float] = None) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    asyncio counterpart of fetch_concurrently
+
+    Args:
+        fetch (Callable): Coroutine function returning weather data (or None) for a city
+        cities (List[str]): Cities to fetch
+        max_concurrency (int): Optional in-flight limit, otherwise bounded by the connector
+        deadline (float): Seconds the whole batch may take, defaults to FANOUT_DEADLINE
+
+    Returns:
+        List[Tuple[str, Optional[Dict]]]: (city, data) pairs in input order
+    """
+    if not cities:
+        return []
+    if deadline is None:
+        deadline = FANOUT_DEADLINE
+
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def run(city):
+        if semaphore is None:
+            return await fetch(city)
+        async with semaphore:
+            return await fetch(city)
+
+    tasks = [asyncio.ensure_future(run(city)) for city in cities]
+    await asyncio.wait(tasks, timeout=deadline)
+
+    results = []
+    for city, task in zip(cities, tasks):
+        if not task.done():
+            task.cancel()
+            results.append((city, None))
+        elif task.cancelled() or task.exception() is not None:
+            results.append((city, None))
+        else:
+            results.append((city, task.result()))
+    return results
@@ -0,0 +1,339 @@
+"""
+Local stand-in for the OpenWeatherMap current-weather API
+Serves deterministic payloads for every catalog city, with injectable latency and faults
+
+Run it and point the front-ends at it:
+
+    python -m weather_core.mock_server --port 8081 --latency lognormal:0.08:0.5 --error-rate 0.01
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8081/data/2.5/weather python task3_flask_web/app.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+try:
+    from aiohttp import web
+except ImportError:
+    # aiohttp is only needed to run the mock server
+    web = None
+
+from .cache import normalize_city
+from .catalog import CityCatalog, get_catalog
+
+WEATHER_PATH = '/data/2.5/weather'
+GROUP_PATH = '/data/2.5/group'
+STATS_PATH = '/mock/stats'
+
+_CONDITIONS = [
+    (800, 'Clear', 'clear sky', '01d'),
+    (801, 'Clouds', 'few clouds', '02d'),
+    (803, 'Clouds', 'broken clouds', '04d'),
+    (500, 'Rain', 'light rain', '10d'),
+    (701, 'Mist', 'mist', '50d'),
+    (600, 'Snow', 'light snow', '13d'),
+]
+
+
+def city_id(city: str) -> int:
+    """Stable upstream-style ID for a city name"""
+    return zlib.crc32(normalize_city(city).encode('utf-8')) % 9000000 + 1000000
+
+
+def _convert(kelvin: float, units: str) -> float:
+    if units == 'metric':
+        return round(kelvin - 273.15, 2)
+    if units == 'imperial':
+        return round((kelvin - 273.15) * 9 / 5 + 32, 2)
+    return round(kelvin, 2)
+
+
+def make_observation(name: str, country: str, units: str = 'metric', now: Optional[float] = None) -> Dict:
+    """
+    Build an OpenWeatherMap-shaped current-weather payload for a city
+
+    Values are derived from the city name, so every run serves the same
+    weather for the same city.
+    """
+    seed = zlib.crc32(normalize_city(name).encode('utf-8'))
+    rng = random.Random(seed)
+    now = int(now if now is not None else time.time())
+    kelvin = rng.uniform(250.0, 310.0)
+    condition_id, main, description, icon = rng.choice(_CONDITIONS)
+    wind = round(rng.uniform(0.0, 15.0), 2)
+    return {
+        'coord': {'lon': round(rng.uniform(-180, 180), 4), 'lat': round(rng.uniform(-60, 70), 4)},
+        'weather': [{'id': condition_id, 'main': main, 'description': description, 'icon': icon}],
+        'base': 'stations',
+        'main': {
+            'temp': _convert(kelvin, units),
+            'feels_like': _convert(kelvin - rng.uniform(0, 4), units),
+            'temp_min': _convert(kelvin - rng.uniform(0, 3), units),
+            'temp_max': _convert(kelvin + rng.uniform(0, 3), units),
+            'pressure': rng.randint(980, 1040),
+            'humidity': rng.randint(20, 100),
+        },
+        'visibility': 10000,
+        'wind': {'speed': wind if units != 'imperial' else round(wind * 2.237, 2), 'deg': rng.randint(0, 359)},
+        'clouds': {'all': rng.randint(0, 100)},
+        'dt': now,
+        'sys': {'country': country, 'sunrise': now - 21600, 'sunset': now + 21600},
+        'timezone': rng.choice(range(-43200, 50401, 3600)),
+        'id': city_id(name),
+        'name': name,
+        'cod': 200,
+    }
+
+
+class FaultProfile:
+    """
+    Latency distribution and fault rates applied to every mock response
+
+    latency is 'fixed:S', 'uniform:LOW:HIGH' or 'lognormal:MEDIAN:SIGMA'
+    (seconds). Each request independently fails with a 500 at error_rate,
+    a 429 at rate_limit_rate, or is sent as a slow-drip body at drip_rate.
+    """
+
+    def __init__(self, latency: str = 'fixed:0', error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, drip_rate: float = 0.0,
+                 drip_chunk: int = 64, drip_delay: float = 0.05, retry_after: int = 1,
+                 seed: Optional[int] = None):
+        """
+        Initialize the profile
+
+        Args:
+            latency (str): Latency distribution spec, see the class docstring
+            error_rate (float): Share of requests answered with 500
+            rate_limit_rate (float): Share of requests answered with 429 and Retry-After
+            drip_rate (float): Share of successful responses sent in slow chunks
+            drip_chunk (int): Bytes per slow-drip chunk
+            drip_delay (float): Seconds between slow-drip chunks
+            retry_after (int): Retry-After seconds sent with 429s
+            seed (int): Seed for reproducible fault sequences
+        """
+        kind, *params = latency.split(':')
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"unknown latency distribution: {latency}")
+        self.latency = latency
+        self._kind = kind
+        self._params = [float(p) for p in params]
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.drip_rate = drip_rate
+        self.drip_chunk = drip_chunk
+        self.drip_delay = drip_delay
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        """Draw a response latency in seconds"""
+        if self._kind == 'fixed':
+            return self._params[0] if self._params else 0.0
+        if self._kind == 'uniform':
+            return self.rng.uniform(*self._params)
+        median, sigma = self._params
+        return self.rng.lognormvariate(0, sigma) * median
+
+    def fault(self) -> Optional[str]:
+        """Draw the fault for one request: 'error', 'rate_limit', 'drip' or None"""
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return 'error'
+        roll -= self.error_rate
+        if roll < self.rate_limit_rate:
+            return 'rate_limit'
+        roll -= self.rate_limit_rate
+        if roll < self.drip_rate:
+            return 'drip'
+        return None
+
+
+def create_app(profile: Optional[FaultProfile] = None, catalog: Optional[CityCatalog] = None) -> "web.Application":
+    """
+    Build the mock API application
+
+    Args:
+        profile (FaultProfile): Latency and faults to inject, defaults to none
+        catalog (CityCatalog): Cities the mock knows, defaults to the shared catalog
+
+    Returns:
+        web.Application: App serving the weather, group and stats routes
+    """
+    if web is None:
+        raise ImportError("aiohttp is required for the mock server: pip install aiohttp")
+
+    profile = profile or FaultProfile()
+    catalog = catalog if catalog is not None else get_catalog()
+    by_id = {city_id(name): name for name in catalog}
+    counters = {'requests': 0, 'ok': 0, 'not_found': 0, 'errors': 0, 'rate_limited': 0, 'dripped': 0}
+
+    def observation(name: str, units: str) -> Dict:
+        return make_observation(name, catalog.get(name)['country'], units)
+
+    async def respond(payload: Dict, request: "web.Request") -> "web.StreamResponse":
+        await asyncio.sleep(profile.delay())
+        fault = profile.fault()
+        if fault == 'error':
+            counters['errors'] += 1
+            return web.json_response({'cod': 500, 'message': 'Internal error'}, status=500)
+        if fault == 'rate_limit':
+            counters['rate_limited'] += 1
+            return web.json_response({'cod': 429, 'message': 'Your account is temporary blocked'},
+                                     status=429, headers={'Retry-After': str(profile.retry_after)})
+        if fault != 'drip':
+            return web.json_response(payload, status=int(payload.get('cod', 200)))
+
+        counters['dripped'] += 1
+        body = json.dumps(payload).encode('utf-8')
+        response = web.StreamResponse(status=int(payload.get('cod', 200)),
+                                      headers={'Content-Type': 'application/json'})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for start in range(0, len(body), profile.drip_chunk):
+            await response.write(body[start:start + profile.drip_chunk])
+            await asyncio.sleep(profile.drip_delay)
+        await response.write_eof()
+        return response
+
+    async def weather(request: "web.Request") -> "web.StreamResponse":
+        counters['requests'] += 1
+        units = request.query.get('units', 'standard')
+        if 'id' in request.query:
+            name = by_id.get(int(request.query['id']) if request.query['id'].isdigit() else 0)
+        else:
+            known = catalog.get(request.query.get('q', ''))
+            name = known['name'] if known else None
+        if name is None:
+            counters['not_found'] += 1
+            return await respond({'cod': '404', 'message': 'city not found'}, request)
+        counters['ok'] += 1
+        return await respond(observation(name, units), request)
+
+    async def group(request: "web.Request") -> "web.StreamResponse":
+        counters['requests'] += 1
+        units = request.query.get('units', 'standard')
+        ids = [int(value) for value in request.query.get('id', '').split(',') if value.isdigit()]
+        if not ids or len(ids) > 20:
+            return await respond({'cod': '400', 'message': 'id count must be 1..20'}, request)
+        payloads = [observation(by_id[value], units) for value in ids if value in by_id]
+        counters['ok'] += 1
+        return await respond({'cnt': len(payloads), 'list': payloads}, request)
+
+    async def stats(request: "web.Request") -> "web.Response":
+        return web.json_response(dict(counters, latency=profile.latency))
+
+    app = web.Application()
+    app.router.add_get(WEATHER_PATH, weather)
+    app.router.add_get(GROUP_PATH, group)
+    app.router.add_get(STATS_PATH, stats)
+    return app
+
+
+class MockServer:
+    """
+    Run the mock API on a background thread, for tests and benchmarks
+
+        with MockServer(FaultProfile(latency='fixed:0.05')) as server:
+            client = WeatherClient('key', base_url=server.base_url)
+    """
+
+    def __init__(self, profile: Optional[FaultProfile] = None, host: str = '127.0.0.1', port: int = 0,
+                 catalog: Optional[CityCatalog] = None):
+        self.profile = profile
+        self.host = host
+        self.port = port
+        self.catalog = catalog
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._error = None
+
+    @property
+    def base_url(self) -> str:
+        """Current-weather endpoint to pass as a client's base_url"""
+        return f'http://{self.host}:{self.port}{WEATHER_PATH}'
+
+    def start(self) -> "MockServer":
+        """Serve on a background thread, raising the setup error (e.g. port in use) if it could not start"""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._error = None
+
+        async def setup():
+            self._runner = web.AppRunner(create_app(self.profile, self.catalog))
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(setup())
+            except BaseException as e:
+                self._error = e
+                return
+            finally:
+                started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='mock-openweather', daemon=True)
+        self._thread.start()
+        started.wait()
+        if self._error is not None:
+            error = self._error
+            # run() has returned without starting the loop
+            self._thread.join()
+            self.stop()
+            raise error
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        if self._thread.is_alive():
+            if self._runner is not None:
+                asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        elif self._runner is not None:
+            # Setup failed part way: the loop is no longer running, clean up on it directly
+            self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+        self._loop = None
+        self._runner = None
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenWeatherMap stand-in with fault injection")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', default='fixed:0',
+                        help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument('--drip-rate', type=float, default=0.0, help="share of bodies sent in slow chunks")
+    parser.add_argument('--drip-chunk', type=int, default=64)
+    parser.add_argument('--drip-delay', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    profile = FaultProfile(args.latency, args.error_rate, args.rate_limit_rate, args.drip_rate,
+                           args.drip_chunk, args.drip_delay, seed=args.seed)
+    print(f"Mock OpenWeatherMap API on http://{args.host}:{args.port}{WEATHER_PATH}")
+    web.run_app(create_app(profile), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Compact current-weather record parsed from OpenWeatherMap responses
+The clients cache and return these instead of the raw nested JSON
+"""
+
+from typing import Dict, Optional
+
+
+class Observation:
+    """
+    Current weather for one city, holding only the fields the front-ends use
+
+    Built once per upstream response by from_payload() and shared between
+    callers through the cache, so instances must be treated as read-only;
+    with_age() returns an annotated copy. to_dict() is the slim schema the
+    web front-ends send to the browser.
+    """
+
+    __slots__ = ('city_id', 'name', 'country', 'lat', 'lon', 'temp', 'feels_like', 'humidity',
+                 'pressure', 'wind_speed', 'wind_deg', 'visibility', 'condition', 'description',
+                 'icon', 'observed_at', 'cache_age')
+
+    def __init__(self, name: str, temp: float, country: str = '', feels_like: Optional[float] = None,
+                 humidity: int = 0, pressure: int = 0, wind_speed: float = 0.0,
+                 condition: str = '', description: str = '', icon: str = '',
+                 city_id: Optional[int] = None, lat: Optional[float] = None, lon: Optional[float] = None,
+                 wind_deg: Optional[int] = None, visibility: Optional[int] = None,
+                 observed_at: Optional[int] = None, cache_age: float = 0.0):
+        self.city_id = city_id
+        self.name = name
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+        self.temp = temp
+        self.feels_like = temp if feels_like is None else feels_like
+        self.humidity = humidity
+        self.pressure = pressure
+        self.wind_speed = wind_speed
+        self.wind_deg = wind_deg
+        self.visibility = visibility
+        self.condition = condition
+        self.description = description
+        self.icon = icon
+        self.observed_at = observed_at
+        self.cache_age = cache_age
+
+    @classmethod
+    def from_payload(cls, data: Dict) -> "Observation":
+        """
+        Project a current-weather response (or one group list entry) onto an Observation
+
+        Raises:
+            KeyError: The payload has no name or main.temp
+        """
+        main = data['main']
+        weather = (data.get('weather') or [{}])[0]
+        wind = data.get('wind') or {}
+        coord = data.get('coord') or {}
+        return cls(
+            city_id=data.get('id'),
+            name=data['name'],
+            country=(data.get('sys') or {}).get('country', ''),
+            lat=coord.get('lat'),
+            lon=coord.get('lon'),
+            temp=main['temp'],
+            feels_like=main.get('feels_like'),
+            humidity=main.get('humidity', 0),
+            pressure=main.get('pressure', 0),
+            wind_speed=wind.get('speed', 0.0),
+            wind_deg=wind.get('deg'),
+            visibility=data.get('visibility'),
+            condition=weather.get('main', ''),
+            description=weather.get('description', ''),
+            icon=weather.get('icon', ''),
+            observed_at=data.get('dt'),
+        )
+
+    def with_age(self, age: float) -> "Observation":
+        """Return a copy annotated with the seconds since it was fetched"""
+        copy = Observation.__new__(Observation)
+        for slot in self.__slots__:
+            setattr(copy, slot, getattr(self, slot))
+        copy.cache_age = round(age, 1)
+        return copy
+
+    def to_dict(self) -> Dict:
+        """Slim JSON-ready representation used by the /api/* endpoints"""
+        return {
+            'name': self.name,
+            'country': self.country,
+            'temp': self.temp,
+            'feels_like': self.feels_like,
+            'humidity': self.humidity,
+            'pressure': self.pressure,
+            'wind_speed': self.wind_speed,
+            'condition': self.condition,
+            'description': self.description,
+            'icon': self.icon,
+            'observed_at': self.observed_at,
+            'cache_age': self.cache_age,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Observation {self.name}, {self.country}: {self.temp} {self.description}>"
@@ -0,0 +1,269 @@
+"""
+Client-side token bucket for upstream calls, with interactive lookups served first
+Shared by the sync and async clients; optionally shared across processes via a lock file
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: the bucket is then per process only
+    fcntl = None
+
+try:
+    from config import RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_FILE, RATE_LIMIT_BACKOFF
+except ImportError:
+    # Fallback if config not found
+    RATE_LIMIT_PER_MINUTE = 60
+    RATE_LIMIT_BURST = 10
+    RATE_LIMIT_FILE = None
+    RATE_LIMIT_BACKOFF = 10
+
+from .errors import RateLimitedError
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# How often waiters that are not at the head of the queue re-check their turn
+_QUEUE_POLL = 0.05
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Read a delay-seconds Retry-After header, None if absent or an HTTP date"""
+    try:
+        return max(0.0, float(headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket refilled at rate_per_minute, holding at most burst tokens
+
+    Every upstream call takes one token. Callers that have to wait are
+    queued by (priority, arrival), so INTERACTIVE lookups overtake
+    BACKGROUND traffic such as random-city batches and cache refreshes.
+    Sync and async callers share one queue.
+
+    With a path the bucket state lives in that file, guarded by an
+    exclusive flock, so every process on the host draws from one quota.
+    """
+
+    def __init__(self, rate_per_minute: float = RATE_LIMIT_PER_MINUTE, burst: int = RATE_LIMIT_BURST,
+                 path: Optional[str] = RATE_LIMIT_FILE, backoff: float = RATE_LIMIT_BACKOFF):
+        """
+        Initialize the limiter
+
+        Args:
+            rate_per_minute (float): Sustained upstream calls per minute, 0 disables limiting
+            burst (int): Tokens that may be spent at once after an idle period
+            path (str): Optional state file shared by processes on one host
+            backoff (float): Seconds to pause every call after a 429 without Retry-After
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.path = path if fcntl is not None else None
+        self.backoff = backoff
+        # Wall time, so processes sharing the state file agree on it
+        self.clock = time.time
+        self._tokens = float(self.burst)
+        self._updated = self.clock()
+        self._blocked_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.granted = 0
+        self.throttled = 0
+        self.backoffs = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """
+        Take a token, waiting for one behind higher-priority callers
+
+        Raises:
+            RateLimitedError: No token could be taken within timeout seconds
+        """
+        if not self.enabled:
+            return
+        ticket = self._enqueue(priority)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                wait = self._try_take(ticket)
+                if not wait:
+                    return
+                with self._cond:
+                    self._cond.wait(self._bounded(wait, deadline))
+        finally:
+            self._dequeue(ticket)
+
+    async def acquire_async(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """asyncio counterpart of acquire(): waits without blocking the event loop"""
+        if not self.enabled:
+            return
+        ticket = self._enqueue(priority)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                if self.path:
+                    # The shared state file is flocked and rewritten, which may wait on other processes
+                    wait = await asyncio.to_thread(self._try_take, ticket)
+                else:
+                    wait = self._try_take(ticket)
+                if not wait:
+                    return
+                await asyncio.sleep(self._bounded(wait, deadline))
+        finally:
+            self._dequeue(ticket)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """Pause every caller after upstream answered 429 (Retry-After seconds, default backoff)"""
+        if not self.enabled:
+            return
+        until = self.clock() + (retry_after if retry_after is not None else self.backoff)
+        if self.path:
+            with self._shared_state() as state:
+                state['blocked_until'] = max(state['blocked_until'], until)
+        with self._cond:
+            self.backoffs += 1
+            if not self.path:
+                self._blocked_until = max(self._blocked_until, until)
+
+    def _bounded(self, wait: float, deadline: Optional[float]) -> float:
+        """Clip a wait to the caller's deadline, raising once it has passed"""
+        if deadline is None:
+            return wait
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            with self._cond:
+                self.throttled += 1
+            raise RateLimitedError(wait)
+        return min(wait, remaining)
+
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]) -> None:
+        with self._cond:
+            if self._queue and self._queue[0] == ticket:
+                heapq.heappop(self._queue)
+            else:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def _try_take(self, ticket: Tuple[int, int]) -> float:
+        """Take a token for ticket if it is first in line; return 0 or the seconds to wait"""
+        with self._cond:
+            if self._queue[0] != ticket:
+                return _QUEUE_POLL
+            if not self.path:
+                state = {'tokens': self._tokens, 'updated': self._updated, 'blocked_until': self._blocked_until}
+                wait = self._take(state)
+                self._tokens, self._updated, self._blocked_until = (state['tokens'], state['updated'],
+                                                                    state['blocked_until'])
+                if not wait:
+                    self.granted += 1
+                return wait
+        # The flock may wait on other processes, so it is never taken while holding _cond
+        with self._shared_state() as state:
+            wait = self._take(state)
+        if not wait:
+            with self._cond:
+                self.granted += 1
+        return wait
+
+    def _take(self, state: Dict) -> float:
+        now = self.clock()
+        if now < state['blocked_until']:
+            return state['blocked_until'] - now
+        elapsed = max(0.0, now - state['updated'])
+        state['tokens'] = min(self.burst, state['tokens'] + elapsed * self.rate)
+        state['updated'] = now
+        if state['tokens'] >= 1:
+            state['tokens'] -= 1
+            return 0.0
+        return (1 - state['tokens']) / self.rate
+
+    def _shared_state(self):
+        return _LockedState(self.path, self.burst, self.clock)
+
+    def stats(self) -> Dict:
+        """Return the limiter counters for status endpoints"""
+        if self.path:
+            with self._shared_state() as state:
+                tokens = state['tokens']
+        with self._cond:
+            if not self.path:
+                tokens = self._tokens
+            return {
+                "rate_per_minute": self.rate * 60,
+                "burst": self.burst,
+                "tokens": round(tokens, 2),
+                "shared": bool(self.path),
+                "waiting": len(self._queue),
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "backoffs": self.backoffs,
+            }
+
+
+class _LockedState:
+    """Context manager holding an exclusive flock on the state file while it is read and rewritten"""
+
+    def __init__(self, path: str, burst: int, clock):
+        self.path = path
+        self.burst = burst
+        self.clock = clock
+
+    def __enter__(self) -> Dict:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        raw = os.read(self._fd, 4096)
+        try:
+            self.state = json.loads(raw)
+        except ValueError:
+            # New or unreadable file: start with a full bucket
+            self.state = {'tokens': float(self.burst), 'updated': self.clock(), 'blocked_until': 0.0}
+        return self.state
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                payload = json.dumps(self.state).encode()
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.ftruncate(self._fd, 0)
+                os.write(self._fd, payload)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide upstream rate limiter, creating it on first use"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,108 @@
+"""
+JSON encoding for the /api/* endpoints of the web front-ends
+Uses orjson when it is installed and falls back to the standard library
+"""
+
+import datetime
+import decimal
+import json
+from typing import Any, Callable, Dict, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, the stdlib encoder is used without it
+    orjson = None
+
+try:
+    from config import JSON_BACKEND
+except ImportError:
+    # Fallback if config not found
+    JSON_BACKEND = "auto"
+
+JSON_MIMETYPE = 'application/json'
+
+
+def _default(obj: Any) -> Any:
+    """Encode the non-JSON types the front-ends hand over (records, dates, decimals)"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+_BACKENDS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[Union[bytes, str]], Any]]] = {
+    'json': (_stdlib_dumps, _stdlib_loads),
+}
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    _BACKENDS['orjson'] = (_orjson_dumps, orjson.loads)
+
+_backend = None
+
+
+def register_json_backend(name: str, dumps: Callable[[Any], bytes],
+                          loads: Callable[[Union[bytes, str]], Any]) -> None:
+    """
+    Make another JSON library selectable through use_json_backend() or JSON_BACKEND
+
+    Args:
+        name (str): Backend name
+        dumps (Callable): Encodes an object to UTF-8 bytes
+        loads (Callable): Decodes bytes or str
+    """
+    _BACKENDS[name] = (dumps, loads)
+
+
+def use_json_backend(name: str = "auto") -> str:
+    """
+    Select the encoder used by json_dumps() and json_loads()
+
+    Args:
+        name (str): A registered backend, or "auto" for the fastest one installed
+
+    Returns:
+        str: Name of the selected backend
+    """
+    global _backend
+    if name == "auto":
+        name = 'orjson' if 'orjson' in _BACKENDS else 'json'
+    if name not in _BACKENDS:
+        raise ValueError(f"unknown or uninstalled JSON backend: {name}")
+    _backend = name
+    return name
+
+
+def json_backend() -> str:
+    """Return the name of the active backend, selecting JSON_BACKEND on first use"""
+    if _backend is None:
+        use_json_backend(JSON_BACKEND)
+    return _backend
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON; objects with to_dict() are encoded through it"""
+    return _BACKENDS[json_backend()][0](obj)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Decode a JSON document from bytes or str"""
+    return _BACKENDS[json_backend()][1](data)
@@ -0,0 +1,108 @@
+"""
+Request coalescing (single-flight) for identical concurrent lookups
+Works across threads (threaded Flask/WSGI workers) and event loops alike
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share its result
+
+    Calls are tracked with concurrent.futures.Future objects so a fetch led
+    by a worker thread can be awaited from any event loop and vice versa.
+    Errors raised by the leader are re-raised in every waiting caller.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller must lead it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def busy(self, key: Hashable) -> bool:
+        """Return whether a call for key is currently running"""
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Call fn() unless a call for key is already running, then wait for that one"""
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """asyncio counterpart of do(): await fn() or the call already in flight"""
+        future, leader = self._claim(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Only the leader was cancelled; waiters see a timeout rather than a cancellation
+            future.set_exception(asyncio.TimeoutError("coalesced fetch was cancelled"))
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> Dict:
+        """Return the coalescing counters for status endpoints"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group, creating it on first use"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
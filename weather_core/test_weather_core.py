@@ -0,0 +1,759 @@
+"""
+Test script for the shared weather_core package
+Runs offline: the upstream API is replaced by a fake session
+"""
+
+import asyncio
+import datetime
+import os
+import threading
+import time
+
+from weather_core.async_client import AsyncWeatherClient, LoopThread
+from weather_core.batch import CityIdRegistry, chunked
+from weather_core.breaker import CircuitBreaker
+from weather_core.cache import TTLCache, cache_key
+from weather_core.catalog import CityCatalog, get_catalog
+from weather_core.client import WeatherClient, create_session, get_session
+from weather_core.errors import CircuitOpenError, CityNotFoundError, RateLimitedError
+from weather_core.fanout import fetch_concurrently, fetch_concurrently_async
+from weather_core.mock_server import FaultProfile, MockServer, city_id, make_observation
+from weather_core.observation import Observation
+from weather_core.ratelimit import BACKGROUND, INTERACTIVE, RateLimiter
+from weather_core.serialization import json_backend, json_dumps, json_loads, use_json_backend
+from weather_core.singleflight import SingleFlight
+from weather_core.stats import StatsAccumulator, compute_column_statistics, compute_statistics
+
+# Upstream is faked here, so the shared quota must not slow the suite down
+UNLIMITED = RateLimiter(rate_per_minute=0)
+
+
+def make_payload(city: str, temp: float = 20.0) -> dict:
+    """Build a minimal OpenWeatherMap-shaped response"""
+    return {
+        'id': abs(hash(city)) % 100000,
+        'name': city,
+        'main': {'temp': temp, 'feels_like': temp, 'humidity': 50, 'pressure': 1013},
+        'weather': [{'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+        'wind': {'speed': 3.0},
+        'sys': {'country': 'TC'},
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Records calls and answers with canned payloads"""
+
+    def __init__(self, temps=None, missing=(), delay=0.0, status=200):
+        self.delay = delay
+        self.temps = temps or {}
+        self.missing = set(missing)
+        self.status = status
+        self.calls = []
+        self.names = {}
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params or {}), timeout))
+        if self.delay:
+            time.sleep(self.delay)
+        if url.endswith('/group'):
+            ids = [int(city_id) for city_id in params['id'].split(',')]
+            payloads = [make_payload(self.names[city_id]) for city_id in ids]
+            return FakeResponse({'cnt': len(payloads), 'list': payloads})
+        city = params['q']
+        self.names[make_payload(city)['id']] = city
+        if self.status >= 400:
+            return FakeResponse({'cod': str(self.status)}, status_code=self.status)
+        if city in self.missing:
+            return FakeResponse({'cod': '404', 'message': 'city not found'}, status_code=404)
+        return FakeResponse(make_payload(city, self.temps.get(city, 20.0)))
+
+
+def test_shared_session_is_pooled_and_reused():
+    session = get_session()
+    assert session is get_session()
+    adapter = session.get_adapter('http://api.openweathermap.org')
+    assert adapter._pool_maxsize >= 1
+
+    custom = create_session(pool_connections=2, pool_maxsize=4)
+    assert custom.get_adapter('https://example.com')._pool_maxsize == 4
+
+
+def test_client_passes_params_and_timeout():
+    session = FakeSession(temps={'London': 12.5})
+    client = WeatherClient('key', base_url='http://stub/weather', timeout=3, units='imperial',
+                           session=session, cache=TTLCache(), rate_limiter=UNLIMITED)
+
+    data = client.get_weather('London')
+
+    assert data.temp == 12.5
+    url, params, timeout = session.calls[0]
+    assert url == 'http://stub/weather'
+    assert params == {'q': 'London', 'appid': 'key', 'units': 'imperial'}
+    assert timeout == 3
+
+
+def test_observation_parses_payload_into_slim_record():
+    observation = Observation.from_payload(make_observation('Tokyo', 'JP'))
+
+    assert observation.name == 'Tokyo' and observation.country == 'JP'
+    assert observation.city_id == city_id('Tokyo')
+    assert not hasattr(observation, '__dict__')
+    assert set(observation.to_dict()) == {'name', 'country', 'temp', 'feels_like', 'humidity', 'pressure',
+                                          'wind_speed', 'condition', 'description', 'icon', 'observed_at',
+                                          'cache_age'}
+
+    aged = observation.with_age(12.34)
+    assert aged.cache_age == 12.3 and observation.cache_age == 0.0
+    assert aged.temp == observation.temp
+
+
+def test_json_backends_encode_the_same_documents():
+    payload = {'weather_data': [Observation(name='Oslo', temp=-3.5, country='NO')],
+               'when': datetime.date(2024, 1, 2), 'city': 'Zürich'}
+    active = json_backend()
+    try:
+        for backend in ('json', 'orjson'):
+            try:
+                use_json_backend(backend)
+            except ValueError:
+                continue  # orjson not installed
+            encoded = json_dumps(payload)
+            assert isinstance(encoded, bytes)
+            decoded = json_loads(encoded)
+            assert decoded['weather_data'][0]['temp'] == -3.5
+            assert decoded['when'] == '2024-01-02' and decoded['city'] == 'Zürich'
+    finally:
+        use_json_backend(active)
+
+
+def test_statistics_keep_legacy_keys_and_group_by_country(monkeypatch):
+    data = [Observation(name='Oslo', temp=-4.0, country='NO', humidity=80),
+            Observation(name='Bergen', temp=2.0, country='NO', humidity=90),
+            Observation(name='Cairo', temp=30.0, country='EG', humidity=20),
+            Observation(name='Tromso', temp=-4.0, country='NO', humidity=70)]
+
+    result = compute_statistics(data)
+    assert result['coldest_city'] == 'Oslo' and result['coldest_temperature'] == -4.0
+    assert result['average_temperature'] == 6.0 and result['total_cities'] == 4
+    assert result['metrics']['temp']['median'] == -1.0
+    assert result['metrics']['humidity']['max'] == 90.0
+    assert list(result['by_country']) == ['EG', 'NO']
+    assert result['by_country']['NO']['total_cities'] == 3
+    assert result['by_country']['NO']['temp']['p25'] == -4.0
+
+    # The NumPy engine and the pure-Python path agree
+    monkeypatch.setattr('weather_core.stats.VECTORIZE_MIN_OBSERVATIONS', 1)
+    assert compute_statistics(data) == result
+
+
+def test_column_statistics_match_observation_statistics():
+    data = [Observation(name=f'City {i}', temp=float(i % 17) - 5, country=('NO', 'SE', 'EG')[i % 3],
+                        humidity=i % 100, pressure=1000 + i % 30, wind_speed=(i % 9) / 2)
+            for i in range(500)]
+    columns = {field: [getattr(observation, field) for observation in data]
+               for field in ('name', 'country', 'temp', 'humidity', 'pressure', 'wind_speed')}
+
+    result = compute_column_statistics(columns.pop('name'), columns.pop('country'), **columns)
+    assert result == compute_statistics(data)
+    assert compute_column_statistics(['Oslo'], ['NO'], [-4.0], [80], [1000], [3.0])['coldest_city'] == 'Oslo'
+
+
+def test_stats_accumulator_streams_and_merges():
+    data = [Observation(name=f'City {i}', temp=float(i % 17) - 5, country='NO' if i % 3 else 'SE',
+                        humidity=i % 100, pressure=1000 + i % 30, wind_speed=(i % 9) / 2)
+            for i in range(500)]
+    exact = compute_statistics(data)
+
+    left, right = StatsAccumulator(), StatsAccumulator()
+    left.update(data[:200])
+    right.update(observation for observation in data[200:])  # generators are never buffered
+    result = left.merge(right).result()
+
+    assert len(left) == 500
+    for key in ('coldest_city', 'coldest_temperature', 'total_cities'):
+        assert result[key] == exact[key]
+    assert abs(result['average_temperature'] - exact['average_temperature']) < 1e-9
+    assert abs(result['metrics']['pressure']['stddev'] - exact['metrics']['pressure']['stddev']) < 1e-9
+    assert abs(result['metrics']['temp']['median'] - exact['metrics']['temp']['median']) <= 0.1
+    assert result['by_country']['SE']['total_cities'] == exact['by_country']['SE']['total_cities']
+    assert StatsAccumulator().result() == {"error": "No weather data available"}
+
+
+def test_client_raises_for_http_errors():
+    import requests
+    client = WeatherClient('key', session=FakeSession(missing={'Atlantis'}), cache=TTLCache(),
+                           negative_cache=TTLCache(ttl=0), rate_limiter=UNLIMITED)
+    try:
+        client.get_weather('Atlantis')
+    except requests.exceptions.HTTPError:
+        pass
+    else:
+        raise AssertionError("expected HTTPError for unknown city")
+
+
+def test_client_cache_serves_repeat_lookups():
+    session = FakeSession()
+    client = WeatherClient('key', session=session, cache=TTLCache(ttl=60, maxsize=10),
+                           rate_limiter=UNLIMITED)
+
+    client.get_weather('New York')
+    client.get_weather('  new   york ')
+    client.get_weather('New York', units='imperial')
+
+    # Normalized name shares an entry, other units do not
+    assert len(session.calls) == 2
+    stats = client.cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 2
+
+
+def test_negative_cache_answers_unknown_cities_locally():
+    import requests
+    session = FakeSession(missing={'Atlantis'})
+    client = WeatherClient('key', session=session, cache=TTLCache(),
+                           negative_cache=TTLCache(ttl=60, maxsize=10), rate_limiter=UNLIMITED)
+
+    try:
+        client.get_weather('Atlantis')
+    except requests.exceptions.HTTPError:
+        pass
+    for _ in range(3):
+        try:
+            client.get_weather(' atlantis')
+        except CityNotFoundError as e:
+            assert e.status == 404
+        else:
+            raise AssertionError("expected CityNotFoundError from the negative cache")
+
+    assert len(session.calls) == 1
+    assert client.negative_cache.stats()['hits'] == 3
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    now = [0.0]
+    cache = TTLCache(ttl=10, maxsize=2, clock=lambda: now[0])
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get('a') is None
+    assert cache.expirations == 1
+    assert cache_key(' Sofia ', 'metric') == ('sofia', 'metric')
+
+
+def test_stale_entries_are_served_while_refreshing():
+    now = [0.0]
+    session = FakeSession(temps={'Oslo': 1.0})
+    cache = TTLCache(ttl=10, hard_ttl=30, maxsize=10, clock=lambda: now[0])
+    client = WeatherClient('key', session=session, cache=cache, single_flight=SingleFlight(),
+                           rate_limiter=UNLIMITED)
+
+    assert client.get_weather('Oslo').cache_age == 0
+
+    # Past the soft TTL the old observation comes back at once and a refresh runs behind it
+    now[0] = 15.0
+    session.temps['Oslo'] = 2.0
+    stale = client.get_weather('Oslo')
+    assert stale.temp == 1.0 and stale.cache_age == 15.0
+    key = cache_key('Oslo', 'metric')
+    deadline = time.monotonic() + 2
+    while (len(session.calls) < 2 or client.single_flight.busy(key)) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.get_weather('Oslo').temp == 2.0
+    assert cache.stats()['stale_hits'] == 1
+
+    # Past the hard TTL callers wait for upstream again
+    now[0] = 50.0
+    assert client.get_weather('Oslo').cache_age == 0
+    assert len(session.calls) == 3
+
+
+def test_circuit_breaker_fails_fast_and_probes():
+    import requests
+    now = [0.0]
+    session = FakeSession(status=503)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+    client = WeatherClient('key', session=session, cache=TTLCache(ttl=0), breaker=breaker,
+                           rate_limiter=UNLIMITED)
+
+    for _ in range(3):
+        try:
+            client.get_weather('Lima')
+        except requests.exceptions.HTTPError:
+            pass
+    assert breaker.state == 'open'
+
+    # Open: no upstream call at all
+    try:
+        client.get_weather('Lima')
+    except CircuitOpenError as e:
+        assert e.retry_after == 30
+    else:
+        raise AssertionError("expected CircuitOpenError while the circuit is open")
+    assert len(session.calls) == 3
+
+    # Half-open: one probe goes through and closes the circuit
+    now[0] = 31.0
+    session.status = 200
+    assert breaker.state == 'half_open'
+    assert client.get_weather('Lima').name == 'Lima'
+    assert breaker.stats()['state'] == 'closed' and breaker.trips == 1
+
+
+def test_circuit_breaker_counts_only_upstream_errors():
+    import requests
+
+    class BrokenSession:
+        def __init__(self, error):
+            self.error = error
+
+        def get(self, url, params=None, timeout=None):
+            raise self.error
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    for error in (KeyboardInterrupt(), TypeError('bad params'), requests.ConnectionError('refused')):
+        client = WeatherClient('key', session=BrokenSession(error), cache=TTLCache(ttl=0), breaker=breaker,
+                               rate_limiter=UNLIMITED)
+        try:
+            client.get_weather('Lima')
+        except BaseException as e:
+            assert e is error
+        assert breaker.failures == (1 if isinstance(error, requests.RequestException) else 0)
+    assert breaker.state == 'open'
+
+
+def test_rate_limited_probe_frees_its_slot():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 31.0
+    limiter = RateLimiter(rate_per_minute=1, burst=1)
+    limiter.acquire()
+    client = WeatherClient('key', timeout=0.05, session=FakeSession(), cache=TTLCache(ttl=0), breaker=breaker,
+                           rate_limiter=limiter)
+
+    try:
+        client.get_weather('Lima')
+    except RateLimitedError:
+        pass
+    else:
+        raise AssertionError("expected RateLimitedError with an empty bucket")
+    # The next caller may probe at once instead of waiting out reset_timeout
+    assert breaker.before_call() is True
+
+
+def test_circuit_breaker_timeout_follows_latency():
+    breaker = CircuitBreaker(min_timeout=0.5)
+    assert breaker.timeout(10) == 10
+    for _ in range(50):
+        breaker.record_success(0.2)
+    assert abs(breaker.timeout(10) - 0.6) < 1e-9
+    breaker.record_success(0.01)
+    assert breaker.timeout(0.3) == 0.3
+
+
+def test_circuit_breaker_recovers_when_latency_rises_for_good():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, min_timeout=1, clock=lambda: now[0])
+    for _ in range(50):
+        breaker.record_success(0.05)
+    assert breaker.timeout(10) == 1
+
+    # The upstream now answers in 2s: calls at the 1s floor time out until the circuit opens
+    def call():
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            return
+        if 2.0 <= breaker.timeout(10):
+            breaker.record_success(2.0)
+        else:
+            breaker.record_failure()
+
+    for _ in range(3):
+        call()
+    assert breaker.state == 'open'
+
+    # The probe gets the full timeout and closes the circuit; the timeout then follows the new latency
+    now[0] += 31
+    call()
+    assert breaker.state == 'closed'
+    for _ in range(30):
+        call()
+    assert breaker.state == 'closed' and breaker.timeout(10) == 6
+
+
+def test_rate_limiter_serves_interactive_callers_first():
+    limiter = RateLimiter(rate_per_minute=600, burst=1)
+    limiter.acquire()  # drain the bucket; the next token arrives in 0.1s
+    order = []
+
+    def take(name, priority):
+        limiter.acquire(priority, timeout=2)
+        order.append(name)
+
+    background = [threading.Thread(target=take, args=(f'bg{i}', BACKGROUND)) for i in range(2)]
+    for thread in background:
+        thread.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=take, args=('city', INTERACTIVE))
+    interactive.start()
+    for thread in background + [interactive]:
+        thread.join()
+
+    assert order[0] == 'city'
+    try:
+        limiter.acquire(timeout=0.01)
+    except RateLimitedError:
+        pass
+    else:
+        raise AssertionError("expected RateLimitedError with an empty bucket")
+    assert limiter.stats()['throttled'] == 1
+
+
+def test_rate_limiter_backs_off_and_shares_state(tmp_path):
+    path = str(tmp_path / 'bucket.json')
+    first = RateLimiter(rate_per_minute=60, burst=2, path=path)
+    second = RateLimiter(rate_per_minute=60, burst=2, path=path)
+
+    first.acquire()
+    second.acquire()
+    # Both processes drew from one bucket of two
+    assert second.stats()['tokens'] < 1
+
+    limiter = RateLimiter(rate_per_minute=6000, burst=5)
+    limiter.penalize(0.2)
+    start = time.perf_counter()
+    asyncio.run(limiter.acquire_async(timeout=1))
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_rate_limiter_shared_state_does_not_block_the_event_loop(tmp_path):
+    import fcntl
+    path = str(tmp_path / 'bucket.json')
+    limiter = RateLimiter(rate_per_minute=60, burst=2, path=path)
+
+    # Another process holds the state file for 0.2s
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    threading.Timer(0.2, lambda: (fcntl.flock(fd, fcntl.LOCK_UN), os.close(fd))).start()
+
+    async def scenario():
+        ticks = 0
+        acquire = asyncio.ensure_future(limiter.acquire_async(timeout=2))
+        while not acquire.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await acquire
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_rate_limiter_waits_for_the_state_file_outside_its_lock(tmp_path):
+    import fcntl
+    path = str(tmp_path / 'bucket.json')
+    limiter = RateLimiter(rate_per_minute=60, burst=2, path=path)
+
+    # Another process holds the state file for 0.3s while a thread waits for it
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    threading.Timer(0.3, lambda: (fcntl.flock(fd, fcntl.LOCK_UN), os.close(fd))).start()
+    head = threading.Thread(target=limiter.acquire)
+    head.start()
+    time.sleep(0.05)
+
+    # A caller queued behind it still gets its timeout, instead of waiting for the flock
+    start = time.perf_counter()
+    try:
+        limiter.acquire(timeout=0.05)
+    except RateLimitedError:
+        pass
+    else:
+        raise AssertionError("expected RateLimitedError behind the waiting head")
+    assert time.perf_counter() - start < 0.2
+    head.join()
+
+
+def test_single_flight_coalesces_concurrent_threads():
+    session = FakeSession(delay=0.2)
+    flight = SingleFlight()
+    client = WeatherClient('key', session=session, cache=TTLCache(ttl=0), single_flight=flight,
+                           rate_limiter=UNLIMITED)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get_weather('Rome')))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 10
+    assert len(session.calls) == 1
+    assert flight.stats()['coalesced'] == 9
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_single_flight_shares_errors_and_spans_event_loops():
+    flight = SingleFlight()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    async def follower():
+        await asyncio.sleep(0.05)
+        return await flight.do_async('k', lambda: asyncio.sleep(0, result='unused'))
+
+    errors = []
+
+    def lead():
+        try:
+            flight.do('k', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    try:
+        asyncio.run(follower())
+    except ValueError as e:
+        errors.append(e)
+    leader.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 2
+
+
+def test_get_weather_many_batches_resolved_cities(tmp_path):
+    session = FakeSession()
+    ids_file = str(tmp_path / 'city_ids.json')
+    cities = [f'City {i}' for i in range(45)]
+
+    def new_client(city_ids):
+        return WeatherClient('key', base_url='http://stub/data/2.5/weather', session=session,
+                             cache=TTLCache(ttl=0), city_ids=city_ids, rate_limiter=UNLIMITED)
+
+    # First pass resolves IDs one city at a time; they are written once, when the registry is flushed
+    city_ids = CityIdRegistry(ids_file, flush_delay=60)
+    first = new_client(city_ids).get_weather_many(cities)
+    assert len(session.calls) == 45
+    assert all(data.name == city for city, data in first)
+    assert not os.path.exists(ids_file)
+    city_ids.flush()
+
+    # A fresh client (new process) reuses the persisted IDs: ceil(45 / 20) group calls
+    session.calls.clear()
+    second = new_client(CityIdRegistry(ids_file)).get_weather_many(cities + ['City 0'])
+    assert len(session.calls) == 3
+    assert all(url.endswith('/group') for url, _, _ in session.calls)
+    assert [city for city, _ in second] == cities + ['City 0']
+    assert all(data.name == city for city, data in second)
+    assert [len(chunk) for chunk in chunked(list(range(45)))] == [20, 20, 5]
+
+
+def test_city_id_registry_flushes_new_ids_after_a_delay(tmp_path):
+    ids_file = str(tmp_path / 'city_ids.json')
+    city_ids = CityIdRegistry(ids_file, flush_delay=0.05)
+    for i in range(10):
+        city_ids.record(f'City {i}', i + 1)
+    time.sleep(0.3)
+
+    assert len(CityIdRegistry(ids_file)) == 10
+
+
+def test_catalog_is_deduplicated_and_indexed():
+    catalog = get_catalog()
+    assert catalog is get_catalog()
+    assert len(set(map(str.casefold, catalog))) == len(catalog)
+    assert 'bangkok' in catalog and 'Atlantis' not in catalog
+    assert 'Paris' in catalog.by_country('fr')
+    assert set(catalog.sample(5, region='Asia')) <= set(catalog.by_region('Asia'))
+
+    rows = [('Cannes', 'FR', 'Europe'), ('cannes ', 'FR', 'Europe'), ('Oslo', 'NO', 'Europe')]
+    small = CityCatalog(rows)
+    assert list(small) == ['Cannes', 'Oslo']
+    assert small.get('OSLO') == {'name': 'Oslo', 'country': 'NO', 'region': 'Europe'}
+    assert sorted(small.sample(2)) == ['Cannes', 'Oslo']
+
+
+def test_catalog_sampling_scales_to_large_catalogs():
+    catalog = CityCatalog((f'City {i}', f'C{i % 200}', 'Region') for i in range(50000))
+    start = time.perf_counter()
+    for _ in range(1000):
+        catalog.sample(5)
+    assert time.perf_counter() - start < 0.5
+    assert len(catalog.by_country('C7')) == 250
+
+
+def test_fanout_runs_concurrently_and_keeps_order():
+    def slow_fetch(city):
+        time.sleep(0.2)
+        return make_payload(city)
+
+    cities = ['A', 'B', 'C', 'D', 'E']
+    start = time.perf_counter()
+    results = fetch_concurrently(slow_fetch, cities, max_workers=5)
+    elapsed = time.perf_counter() - start
+
+    assert [city for city, _ in results] == cities
+    assert all(data['name'] == city for city, data in results)
+    # Wall time is one fetch, not the sum of five
+    assert elapsed < 0.6
+
+
+def test_fanout_returns_partial_results():
+    def flaky_fetch(city):
+        if city == 'boom':
+            raise RuntimeError("upstream exploded")
+        if city == 'slow':
+            time.sleep(1.0)
+        return make_payload(city)
+
+    results = dict(fetch_concurrently(flaky_fetch, ['ok', 'boom', 'slow'], max_workers=3,
+                                      deadline=0.3))
+
+    assert results['ok']['name'] == 'ok'
+    assert results['boom'] is None
+    assert results['slow'] is None
+
+
+def test_async_client_and_fanout_against_local_server():
+    from aiohttp import web
+    import aiohttp
+
+    async def handler(request):
+        city = request.query['q']
+        if city == 'Atlantis':
+            return web.json_response({'cod': '404'}, status=404)
+        await asyncio.sleep(0.1)
+        return web.json_response(make_payload(city))
+
+    async def scenario():
+        server_app = web.Application()
+        server_app.router.add_get('/data/2.5/weather', handler)
+        runner = web.AppRunner(server_app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        client = AsyncWeatherClient('key', base_url=f'http://127.0.0.1:{port}/data/2.5/weather',
+                                    cache=TTLCache(ttl=0), negative_cache=TTLCache(ttl=60),
+                                    rate_limiter=UNLIMITED)
+        try:
+            data = await client.get_weather('Paris')
+            assert data.name == 'Paris'
+            assert client.get_session() is client.get_session()
+
+            try:
+                await client.get_weather('Atlantis')
+            except aiohttp.ClientResponseError as e:
+                assert e.status == 404
+            else:
+                raise AssertionError("expected ClientResponseError for unknown city")
+
+            async def safe_fetch(city):
+                try:
+                    return await client.get_weather(city)
+                except (CityNotFoundError, aiohttp.ClientError):
+                    return None
+
+            start = time.perf_counter()
+            results = await fetch_concurrently_async(safe_fetch, ['A', 'B', 'Atlantis', 'C'])
+            elapsed = time.perf_counter() - start
+            assert [city for city, _ in results] == ['A', 'B', 'Atlantis', 'C']
+            assert results[2][1] is None
+            assert elapsed < 0.35
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_loop_thread_keeps_one_session_across_request_loops():
+    with MockServer() as server:
+        client = AsyncWeatherClient('key', base_url=server.base_url, cache=TTLCache(ttl=0),
+                                    rate_limiter=UNLIMITED)
+        loop_thread = LoopThread()
+
+        # Each asyncio.run() stands for one Flask request (or Django request under WSGI)
+        for city in ('Paris', 'Oslo'):
+            assert asyncio.run(loop_thread.run(client.get_weather(city))).name == city
+
+        assert len(client._sessions) == 1
+        session = client._sessions[loop_thread.loop]
+        assert not session.closed
+        loop_thread.submit(client.close()).result(timeout=5)
+
+
+def test_mock_server_start_raises_when_the_port_is_taken():
+    import socket
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        server = MockServer(port=taken.getsockname()[1])
+        try:
+            server.start()
+        except OSError:
+            pass
+        else:
+            server.stop()
+            raise AssertionError("expected OSError for a port already in use")
+    server.stop()  # already stopped, a no-op
+
+
+def test_mock_server_serves_catalog_cities_and_injects_faults():
+    import requests
+    with MockServer() as server:
+        client = WeatherClient('key', base_url=server.base_url, session=create_session(),
+                               cache=TTLCache(ttl=0), negative_cache=TTLCache(ttl=0),
+                               city_ids=CityIdRegistry(None), rate_limiter=UNLIMITED)
+        data = client.get_weather('tokyo')
+        assert data.name == 'Tokyo' and data.country == 'JP'
+        assert data.city_id == city_id('Tokyo')
+        assert client.get_weather('Tokyo').temp == data.temp  # deterministic
+        try:
+            client.get_weather('Atlantis')
+        except requests.exceptions.HTTPError as e:
+            assert e.response.status_code == 404
+        else:
+            raise AssertionError("expected 404 for a city outside the catalog")
+
+        many = client.get_weather_many(['Paris', 'Tokyo', 'Cairo'])
+        assert [data.name for _, data in many] == ['Paris', 'Tokyo', 'Cairo']
+        stats = create_session().get(server.base_url.replace('/data/2.5/weather', '/mock/stats')).json()
+        assert stats['ok'] == 5 and stats['not_found'] == 1
+
+    profile = FaultProfile(latency='fixed:0.05', rate_limit_rate=1.0, retry_after=7)
+    with MockServer(profile) as server:
+        start = time.perf_counter()
+        response = create_session().get(server.base_url, params={'q': 'Paris'})
+        assert time.perf_counter() - start >= 0.05
+        assert response.status_code == 429 and response.headers['Retry-After'] == '7'
+
+    with MockServer(FaultProfile(drip_rate=1.0, drip_chunk=100, drip_delay=0.01)) as server:
+        response = create_session().get(server.base_url, params={'q': 'Paris', 'units': 'metric'})
+        assert response.json()['name'] == 'Paris'